@@ -1,5 +1,11 @@
+from .bundle import GaussianBundleCalculation
 from .cubegen import CubegenCalculation
 from .formchk import FormchkCalculation
 from .gaussian import GaussianCalculation
 
-__all__ = ["CubegenCalculation", "FormchkCalculation", "GaussianCalculation"]
+__all__ = [
+    "CubegenCalculation",
+    "FormchkCalculation",
+    "GaussianBundleCalculation",
+    "GaussianCalculation",
+]
@@ -0,0 +1,226 @@
+"""Gaussian bundle plugin: many small Gaussian jobs in one allocation."""
+from aiida.common import CalcInfo
+from aiida.common.escaping import escape_for_bash
+from aiida.engine import CalcJob
+from aiida.orm import Dict
+from aiida.plugins import DataFactory
+
+from aiida_gaussian.utils.caching import normalize_parameters
+from aiida_gaussian.utils.resources import DEFAULT_MEMORY_MARGIN, get_memory_mb
+
+from .gaussian import GaussianCalculation
+
+StructureData = DataFactory("core.structure")
+
+# Concurrent lanes that pull the next job from the shared queue: a job is run by
+# the lane that claims it first (mkdir is atomic), such that a lane that finishes
+# early continues with the next job instead of waiting for the slower lanes.
+LANES_TEMPLATE = """\
+gaussian_bundle_lane() {{
+    for job in {queue}; do
+        if mkdir "$job.claimed" 2> /dev/null; then
+            {command} "$job{input_ext}"
+        fi
+    done
+}}
+for lane in $(seq {num_lanes}); do
+    gaussian_bundle_lane &
+done
+wait"""
+
+
+def validate_inputs(value, _):
+    """Validate that each structure has a parameter set and vice versa.
+
+    As the lanes are run after 'metadata.options.append_text' and without MPI
+    (see GaussianBundleCalculation), neither can be requested.
+    """
+    structures = set(value.get("structures", {}))
+    parameters = set(value.get("parameters", {}))
+    if not structures:
+        return "At least one structure has to be specified."
+    if structures != parameters:
+        return (
+            "The labels of 'structures' and 'parameters' do not match: "
+            f"{sorted(structures ^ parameters)}"
+        )
+    options = value.get("metadata", {}).get("options", {})
+    if options.get("append_text"):
+        return (
+            "'metadata.options.append_text' would run before the bundled jobs; "
+            "use the 'append_text' of the code or the computer instead."
+        )
+    code = value.get("code")
+    if options.get("withmpi") or (code is not None and code.with_mpi):
+        return "The bundled jobs cannot be run with MPI."
+    return None
+
+
+class GaussianBundleCalculation(CalcJob):
+    """
+    Run many small Gaussian calculations concurrently inside one allocation
+
+    Each label in the 'structures' and 'parameters' namespaces defines one job,
+    with the parameters following the GaussianCalculation convention.
+
+    The jobs are run by a number of concurrent lanes (by default one per core,
+    or settings = {'max_concurrent_jobs': K}), which pull the next job from a
+    shared queue, largest first (by number of atoms), to balance the load. Each
+    job gets its slice of the cores as '%nprocshared' and of 'max_memory_kb' as
+    '%mem' (unless set explicitly), and a separate '%chk', if a checkpoint was
+    requested.
+
+    As a Gaussian invocation can only run a fixed list of inputs, the lanes are
+    not a code invocation of the job script, but its append text. The job script
+    runs, in this order: the prepend texts of the computer, the code and
+    'metadata.options' (e.g. the environment), the lanes, and the append texts
+    of the code and the computer. 'metadata.options.append_text' would run
+    before the lanes and is not accepted, nor is MPI, with which the lanes
+    would not wrap the code.
+
+    The outputs of each job are nested under its label, e.g. 'mol1.output_parameters'.
+    """
+
+    INPUT_FILE_EXT = ".com"
+    OUTPUT_FILE_EXT = ".log"
+    DEFAULT_PARSER = "gaussian.bundle"
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+
+        spec.input_namespace(
+            "structures",
+            valid_type=StructureData,
+            dynamic=True,
+            help="Input structures, one for each job, keyed by the job label.",
+        )
+        spec.input_namespace(
+            "parameters",
+            valid_type=Dict,
+            dynamic=True,
+            help="Input parameters, one for each job, keyed by the job label.",
+        )
+        spec.input(
+            "settings",
+            valid_type=Dict,
+            required=False,
+            help="additional input parameters",
+        )
+        spec.inputs.validator = validate_inputs
+
+        # Turn mpi off by default
+        spec.input("metadata.options.withmpi", valid_type=bool, default=False)
+
+        spec.input(
+            "metadata.options.parser_name",
+            valid_type=str,
+            default=cls.DEFAULT_PARSER,
+            non_db=True,
+        )
+
+        spec.output(
+            "exit_statuses",
+            valid_type=Dict,
+            required=False,
+            help="The exit status of each job",
+        )
+
+        spec.outputs.dynamic = True
+
+        # Same exit codes as GaussianCalculation, which apply to single jobs
+        for label, exit_code in GaussianCalculation.spec().exit_codes.items():
+            spec.exit_code(exit_code.status, label, exit_code.message)
+
+        spec.exit_code(
+            380,
+            "ERROR_BUNDLE_JOB_FAILURE",
+            message="The following bundled jobs failed: {labels}.",
+        )
+
+    # --------------------------------------------------------------------------
+    def prepare_for_submission(self, folder):
+        """
+        Write one input file per job and run the jobs in concurrent lanes.
+
+        :param folder: a aiida.common.folders.Folder subclass where
+                           the plugin should put all its files.
+        """
+        settings = self.inputs.settings.get_dict() if "settings" in self.inputs else {}
+        options = self.inputs.metadata.options
+
+        labels = sorted(self.inputs.structures)
+
+        num_cores = self._get_num_cores()
+        num_lanes = min(len(labels), settings.get("max_concurrent_jobs", num_cores))
+        cores_per_job = max(1, num_cores // num_lanes)
+        memory_mb_per_job = None
+        if options.get("max_memory_kb"):
+            memory_mb_per_job = get_memory_mb(
+                options.max_memory_kb / num_lanes,
+                settings.get("memory_margin", DEFAULT_MEMORY_MARGIN),
+            )
+
+        for label in labels:
+            # link0 keys in lower case, such as in GaussianCalculation
+            parameters = normalize_parameters(self.inputs.parameters[label].get_dict())
+            link0 = dict(parameters.get("link0_parameters") or {})
+            link0.setdefault("%nprocshared", str(cores_per_job))
+            if memory_mb_per_job:
+                link0.setdefault("%mem", f"{memory_mb_per_job}MB")
+            if "%chk" in link0:
+                link0["%chk"] = label + ".chk"
+            parameters["link0_parameters"] = link0
+
+            input_string = GaussianCalculation._render_input_string_native(
+                parameters, self.inputs.structures[label]
+            )
+            with open(
+                folder.get_abs_path(label + self.INPUT_FILE_EXT), "w"
+            ) as out_file:
+                out_file.write(input_string)
+
+        calcinfo = CalcInfo()
+        calcinfo.uuid = self.uuid
+        # the lanes invoke the code themselves, see LANES_TEMPLATE
+        calcinfo.codes_info = []
+        calcinfo.append_text = self._get_lanes_text(self._get_queue(labels), num_lanes)
+
+        calcinfo.local_copy_list = []
+        calcinfo.remote_copy_list = []
+        calcinfo.remote_symlink_list = []
+        calcinfo.retrieve_list = [label + self.OUTPUT_FILE_EXT for label in labels]
+
+        return calcinfo
+
+    def _get_num_cores(self):
+        """Total number of cores of the allocation."""
+        resources = self.inputs.metadata.options.resources
+        if "tot_num_mpiprocs" in resources:
+            return resources["tot_num_mpiprocs"]
+        return resources.get("num_machines", 1) * resources.get(
+            "num_mpiprocs_per_machine", 1
+        )
+
+    def _get_queue(self, labels):
+        """Order the jobs largest-first.
+
+        The cost of a job is estimated as the cube of its number of atoms.
+        """
+        costs = {
+            label: len(self.inputs.structures[label].sites) ** 3 for label in labels
+        }
+        return sorted(labels, key=lambda lab: -costs[lab])
+
+    def _get_lanes_text(self, queue, num_lanes):
+        """The shell code that runs the queue of jobs in concurrent lanes."""
+        code = self.inputs.code
+        command = (
+            code.get_prepend_cmdline_params() + code.get_executable_cmdline_params()
+        )
+        return LANES_TEMPLATE.format(
+            queue=" ".join(escape_for_bash(label) for label in queue),
+            command=" ".join(escape_for_bash(arg) for arg in command),
+            input_ext=self.INPUT_FILE_EXT,
+            num_lanes=num_lanes,
+        )
@@ -2,7 +2,9 @@
 
 from aiida.common import CalcInfo, CodeInfo
 from aiida.engine import CalcJob
-from aiida.orm import Bool, Dict, Int, RemoteData, SinglefileData
+from aiida.orm import Bool, Dict, Int, List, RemoteData, SinglefileData
+
+from aiida_gaussian.utils.parent_folder import get_parent_staging
 
 
 class CubegenCalculation(CalcJob):
@@ -32,6 +34,9 @@ class CubegenCalculation(CalcJob):
         N3 X3 Y3 Z3     # Number of points and step-size in the Z-direction.
 
     See more details at https://gaussian.com/cubegen/
+
+    With 'parent_files' (e.g. ['aiida.fchk']), only these files of the parent folder
+    are staged, instead of the whole folder.
     """
 
     DEFAULT_INPUT_FILE = "aiida.fchk"
@@ -63,6 +68,13 @@ class CubegenCalculation(CalcJob):
             help="In case of npts=-1, use this cube specification.",
         )
 
+        spec.input(
+            "parent_files",
+            valid_type=List,
+            required=False,
+            help="stage only these files of the parent folder (.gz is decompressed)",
+        )
+
         spec.input(
             "retrieve_cubes",
             valid_type=Bool,
@@ -165,16 +177,20 @@ class CubegenCalculation(CalcJob):
                 calcinfo.retrieve_temporary_list.append(cube_name)
 
         # symlink or copy to parent calculation
-        calcinfo.remote_symlink_list = []
-        calcinfo.remote_copy_list = []
-        comp_uuid = self.inputs.parent_calc_folder.computer.uuid
-        remote_path = self.inputs.parent_calc_folder.get_remote_path()
-        copy_info = (comp_uuid, remote_path, self.PARENT_FOLDER_NAME)
-        if self.inputs.code.computer.uuid == comp_uuid:
-            # if running on the same computer - make a symlink
-            # if not - copy the folder
-            calcinfo.remote_symlink_list.append(copy_info)
-        else:
-            calcinfo.remote_copy_list.append(copy_info)
+        parent_files = None
+        if "parent_files" in self.inputs:
+            parent_files = self.inputs.parent_files.get_list()
+            folder.get_subfolder(self.PARENT_FOLDER_NAME, create=True)
+        (
+            calcinfo.remote_copy_list,
+            calcinfo.remote_symlink_list,
+            prepend_lines,
+        ) = get_parent_staging(
+            self.inputs.parent_calc_folder,
+            self.inputs.code.computer,
+            self.PARENT_FOLDER_NAME,
+            parent_files,
+        )
+        calcinfo.prepend_text += "\n".join(prepend_lines)
 
         return calcinfo
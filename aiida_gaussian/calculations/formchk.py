@@ -2,12 +2,17 @@
 
 from aiida.common import CalcInfo, CodeInfo
 from aiida.engine import CalcJob
-from aiida.orm import Bool, RemoteData, Str
+from aiida.orm import Bool, List, RemoteData, Str
+
+from aiida_gaussian.utils.parent_folder import get_parent_staging
 
 
 class FormchkCalculation(CalcJob):
     """
     Very simple plugin to run the formchk utility
+
+    With 'parent_files' (e.g. ['aiida.chk']), only these files of the parent folder
+    are staged, instead of the whole folder.
     """
 
     DEFAULT_INPUT_FILE = "aiida.chk"
@@ -38,6 +43,12 @@ class FormchkCalculation(CalcJob):
             default=lambda: Bool(False),
             help="retrieve the fchk file",
         )
+        spec.input(
+            "parent_files",
+            valid_type=List,
+            required=False,
+            help="stage only these files of the parent folder (.gz is decompressed)",
+        )
 
         # Turn mpi off by default
         spec.input("metadata.options.withmpi", valid_type=bool, default=False)
@@ -64,17 +75,20 @@ class FormchkCalculation(CalcJob):
             calcinfo.retrieve_list.append(self.DEFAULT_OUTPUT_FILE)
 
         # symlink or copy to parent calculation
-        calcinfo.remote_symlink_list = []
-        calcinfo.remote_copy_list = []
-        comp_uuid = self.inputs.parent_calc_folder.computer.uuid
-        remote_path = self.inputs.parent_calc_folder.get_remote_path()
-        copy_info = (comp_uuid, remote_path, self.PARENT_FOLDER_NAME)
-        if (
-            self.inputs.code.computer.uuid == comp_uuid
-        ):  # if running on the same computer - make a symlink
-            # if not - copy the folder
-            calcinfo.remote_symlink_list.append(copy_info)
-        else:
-            calcinfo.remote_copy_list.append(copy_info)
+        parent_files = None
+        if "parent_files" in self.inputs:
+            parent_files = self.inputs.parent_files.get_list()
+            folder.get_subfolder(self.PARENT_FOLDER_NAME, create=True)
+        (
+            calcinfo.remote_copy_list,
+            calcinfo.remote_symlink_list,
+            prepend_lines,
+        ) = get_parent_staging(
+            self.inputs.parent_calc_folder,
+            self.inputs.code.computer,
+            self.PARENT_FOLDER_NAME,
+            parent_files,
+        )
+        calcinfo.prepend_text = "\n".join(prepend_lines)
 
         return calcinfo
@@ -1,13 +1,186 @@
 """Gaussian input plugin."""
-from aiida.common import CalcInfo, CodeInfo
+import copy
+
+from aiida.common import CalcInfo, CodeInfo, exceptions
+from aiida.common.links import LinkType
 
 # from aiida.cmdline.utils import echo
 from aiida.engine import CalcJob
-from aiida.orm import Dict, Float, RemoteData
+from aiida.orm import CalcJobNode, Dict, Float, List, RemoteData
+from aiida.orm.nodes.process.calculation.calcjob import CalcJobNodeCaching
 from aiida.plugins import DataFactory
-from pymatgen.io.gaussian import GaussianInput
+
+from aiida_gaussian.utils.caching import (
+    get_content_hash,
+    get_normalized_parameters,
+    get_rounded_structure,
+    normalize_parameters,
+    serialize_parameters,
+)
+from aiida_gaussian.utils.gaussian_input import render_gaussian_input
+from aiida_gaussian.utils.parent_folder import (
+    COMPRESSED_EXT,
+    get_compress_lines,
+    get_parent_staging,
+)
+from aiida_gaussian.utils.resources import (
+    CPU_PINNING_TEMPLATE,
+    DEFAULT_MEMORY_MARGIN,
+    get_cores_per_machine,
+    get_memory_mb,
+    get_resource_conflicts,
+)
 
 StructureData = DataFactory("core.structure")
+ArrayData = DataFactory("core.array")
+TrajectoryData = DataFactory("core.array.trajectory")
+
+# Shell commands that list the (unique) nodes of the allocation, comma separated,
+# for the Linda workers (GAUSS_WDEF is the environment variable of %LindaWorkers)
+LINDA_NODE_LIST_COMMANDS = {
+    "core.slurm": 'scontrol show hostnames "$SLURM_JOB_NODELIST" | paste -sd, -',
+    "core.pbspro": 'sort -u "$PBS_NODEFILE" | paste -sd, -',
+    "core.torque": 'sort -u "$PBS_NODEFILE" | paste -sd, -',
+}
+
+# Run in a node-local scratch folder: the input and the parent folder are staged in,
+# and on exit (also when failing or killed) the output, the chk and the requested
+# files are copied back to the working directory and the scratch folder is removed.
+LOCAL_SCRATCH_TEMPLATE = """\
+export GAUSS_SCRDIR=$(mktemp -d "{scratch}/aiida-gaussian.XXXXXX")
+aiida_workdir=$(pwd)
+cp {input_file} "$GAUSS_SCRDIR"/
+if [ -e {parent_folder} ]; then ln -s "$aiida_workdir/{parent_folder}" "$GAUSS_SCRDIR"/; fi
+gaussian_stage_out() {{
+    cd "$GAUSS_SCRDIR"
+    for f in {stage_out}; do
+        if [ -e "$f" ]; then cp "$f" "$aiida_workdir"/; fi
+    done
+    cd "$aiida_workdir"
+    rm -rf "$GAUSS_SCRDIR"
+}}
+trap gaussian_stage_out EXIT
+trap 'exit 143' TERM INT
+cd "$GAUSS_SCRDIR\""""
+
+
+class GaussianCalcJobNodeCaching(CalcJobNodeCaching):
+    """Caching of GaussianCalculation nodes, with the inputs hashed in canonical form
+
+    The parameters are hashed normalized and the structure rounded (see
+    utils.caching), so that equivalent calculations are found in the cache. The
+    input nodes themselves are not modified.
+    """
+
+    CANONICAL_INPUTS = {
+        "parameters": get_normalized_parameters,
+        "structure": get_rounded_structure,
+    }
+
+    def get_objects_to_hash(self):
+        objects = super().get_objects_to_hash()
+        incoming = self._node.base.links.get_incoming(link_type=LinkType.INPUT_CALC)
+        for label, get_canonical in self.CANONICAL_INPUTS.items():
+            try:
+                node = incoming.get_node_by_label(label)
+            except exceptions.NotExistent:
+                continue
+            objects["inputs"][label] = get_content_hash(get_canonical(node))
+        return objects
+
+
+class GaussianCalcJobNode(CalcJobNode):
+    """Node of a GaussianCalculation
+
+    Its node type ('process.calculation.calcjob.gaussian.GaussianCalcJobNode.')
+    differs from the one of the CalcJobNode of calculations run with earlier
+    versions, and the cache is only searched among nodes of the same type. These
+    calculations are therefore not reused from the cache, but still found by
+    queries for CalcJobNode (which include subclasses) or for the process type.
+    """
+
+    _CLS_NODE_CACHING = GaussianCalcJobNodeCaching
+
+
+def validate_linda(value):
+    """Validate the Linda parallelization against the resources and the scheduler."""
+    options = value.get("metadata", {}).get("options", {})
+    resources = options.get("resources", {})
+
+    if not resources.get("num_machines"):
+        return "The 'linda' setting requires the 'num_machines' resource."
+    cores_per_machine = get_cores_per_machine(resources)
+    if not cores_per_machine:
+        return "The 'linda' setting requires the number of cores per machine."
+    if options.get("withmpi"):
+        return "The 'linda' setting is incompatible with 'withmpi'."
+
+    if "code" in value:
+        scheduler_type = value["code"].computer.scheduler_type
+        if scheduler_type not in LINDA_NODE_LIST_COMMANDS:
+            return f"The 'linda' setting is not supported for '{scheduler_type}'."
+
+    link0 = {
+        key.lower(): val
+        for key, val in (value["parameters"].get("link0_parameters") or {}).items()
+    }
+    for key in ("%lindaworkers", "%nproclinda"):
+        if key in link0:
+            return f"'{key}' is set by the 'linda' setting."
+    if "%nprocshared" in link0 and int(link0["%nprocshared"]) != cores_per_machine:
+        return (
+            f"'%nprocshared={link0['%nprocshared']}' does not match "
+            f"the {cores_per_machine} cores per machine."
+        )
+    return None
+
+
+def validate_auto_resources(value):
+    """Validate that the resources define the parallelization and fit the link0."""
+    options = value.get("metadata", {}).get("options", {})
+    resources = options.get("resources", {})
+    settings = value["settings"].get_dict()
+
+    if not get_cores_per_machine(resources):
+        return "The 'auto_resources' setting requires the number of cores per machine."
+    if resources.get("num_machines", 1) > 1 and not settings.get("linda", False):
+        return "Gaussian runs on a single machine, unless the 'linda' setting is used."
+
+    link0s = [value["parameters"].get("link0_parameters")]
+    if "step_parameters" in value:
+        link0s += [
+            step.get("link0_parameters") for step in value["step_parameters"].get_list()
+        ]
+    for link0 in link0s:
+        conflicts = get_resource_conflicts(
+            link0, resources, options.get("max_memory_kb")
+        )
+        if conflicts:
+            return " ".join(conflicts)
+    return None
+
+
+def validate_inputs(value, _):
+    """Validate the combination of the inputs."""
+    if "step_parameters" in value:
+        link0 = value["parameters"].get("link0_parameters") or {}
+        if "%chk" not in {key.lower() for key in link0}:
+            return (
+                "Chaining steps with 'step_parameters' requires "
+                "a '%chk' link0 parameter."
+            )
+    if "settings" in value and value["settings"].get("linda", False):
+        message = validate_linda(value)
+        if message is not None:
+            return message
+    if "settings" in value and value["settings"].get("auto_resources", False):
+        message = validate_auto_resources(value)
+        if message is not None:
+            return message
+    if "settings" in value and value["settings"].get("local_scratch"):
+        if value["settings"].get("linda", False):
+            return "The 'local_scratch' setting is not supported with 'linda'."
+    return None
 
 
 class GaussianCalculation(CalcJob):
@@ -33,6 +206,44 @@ class GaussianCalculation(CalcJob):
         },
     })
 
+    Further steps can be chained in the same job with the 'step_parameters' input,
+    a list of parameter dicts that are written as --Link1-- jobs sharing the '%chk'.
+    Unless specified, a step takes over the link0 parameters, functional, basis set,
+    charge and multiplicity, and gets 'geom': 'allcheck' and 'guess': 'read'.
+    The outputs of each step but the last are nested in 'step_1', 'step_2', ...,
+    and the outputs of the last step are the top-level outputs.
+
+    With settings={'linda': True}, a single calculation runs across all machines of
+    the allocation: one Linda worker per machine (the node list is read from the
+    scheduler at runtime) with '%nprocshared' set to the cores per machine.
+    This requires a Linda-enabled Gaussian build and passwordless ssh between nodes.
+
+    With settings={'auto_resources': True}, '%nprocshared' and '%mem' are derived from
+    'metadata.options.resources' and 'max_memory_kb', keeping a fraction
+    'memory_margin' (default 0.1) of the memory for Gaussian's overhead. Unless
+    'pin_cpus' is False, the threads are pinned with %CPU (GAUSS_CDEF) to the cores
+    the scheduler bound the job to. Explicit link0 values are kept, but values that
+    exceed the allocation are rejected (and only logged without 'auto_resources').
+
+    The parameters are normalized before rendering (see utils.caching), and plain
+    dictionaries passed as 'parameters' are stored normalized. For caching, the
+    parameters and the structure are hashed in canonical form (normalized and
+    rounded, see GaussianCalcJobNode), so that equivalent calculations have
+    the same hash also when the nodes differ.
+
+    With settings={'local_scratch': '/path/on/node'} (e.g. '$TMPDIR'), Gaussian runs in
+    a temporary folder there, so that the scratch files (GAUSS_SCRDIR) stay off the
+    shared filesystem. At the end of the job, also when it fails or is killed, the
+    output, the chk files and the files matching the 'scratch_stage_out' patterns
+    are copied back to the working directory and the temporary folder is removed.
+
+    With the 'parent_files' input (e.g. ['aiida.chk']), only these files of the
+    'parent_calc_folder' are staged (instead of the whole folder); files ending
+    in '.gz' are decompressed at the start of the job. To transfer less data,
+    with settings={'compress_files': ['aiida.chk']} the files are compressed
+    at the end of the job, next to the uncompressed ones, for the restarts that
+    stage e.g. ['aiida.chk.gz'].
+
     """
 
     # Defaults
@@ -41,6 +252,8 @@ class GaussianCalculation(CalcJob):
     PARENT_FOLDER_NAME = "parent_calc"
     DEFAULT_PARSER = "gaussian.base"
 
+    _node_class = GaussianCalcJobNode
+
     @classmethod
     def define(cls, spec):
         super().define(spec)
@@ -54,7 +267,17 @@ class GaussianCalculation(CalcJob):
         )
 
         spec.input(
-            "parameters", valid_type=Dict, required=True, help="Input parameters"
+            "parameters",
+            valid_type=Dict,
+            required=True,
+            serializer=serialize_parameters,
+            help="Input parameters",
+        )
+        spec.input(
+            "step_parameters",
+            valid_type=List,
+            required=False,
+            help="Parameters of further steps, chained with --Link1-- on the same chk",
         )
         spec.input(
             "settings",
@@ -70,6 +293,13 @@ class GaussianCalculation(CalcJob):
             help="the folder of a completed gaussian calculation",
         )
 
+        spec.input(
+            "parent_files",
+            valid_type=List,
+            required=False,
+            help="stage only these files of the parent folder (.gz is decompressed)",
+        )
+
         # Turn mpi off by default
         spec.input("metadata.options.withmpi", valid_type=bool, default=False)
 
@@ -80,6 +310,8 @@ class GaussianCalculation(CalcJob):
             non_db=True,
         )
 
+        spec.inputs.validator = validate_inputs
+
         # Outputs
         spec.output(
             "output_parameters",
@@ -93,6 +325,30 @@ class GaussianCalculation(CalcJob):
             required=False,
             help="Final optimized structure, if available",
         )
+        spec.output(
+            "output_trajectory",
+            valid_type=TrajectoryData,
+            required=False,
+            help="Geometries, energies, forces and convergence criteria of the optimization steps",
+        )
+        spec.output(
+            "output_vibrations",
+            valid_type=ArrayData,
+            required=False,
+            help="Normal modes and vibrational thermochemistry (advanced parser)",
+        )
+        spec.output(
+            "output_scan",
+            valid_type=ArrayData,
+            required=False,
+            help="Coordinates, energies and geometries of a scan (advanced parser)",
+        )
+        spec.output(
+            "output_irc",
+            valid_type=ArrayData,
+            required=False,
+            help="Reaction coordinate, energies and geometries of an IRC (advanced parser)",
+        )
         spec.output(
             "energy_ev",
             valid_type=Float,
@@ -139,6 +395,11 @@ class GaussianCalculation(CalcJob):
             "ERROR_INACCURATE_QUADRATURE_CALDSU",
             message="The calculation was terminated due to an inaccurate quadrature in CalDSu.",
         )
+        spec.exit_code(
+            304,
+            "ERROR_OUT_OF_MEMORY",
+            message="The calculation was terminated as it ran out of memory.",
+        )
         spec.exit_code(
             390,
             "ERROR_TERMINATION",
@@ -160,28 +421,99 @@ class GaussianCalculation(CalcJob):
                            the plugin should put all its files.
         """
 
-        if "structure" in self.inputs:
-            pmg_structure = self.inputs.structure.get_pymatgen_molecule()
+        settings = self.inputs.settings.get_dict() if "settings" in self.inputs else {}
+
+        # If structure is not specified, it is read from the chk file
+        structure = self.inputs.structure if "structure" in self.inputs else None
+
+        use_pymatgen = settings.pop("input_renderer", "native") == "pymatgen"
+        if structure is not None and (structure.is_alloy or structure.has_vacancies):
+            use_pymatgen = True
+
+        # Link0 parameters and environment derived from the resources
+        # Equivalent parameters (e.g. differing in case) give the same input file
+        parameters = normalize_parameters(self.inputs.parameters.get_dict())
+        link0_updates = {}
+        prepend_lines = []
+        linda = settings.pop("linda", False)
+        if settings.pop("auto_resources", False):
+            link0_updates.update(
+                self._get_auto_link0(
+                    parameters.get("link0_parameters"),
+                    settings.pop("memory_margin", DEFAULT_MEMORY_MARGIN),
+                )
+            )
+            if "%nprocshared" in link0_updates and not linda:
+                if settings.pop("pin_cpus", True):
+                    num_cores = link0_updates.pop("%nprocshared")
+                    prepend_lines.append(
+                        CPU_PINNING_TEMPLATE.format(num_cores=num_cores)
+                    )
         else:
-            # If structure is not specified, it is read from the chk file
-            pmg_structure = None
+            self._warn_resource_conflicts(parameters.get("link0_parameters"))
+        if linda:
+            link0_updates.update(self._get_linda_link0())
+            prepend_lines.append(self._get_linda_prepend_text())
+
+        self._update_link0(parameters, link0_updates)
 
         # Generate the input file
-        input_string = GaussianCalculation._render_input_string_from_params(
-            self.inputs.parameters.get_dict(), pmg_structure
-        )
+        if use_pymatgen:
+            input_string = GaussianCalculation._render_input_string_pymatgen(
+                copy.deepcopy(parameters), structure
+            )
+        else:
+            input_string = GaussianCalculation._render_input_string_native(
+                copy.deepcopy(parameters),
+                structure,
+                allcheck=self._is_allcheck(parameters),
+            )
 
-        # Handle Ghost atoms (e.g. when doing NICS calculations)
-        # Atoms with symbol 'X' in input structure are considered Ghost atoms.
-        # Pymatgen converts these into `X0+` in the input script
-        # and Gaussian needs these to be called `Bq`.
-        if pmg_structure and "X0+" in pmg_structure.labels:
-            input_string = input_string.replace("X0+", "Bq")
+        if "step_parameters" in self.inputs:
+            steps = self.get_link1_steps(
+                normalize_parameters(self.inputs.parameters.get_dict()),
+                [
+                    normalize_parameters(step)
+                    for step in self.inputs.step_parameters.get_list()
+                ],
+            )
+            for step in steps[1:]:
+                self._update_link0(step, link0_updates)
+                input_string += "--Link1--\n"
+                input_string += GaussianCalculation._render_input_string_native(
+                    step, None, allcheck=self._is_allcheck(step)
+                )
 
         with open(folder.get_abs_path(self.INPUT_FILE), "w") as out_file:
             out_file.write(input_string)
 
-        settings = self.inputs.settings.get_dict() if "settings" in self.inputs else {}
+        # symlink or copy to parent calculation
+        remote_copy_list, remote_symlink_list = [], []
+        if "parent_calc_folder" in self.inputs:
+            parent_files = None
+            if "parent_files" in self.inputs:
+                parent_files = self.inputs.parent_files.get_list()
+                folder.get_subfolder(self.PARENT_FOLDER_NAME, create=True)
+            remote_copy_list, remote_symlink_list, parent_lines = get_parent_staging(
+                self.inputs.parent_calc_folder,
+                self.inputs.code.computer,
+                self.PARENT_FOLDER_NAME,
+                parent_files,
+            )
+            prepend_lines += parent_lines
+
+        compress_files = settings.pop("compress_files", [])
+
+        # has to be the last, as it changes to the scratch folder
+        local_scratch = settings.pop("local_scratch", None)
+        if local_scratch:
+            prepend_lines.append(
+                self._get_local_scratch_prepend_text(
+                    local_scratch,
+                    settings.pop("scratch_stage_out", [])
+                    + [fname + COMPRESSED_EXT for fname in compress_files],
+                )
+            )
 
         # create code info
         codeinfo = CodeInfo()
@@ -201,29 +533,148 @@ class GaussianCalculation(CalcJob):
         calcinfo.stdout_name = self.OUTPUT_FILE
         calcinfo.codes_info = [codeinfo]
         calcinfo.retrieve_list = [self.OUTPUT_FILE]
-
-        # symlink or copy to parent calculation
-        calcinfo.remote_symlink_list = []
-        calcinfo.remote_copy_list = []
-        if "parent_calc_folder" in self.inputs:
-            comp_uuid = self.inputs.parent_calc_folder.computer.uuid
-            remote_path = self.inputs.parent_calc_folder.get_remote_path()
-            copy_info = (comp_uuid, remote_path, self.PARENT_FOLDER_NAME)
-            if self.inputs.code.computer.uuid == comp_uuid:
-                # if running on the same computer - make a symlink
-                # if not - copy the folder
-                calcinfo.remote_symlink_list.append(copy_info)
-            else:
-                calcinfo.remote_copy_list.append(copy_info)
+        calcinfo.prepend_text = "\n".join(prepend_lines)
+        calcinfo.append_text = "\n".join(get_compress_lines(compress_files))
+        calcinfo.remote_symlink_list = remote_symlink_list
+        calcinfo.remote_copy_list = remote_copy_list
 
         return calcinfo
 
+    def _get_auto_link0(self, link0_parameters, memory_margin):
+        """Derive the link0 parameters not set explicitly from the resources."""
+        options = self.inputs.metadata.options
+        link0 = {"%nprocshared": str(get_cores_per_machine(options.resources))}
+        if options.get("max_memory_kb"):
+            link0["%mem"] = f"{get_memory_mb(options.max_memory_kb, memory_margin)}MB"
+
+        explicit = {key.lower() for key in (link0_parameters or {})}
+        if "%cpu" in explicit:
+            explicit.add("%nprocshared")
+        return {key: val for key, val in link0.items() if key not in explicit}
+
+    def _warn_resource_conflicts(self, link0_parameters):
+        """Log the link0 parameters that exceed the allocation."""
+        options = self.inputs.metadata.options
+        for conflict in get_resource_conflicts(
+            link0_parameters, options.resources, options.get("max_memory_kb")
+        ):
+            self.logger.warning(conflict)
+
+    def _get_local_scratch_prepend_text(self, scratch, stage_out):
+        """Run in node-local scratch and stage out the outputs on exit."""
+        return LOCAL_SCRATCH_TEMPLATE.format(
+            scratch=scratch.rstrip("/"),
+            input_file=self.INPUT_FILE,
+            parent_folder=self.PARENT_FOLDER_NAME,
+            stage_out=" ".join([self.OUTPUT_FILE, "*.chk"] + list(stage_out)),
+        )
+
+    def _get_linda_link0(self):
+        """Shared-memory parallelization of each Linda worker."""
+        resources = self.inputs.metadata.options.resources
+        return {"%nprocshared": str(get_cores_per_machine(resources))}
+
+    def _get_linda_prepend_text(self):
+        """Export the nodes of the allocation as the Linda workers."""
+        scheduler_type = self.inputs.code.computer.scheduler_type
+        return f"export GAUSS_WDEF=$({LINDA_NODE_LIST_COMMANDS[scheduler_type]})"
+
+    @staticmethod
+    def _update_link0(parameters, link0_updates):
+        """Set the link0 parameters in-place, replacing keys that differ only in case."""
+        if not link0_updates:
+            return
+        link0 = {
+            key: val
+            for key, val in (parameters.get("link0_parameters") or {}).items()
+            if key.lower() not in link0_updates
+        }
+        link0.update(link0_updates)
+        parameters["link0_parameters"] = link0
+
     @classmethod
-    def _render_input_string_from_params(cls, parameters, pmg_structure):
-        """Generate the Gaussian input file using pymatgen."""
+    def get_link1_steps(cls, parameters, step_parameters):
+        """Return the full parameters of each step, the first one being 'parameters'."""
+        steps = [parameters]
+        for step in step_parameters:
+            full_step = {
+                key: copy.deepcopy(parameters[key])
+                for key in (
+                    "link0_parameters",
+                    "functional",
+                    "basis_set",
+                    "charge",
+                    "multiplicity",
+                    "dieze_tag",
+                )
+                if key in parameters
+            }
+            full_step.update(copy.deepcopy(step))
+
+            route = dict(full_step.get("route_parameters") or {})
+            route_keys = {key.lower() for key in route}
+            if "geom" not in route_keys:
+                route["geom"] = "allcheck"
+            if "guess" not in route_keys:
+                route["guess"] = "read"
+            full_step["route_parameters"] = route
+
+            steps.append(full_step)
+        return steps
+
+    @classmethod
+    def _is_allcheck(cls, parameters):
+        """Whether the molecule specification is read from the chk (Geom=AllCheck).
+
+        The 'geom' option can also be one of several, e.g. {'modredundant': None,
+        'allcheck': None}.
+        """
+        for key, value in (parameters.get("route_parameters") or {}).items():
+            if key.lower() != "geom":
+                continue
+            if isinstance(value, dict):
+                return "allcheck" in {option.lower() for option in value}
+            return str(value).lower() == "allcheck"
+        return False
+
+    @classmethod
+    def _set_default_render_params(cls, parameters):
+        """Set the plugin defaults to the parameters passed to the renderers."""
         parameters.setdefault("dieze_tag", "#N")
         parameters.setdefault("spin_multiplicity", parameters.pop("multiplicity", None))
         parameters["title"] = "input generated by the aiida-gaussian plugin"
+
+    @classmethod
+    def _render_input_string_native(cls, parameters, structure, allcheck=False):
+        """Generate the Gaussian input file directly from the StructureData."""
+        cls._set_default_render_params(parameters)
+        return render_gaussian_input(structure, allcheck=allcheck, **parameters)
+
+    @classmethod
+    def _render_input_string_pymatgen(cls, parameters, structure):
+        """Generate the Gaussian input file through a pymatgen Molecule."""
+        if structure is not None:
+            pmg_structure = structure.get_pymatgen_molecule()
+        else:
+            pmg_structure = None
+
+        input_string = cls._render_input_string_from_params(parameters, pmg_structure)
+
+        # Handle Ghost atoms (e.g. when doing NICS calculations)
+        # Atoms with symbol 'X' in input structure are considered Ghost atoms.
+        # Pymatgen converts these into `X0+` in the input script
+        # and Gaussian needs these to be called `Bq`.
+        if pmg_structure and "X0+" in pmg_structure.labels:
+            input_string = input_string.replace("X0+", "Bq")
+
+        return input_string
+
+    @classmethod
+    def _render_input_string_from_params(cls, parameters, pmg_structure):
+        """Generate the Gaussian input file using pymatgen."""
+        from pymatgen.io.gaussian import GaussianInput
+
+        cls._set_default_render_params(parameters)
         gaussian_input = GaussianInput(pmg_structure, **parameters)
         try:
             return gaussian_input.to_string(cart_coords=True)
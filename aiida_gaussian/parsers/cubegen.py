@@ -1,18 +1,31 @@
 """AiiDA-Gaussian output parser"""
 
+import io
 import os
 
 import numpy as np
 from aiida.common import NotExistent
 from aiida.engine import ExitCode
-from aiida.orm import ArrayData, FolderData
+from aiida.orm import ArrayData, Dict, FolderData
 from aiida.parsers import Parser
 
 from aiida_gaussian.utils.cube import Cube
 
 
 class CubegenBaseParser(Parser):
-    """Cubegen parser that creates 2d slices of the generated cube files"""
+    """Cubegen parser that creates 2d slices of the generated cube files
+
+    Options in the 'parser_params' input:
+        heights: list of heights [ang] above the topmost atom for the slices
+        orient_cube: re-orient the cube such that the molecule is flat in z
+        dtype: precision of the cube data and output arrays (e.g. "float32")
+        store_cubes: store the full cubes as compressed .npz in 'cube_files'
+        cube_chunk_size: number of planes per compressed chunk of the .npz cubes
+        analytics: compute integrals of the cubes into 'cube_analytics'
+            (True or a dict with the options 'isovalues' and 'sphere_radius' [ang])
+        pyramid: store block-averaged cubes in 'cube_pyramid_array'
+            (True for the factors [2, 4, 8] or a list of downsampling factors)
+    """
 
     def parse(self, **kwargs):
         """Receives in input a dictionary of retrieved nodes. Does all the logic here."""
@@ -59,7 +72,27 @@ class CubegenBaseParser(Parser):
         if "orient_cube" in parser_params:
             orient_cube = parser_params["orient_cube"]
 
+        # Precision of the cube data and of the output arrays (e.g. "float32")
+        dtype = np.dtype(parser_params.get("dtype", "float64"))
+
+        # Optionally store the full cubes in a compressed (and chunked) numpy layout
+        store_cubes = parser_params.get("store_cubes", False)
+        cube_chunk_size = parser_params.get("cube_chunk_size", None)
+
+        # Optionally compute reductions of the full cubes while they are in memory
+        analytics = parser_params.get("analytics", False)
+        if analytics is True:
+            analytics = {}
+
+        # Optionally store coarse versions of the full cubes for fast visualization
+        pyramid = parser_params.get("pyramid", False)
+        if pyramid is True:
+            pyramid = [2, 4, 8]
+
         out_array = ArrayData()
+        cube_files = FolderData()
+        cube_analytics = {}
+        pyramid_array = ArrayData()
 
         add_suppl = True
 
@@ -68,11 +101,35 @@ class CubegenBaseParser(Parser):
                 if filename.endswith(".cube"):
 
                     with retrieved_fd.open(filename) as handle:
-                        cube = Cube.from_file_handle(handle)
+                        cube = Cube.from_file_handle(handle, dtype=dtype)
+
+                    arr_label = "cube_" + os.path.splitext(filename)[0].replace(
+                        "-", ""
+                    ).replace("+", "")
+
+                    if analytics is not False:
+                        cube_analytics[arr_label] = self._get_cube_analytics(
+                            cube, analytics
+                        )
+
+                    if store_cubes:
+                        npz_handle = io.BytesIO()
+                        cube.write_npz_file_handle(
+                            npz_handle, chunk_size=cube_chunk_size
+                        )
+                        npz_handle.seek(0)
+                        cube_files.base.repository.put_object_from_filelike(
+                            npz_handle, os.path.splitext(filename)[0] + ".npz"
+                        )
 
                     if orient_cube:
                         self._orient_cube(cube)
 
+                    if pyramid:
+                        self._add_pyramid_levels(
+                            pyramid_array, cube, arr_label, pyramid, add_suppl
+                        )
+
                     cube_data = None
                     h_added = []
 
@@ -94,10 +151,6 @@ class CubegenBaseParser(Parser):
                         # None of the heights were inside the calculated box
                         return
 
-                    arr_label = "cube_" + os.path.splitext(filename)[0].replace(
-                        "-", ""
-                    ).replace("+", "")
-
                     out_array.set_array(arr_label, cube_data)
 
                     if add_suppl:
@@ -108,6 +161,49 @@ class CubegenBaseParser(Parser):
 
         self.out("cube_planes_array", out_array)
 
+        if store_cubes:
+            self.out("cube_files", cube_files)
+
+        if analytics is not False:
+            self.out("cube_analytics", Dict(cube_analytics))
+
+        if pyramid:
+            self.out("cube_pyramid_array", pyramid_array)
+
+    def _add_pyramid_levels(self, pyramid_array, cube, arr_label, factors, add_suppl):
+        """Add the block-averaged levels of the cube to the pyramid array
+
+        The arrays are labelled e.g. 'cube_homo_x4'; the grid origin and cell [au]
+        of each level are stored once per level as 'origin_x4' and 'cell_x4'.
+        """
+        for factor, level in zip(sorted(factors), cube.get_pyramid(factors)):
+            pyramid_array.set_array("%s_x%d" % (arr_label, factor), level.data)
+            if add_suppl:
+                pyramid_array.set_array("origin_x%d" % factor, level.origin)
+                pyramid_array.set_array("cell_x%d" % factor, level.cell)
+
+    def _get_cube_analytics(self, cube, options):
+        """Vectorized reductions of the full cube
+
+        The dipole moment is only meaningful for electron density cubes
+        and the atomic sphere integrals e.g. give spin populations for spin cubes.
+        """
+        isovalues = options.get("isovalues", [0.05])
+        sphere_radius = options.get("sphere_radius", 1.0)
+
+        return {
+            "integral": float(cube.integrate()),
+            "dipole_moment_au": cube.get_dipole_moment().tolist(),
+            "sphere_radius": sphere_radius,
+            "atomic_sphere_integrals": cube.get_atomic_sphere_integrals(
+                sphere_radius
+            ).tolist(),
+            "isovalues": list(isovalues),
+            "isovalue_volumes_ang3": [
+                float(cube.get_isovalue_volume(iso)) for iso in isovalues
+            ],
+        }
+
     def _orient_cube(self, cube):
         """Swap cube axes such that
         index 0 has the longest-spanning dimension
@@ -2,27 +2,154 @@
 
 import datetime
 import io
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 
-import ase
-import cclib
 import numpy as np
-from aiida.common import NotExistent
+from aiida.common import AttributeDict, NotExistent
 from aiida.engine import ExitCode
-from aiida.orm import Dict, Float, StructureData
+from aiida.orm import ArrayData, Dict, Float, StructureData, TrajectoryData
 from aiida.parsers import Parser
 
+from aiida_gaussian.utils.caching import normalize_parameters
+from aiida_gaussian.utils.thermochemistry import (
+    DEFAULT_FREQUENCY_CUTOFF,
+    DEFAULT_TEMPERATURES,
+    get_vibrational_thermochemistry,
+)
+
 NUM_RE = r"[-+]?(?:[0-9]*[.])?[0-9]+(?:[eE][-+]?\d+)?"
 
+# Messages of Gaussian failing to allocate memory (%mem too small or not available),
+# e.g. "galloc:  could not allocate memory."
+OUT_OF_MEMORY_MESSAGES = ("could not allocate memory", "Out-of-memory error")
+
+# Jobs of a multi-job log with at least this many characters are parsed with
+# cclib in parallel processes, if there are several of them
+PARALLEL_PARSE_MIN_SIZE = 10 * 1024**2
+
+# Gaussian prints this line before each --Link1-- job and each internal step of a
+# compound job (e.g. 'opt freq'); the routes of the latter contain 'GenChk'
+LINK1_STEP_MESSAGE = "Link1:  Proceeding to internal job step number"
+GENERATED_ROUTE_KEYWORD = "genchk"
+
+# Arrays of the output trajectory for the columns of cclib's 'geovalues',
+# in the order of the Gaussian convergence table
+GEOVALUE_ARRAYS = ("max_force", "rms_force", "max_displacement", "rms_displacement")
+
+# Arrays of the output vibrations for the cclib vibrational attributes
+VIBRATION_ARRAYS = {
+    "vibfreqs": "frequencies",
+    "vibirs": "ir_intensities",
+    "vibramans": "raman_activities",
+    "vibrmasses": "reduced_masses",
+    "vibfconsts": "force_constants",
+}
+
+
+def parse_log_cclib(log_file_string):
+    """Parse the log with cclib into a (serializable) dictionary, or None
+
+    Module-level function, such that it can be run in another process.
+    """
+    # cclib is slow to import, so only import it when a log is parsed
+    import cclib
+
+    data = cclib.io.ccread(io.StringIO(log_file_string))
+
+    if data is None:
+        return None
+
+    property_dict = data.getattributes()
+
+    def make_serializeable(data):
+        """Recursively go through the dictionary and convert unserializeable values in-place:
+
+        1) In numpy arrays:
+            * ``nan`` -> ``0.0``
+            * ``inf`` -> large number
+        2) datetime.timedelta (introduced in cclib v1.8) -> convert to seconds
+
+        :param data: A mapping of data.
+        """
+        if isinstance(data, dict):
+            for key, value in data.items():
+                data[key] = make_serializeable(value)
+        elif isinstance(data, list):
+            for index, item in enumerate(data):
+                data[index] = make_serializeable(item)
+        elif isinstance(data, np.ndarray):
+            np.nan_to_num(data, copy=False)
+        elif isinstance(data, datetime.timedelta):
+            data = data.total_seconds()
+        return data
+
+    make_serializeable(property_dict)
+
+    return property_dict
+
+
+def get_homo_lumo_gaps(moenergies, homos):
+    """HOMO-LUMO gap from the cclib 'moenergies' and 'homos'
+
+    :return: dictionary with the 'gap' and, for two spin channels, the gaps
+        'gap_a' and 'gap_b' of each channel; empty if it cannot be determined
+    """
+    nspin = len(homos)
+    mo_e = np.array(moenergies)
+
+    # if either HOMO is negative, such as in the case of H, don't extract gap
+    if any(h < 0 for h in homos):
+        return {}
+    try:
+        if nspin == 1:
+            ih_s0 = homos[0]
+            return {"gap": mo_e[0][ih_s0 + 1] - mo_e[0][ih_s0]}
+        if nspin == 2:
+            ih_s0 = homos[0]
+            ih_s1 = homos[1]
+            max_homo = np.max([mo_e[0, ih_s0], mo_e[1, ih_s1]])
+            min_lumo = np.min([mo_e[0, ih_s0 + 1], mo_e[1, ih_s1 + 1]])
+            return {
+                # effective gap:
+                "gap": min_lumo - max_homo,
+                # gaps for each spin channel separately:
+                "gap_a": mo_e[0, ih_s0 + 1] - mo_e[0, ih_s0],
+                "gap_b": mo_e[1, ih_s1 + 1] - mo_e[1, ih_s1],
+            }
+    except IndexError:
+        # In some cases, such as a very small basis set,
+        # the parsed MOs don't include LUMO and an IndexError is raised.
+        # Just skip the gap determination in this case
+        pass
+    return {}
+
 
 class GaussianBaseParser(Parser):
     """
     Basic AiiDA parser for the output of Gaussian
 
     Parses default cclib output as 'output_parameters' node and separates final SCF
-    energy as 'energy_ev' and output structure as 'output_structure' (if applicable)
+    energy as 'energy_ev' and output structure as 'output_structure' (if applicable).
+    For optimizations, all steps are also set as 'output_trajectory'.
+
+    For steps chained with --Link1-- ('step_parameters' input), or any log that
+    contains several jobs, each job is parsed (and checked for termination)
+    separately. The outputs of each step but the last are nested in the 'step_<n>'
+    namespace, the outputs of the last step are the top-level outputs. Large jobs
+    are parsed in parallel.
     """
 
+    # If set, the outputs are nested in this namespace (e.g. for bundled jobs)
+    _output_namespace = None
+
+    def out(self, link_label, node):
+        if self._output_namespace is not None:
+            link_label = f"{self._output_namespace}.{link_label}"
+        super().out(link_label, node)
+
     def parse(self, **kwargs):
         """Receives in input a dictionary of retrieved nodes. Does all the logic here."""
         fname = self.node.process_class.OUTPUT_FILE
@@ -37,17 +164,144 @@ class GaussianBaseParser(Parser):
         except OSError:
             return self.exit_codes.ERROR_OUTPUT_LOG_READ
 
-        exit_code = self._parse_log(log_file_string, self.node.inputs)
+        segments = self._split_link1_log(log_file_string)
+
+        if "step_parameters" in self.node.inputs:
+            steps = self.node.process_class.get_link1_steps(
+                normalize_parameters(self.node.inputs.parameters.get_dict()),
+                [
+                    normalize_parameters(step)
+                    for step in self.node.inputs.step_parameters.get_list()
+                ],
+            )
+            exit_code = self._parse_link1_steps(segments, steps)
+        elif len(segments) > 1 and "parameters" in self.node.inputs:
+            # e.g. --Link1-- in 'input_parameters': the steps are not known
+            parameters = normalize_parameters(self.node.inputs.parameters.get_dict())
+            exit_code = self._parse_link1_steps(segments, [parameters] * len(segments))
+        else:
+            exit_code = self._parse_log(log_file_string, self.node.inputs)
+
+        # a log without termination is the consequence of the job being killed:
+        # keep the exit code of the scheduler (set on the node before parsing)
+        walltime_exit_code = self.exit_codes.ERROR_SCHEDULER_OUT_OF_WALLTIME
+        if (
+            exit_code == self.exit_codes.ERROR_NO_NORMAL_TERMINATION
+            and self.node.exit_status == walltime_exit_code.status
+        ):
+            return walltime_exit_code
 
         if exit_code is not None:
             return exit_code
 
         return ExitCode(0)
 
-    def _parse_log(self, log_file_string, inputs):
+    def _parse_link1_steps(self, segments, steps):
+        """Parse each --Link1-- step but the last into its own namespace
+
+        :param segments: the log of each job, see _split_link1_log
+        :param steps: the (normalized) parameters of each step
+        """
+        property_dicts = self._parse_segments_in_parallel(segments[: len(steps)])
+
+        for i_step, step in enumerate(steps):
+            if i_step >= len(segments):
+                # Gaussian stopped before reaching this step
+                return self.exit_codes.ERROR_NO_NORMAL_TERMINATION
+
+            # the outputs of the last step are the top-level outputs
+            if i_step < len(steps) - 1:
+                self._output_namespace = f"step_{i_step + 1}"
+            try:
+                exit_code = self._parse_log(
+                    segments[i_step],
+                    AttributeDict({"parameters": step}),
+                    property_dict=property_dicts.get(i_step),
+                )
+            finally:
+                self._output_namespace = None
+
+            if exit_code is not None:
+                return exit_code
 
-        # parse with cclib
-        property_dict = self._parse_log_cclib(log_file_string)
+        return None
+
+    @staticmethod
+    def _parse_segments_in_parallel(segments):
+        """Parse the large segments with cclib in parallel processes
+
+        :return: dictionary of the index of the segment to its cclib attributes,
+            for the segments that were parsed (none if there is at most one large one)
+        """
+        large = [
+            i
+            for i, segment in enumerate(segments)
+            if len(segment) >= PARALLEL_PARSE_MIN_SIZE
+        ]
+        if len(large) < 2:
+            return {}
+
+        # spawn, as forking the (multithreaded) daemon worker is unsafe
+        with ProcessPoolExecutor(
+            max_workers=min(len(large), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = executor.map(parse_log_cclib, [segments[i] for i in large])
+            return dict(zip(large, results))
+
+    @staticmethod
+    def _split_link1_log(log_file_string):
+        """Split the log into its jobs, in a single pass over the lines
+
+        A job starts at 'Entering Gaussian System' (or at 'Initial command:' if
+        that line is missing), or at a 'Link1: Proceeding to internal job step'
+        line followed by a route that is not generated by Gaussian. The steps that
+        Gaussian generates for a compound job (e.g. the frequencies of 'opt freq',
+        with 'GenChk' in the route) are internal steps of the same job, even if
+        each step prints 'Normal termination'.
+        A job ends where the next one starts, or is the last segment.
+        """
+        segments = []
+        segment = []
+        in_job = False
+        previous_line = ""
+        # index in 'segment' of the 'Link1:' line of a step whose route is not read yet
+        link1_index = None
+        route = []
+        for line in log_file_string.splitlines(keepends=True):
+            starts_job = "Entering Gaussian System" in line or (
+                "Initial command:" in line
+                and "Entering Gaussian System" not in previous_line
+            )
+            if starts_job and in_job:
+                segments.append("".join(segment))
+                segment = []
+                link1_index = None
+            segment.append(line)
+            in_job = in_job or starts_job
+            previous_line = line
+
+            if LINK1_STEP_MESSAGE in line:
+                link1_index = len(segment) - 1
+                route = []
+            elif link1_index is not None:
+                # the route starts with '#' and ends at a line of dashes
+                if route and not line.strip().strip("-"):
+                    if GENERATED_ROUTE_KEYWORD not in "".join(route).lower():
+                        segments.append("".join(segment[:link1_index]))
+                        segment = segment[link1_index:]
+                    link1_index = None
+                elif route or line.lstrip().startswith("#"):
+                    route.append(line)
+        if "".join(segment).strip():
+            segments.append("".join(segment))
+        return segments
+
+    def _parse_log(self, log_file_string, inputs, property_dict=None):
+
+        # parse with cclib (unless already done)
+        if property_dict is None:
+            property_dict = self._parse_log_cclib(log_file_string)
 
         if property_dict is None:
             return self.exit_codes.ERROR_OUTPUT_PARSING
@@ -61,6 +315,7 @@ class GaussianBaseParser(Parser):
             self.out("energy_ev", Float(property_dict["scfenergies"][-1]))
 
         self._set_output_structure(inputs, property_dict)
+        self._set_output_trajectory(inputs, property_dict)
 
         exit_code = self._final_checks_on_log(log_file_string, property_dict)
         if exit_code is not None:
@@ -80,41 +335,11 @@ class GaussianBaseParser(Parser):
             return {}
 
     def _parse_log_cclib(self, log_file_string):
-
-        data = cclib.io.ccread(io.StringIO(log_file_string))
-
-        if data is None:
-            return None
-
-        property_dict = data.getattributes()
-
-        def make_serializeable(data):
-            """Recursively go through the dictionary and convert unserializeable values in-place:
-
-            1) In numpy arrays:
-                * ``nan`` -> ``0.0``
-                * ``inf`` -> large number
-            2) datetime.timedelta (introduced in cclib v1.8) -> convert to seconds
-
-            :param data: A mapping of data.
-            """
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    data[key] = make_serializeable(value)
-            elif isinstance(data, list):
-                for index, item in enumerate(data):
-                    data[index] = make_serializeable(item)
-            elif isinstance(data, np.ndarray):
-                np.nan_to_num(data, copy=False)
-            elif isinstance(data, datetime.timedelta):
-                data = data.total_seconds()
-            return data
-
-        make_serializeable(property_dict)
-
-        return property_dict
+        return parse_log_cclib(log_file_string)
 
     def _set_output_structure(self, inputs, property_dict):
+        import ase
+
         # in case of geometry optimization,
         # return the last geometry as a separated node
         if "atomcoords" in property_dict:
@@ -139,6 +364,53 @@ class GaussianBaseParser(Parser):
                 structure = StructureData(ase=ase_opt)
                 self.out("output_structure", structure)
 
+    def _set_output_trajectory(self, inputs, property_dict):
+        """Set the geometries of all steps as a TrajectoryData
+
+        Besides the positions, the arrays 'energies' (SCF energies in eV), 'forces'
+        (Hartree/Bohr) and the convergence criteria of GEOVALUE_ARRAYS are set, if
+        available. They have one entry per step, padded with NaN if a step is
+        incomplete (e.g. the job stopped before the SCF of the last geometry).
+        """
+        from ase.data import chemical_symbols
+
+        if "atomcoords" not in property_dict:
+            return
+        if (
+            "opt" not in inputs.parameters["route_parameters"]
+            and len(property_dict["atomcoords"]) <= 1
+        ):
+            return
+
+        positions = np.array(property_dict["atomcoords"], dtype=float)
+        num_steps = len(positions)
+
+        def pad_steps(values):
+            values = np.array(values, dtype=float)[:num_steps]
+            padded = np.full((num_steps,) + values.shape[1:], np.nan)
+            padded[: len(values)] = values
+            return padded
+
+        trajectory = TrajectoryData()
+        trajectory.set_trajectory(
+            [chemical_symbols[z] for z in property_dict["atomnos"]], positions
+        )
+        if "scfenergies" in property_dict:
+            trajectory.set_array("energies", pad_steps(property_dict["scfenergies"]))
+        if len(property_dict.get("grads", [])) > 0:
+            trajectory.set_array("forces", pad_steps(property_dict["grads"]))
+        if len(property_dict.get("geovalues", [])) > 0:
+            geovalues = pad_steps(property_dict["geovalues"])
+            for i, name in enumerate(GEOVALUE_ARRAYS[: geovalues.shape[1]]):
+                trajectory.set_array(name, geovalues[:, i])
+            if "geotargets" in property_dict:
+                trajectory.set_array(
+                    "convergence_thresholds",
+                    np.array(property_dict["geotargets"], dtype=float),
+                )
+
+        self.out("output_trajectory", trajectory)
+
     def _final_checks_on_log(self, log_file_string, property_dict):
 
         # Error related to the symmetry identification (?).
@@ -151,6 +423,9 @@ class GaussianBaseParser(Parser):
         if "Convergence failure -- run terminated." in log_file_string:
             return self.exit_codes.ERROR_SCF_FAILURE
 
+        if any(message in log_file_string for message in OUT_OF_MEMORY_MESSAGES):
+            return self.exit_codes.ERROR_OUT_OF_MEMORY
+
         if "Error termination" in log_file_string:
             return self.exit_codes.ERROR_TERMINATION
 
@@ -166,13 +441,23 @@ class GaussianBaseParser(Parser):
 class GaussianAdvancedParser(GaussianBaseParser):
     """
     Advanced AiiDA parser for the output of Gaussian
+
+    For frequency calculations, the normal modes are set (as float32) in the
+    'output_vibrations' ArrayData instead of 'output_parameters', together with
+    the quasi-harmonic vibrational thermochemistry at the temperatures of
+    settings['thermo_temperatures'] (by default 298.15 K) with the frequency
+    cutoff settings['thermo_frequency_cutoff'] (by default 100 cm^-1).
+
+    Potential energy surface scans and IRC runs are set as the 'output_scan' and
+    'output_irc' ArrayData, with one entry per converged point.
     """
 
-    def _parse_log(self, log_file_string, inputs):
+    def _parse_log(self, log_file_string, inputs, property_dict=None):
         """Overwrite the basic log parser"""
 
-        # parse with cclib
-        property_dict = self._parse_log_cclib(log_file_string)
+        # parse with cclib (unless already done)
+        if property_dict is None:
+            property_dict = self._parse_log_cclib(log_file_string)
 
         if property_dict is None:
             return self.exit_codes.ERROR_OUTPUT_PARSING
@@ -187,6 +472,8 @@ class GaussianAdvancedParser(GaussianBaseParser):
 
         property_dict.update(self._parse_nmr(log_file_string))
 
+        self._set_output_vibrations(property_dict)
+
         # set output nodes
         self.out("output_parameters", Dict(dict=property_dict))
 
@@ -194,6 +481,9 @@ class GaussianAdvancedParser(GaussianBaseParser):
             self.out("energy_ev", Float(property_dict["scfenergies"][-1]))
 
         self._set_output_structure(inputs, property_dict)
+        self._set_output_trajectory(inputs, property_dict)
+        self._set_output_scan(property_dict)
+        self._set_output_irc(log_file_string, property_dict)
 
         exit_code = self._final_checks_on_log(log_file_string, property_dict)
         if exit_code is not None:
@@ -201,6 +491,119 @@ class GaussianAdvancedParser(GaussianBaseParser):
 
         return None
 
+    @staticmethod
+    def _get_converged_indexes(property_dict):
+        """Indexes of the geometries of the converged optimization (or IRC) points"""
+        from cclib.parser.data import ccData
+
+        return [
+            i
+            for i, status in enumerate(property_dict.get("optstatus", []))
+            if status & ccData.OPT_DONE
+        ]
+
+    def _set_output_scan(self, property_dict):
+        """Set the points of a (relaxed or rigid) scan as the 'output_scan' ArrayData
+
+        The arrays are 'coordinates' (points x scanned coordinates, in Angstrom and
+        degrees), 'energies' [eV] and, if the geometries of all points were found,
+        'positions' (points x atoms x 3). The attribute 'coordinate_names' holds
+        the definitions of the scanned coordinates (e.g. 'R(1,2)').
+        """
+        if len(property_dict.get("scanenergies", [])) == 0:
+            return
+
+        energies = np.array(property_dict["scanenergies"], dtype=float)
+        coordinates = np.array(property_dict["scanparm"], dtype=float).T
+
+        scan = ArrayData()
+        scan.set_array("coordinates", coordinates.reshape(len(energies), -1))
+        scan.set_array("energies", energies)
+        positions = np.array(property_dict.get("scancoords", []), dtype=float)
+        if len(positions) == len(energies):
+            scan.set_array("positions", positions)
+        scan.base.attributes.set(
+            "coordinate_names", list(property_dict.get("scannames", []))
+        )
+
+        self.out("output_scan", scan)
+
+    def _set_output_irc(self, log_file_string, property_dict):
+        """Set the points of an IRC as the 'output_irc' ArrayData
+
+        The points of both directions and the transition state are sorted along
+        the arrays 'reaction_coordinate' [amu^1/2 Bohr], negative for the reverse
+        path, and 'path' (0 for the transition state, 1 forward, 2 reverse).
+        'energies' [eV] and 'positions' (points x atoms x 3) are set if the
+        converged geometries match the points.
+        """
+        points = re.findall(
+            r"Path Number:\s*(\d+).*?"
+            r"NET REACTION COORDINATE UP TO THIS POINT =\s*({0})".format(NUM_RE),
+            log_file_string,
+            re.DOTALL,
+        )
+        if not points:
+            return
+
+        paths = np.array([0] + [int(path) for path, _ in points])
+        reaction_coordinate = np.array(
+            [0.0]
+            + [float(coord) if path == "1" else -float(coord) for path, coord in points]
+        )
+        order = np.argsort(reaction_coordinate, kind="stable")
+
+        irc = ArrayData()
+        irc.set_array("reaction_coordinate", reaction_coordinate[order])
+        irc.set_array("path", paths[order])
+
+        # the transition state is the first geometry, followed by the converged points
+        indexes = [0] + self._get_converged_indexes(property_dict)[-len(points) :]
+        if len(indexes) == len(paths):
+            atomcoords = np.array(property_dict.get("atomcoords", []), dtype=float)
+            scfenergies = np.array(property_dict.get("scfenergies", []), dtype=float)
+            if len(atomcoords) > max(indexes):
+                irc.set_array("positions", atomcoords[indexes][order])
+            if len(scfenergies) > max(indexes):
+                irc.set_array("energies", scfenergies[indexes][order])
+
+        self.out("output_irc", irc)
+
+    def _set_output_vibrations(self, property_dict):
+        """Move the normal modes to the 'output_vibrations' ArrayData
+
+        The arrays are 'frequencies' [cm^-1], 'modes' (float32, modes x atoms x 3),
+        the other VIBRATION_ARRAYS that are available, 'temperatures' [K] and the
+        quasi-harmonic vibrational 'zpe' [eV], 'internal_energy' [eV], 'entropy'
+        [eV/K], 'heat_capacity' [eV/K] and 'free_energy' [eV] per temperature.
+        """
+        if len(property_dict.get("vibfreqs", [])) == 0:
+            return
+
+        settings = {}
+        if "settings" in self.node.inputs:
+            settings = self.node.inputs.settings.get_dict()
+        temperatures = settings.get("thermo_temperatures", DEFAULT_TEMPERATURES)
+        cutoff = settings.get("thermo_frequency_cutoff", DEFAULT_FREQUENCY_CUTOFF)
+
+        vibrations = ArrayData()
+        for key, name in VIBRATION_ARRAYS.items():
+            if len(property_dict.get(key, [])) > 0:
+                vibrations.set_array(name, np.array(property_dict[key], dtype=float))
+        if "vibdisps" in property_dict:
+            modes = property_dict.pop("vibdisps")
+            vibrations.set_array("modes", np.array(modes, dtype=np.float32))
+
+        thermo = get_vibrational_thermochemistry(
+            property_dict["vibfreqs"], temperatures, cutoff
+        )
+        vibrations.set_array("temperatures", np.array(temperatures, dtype=float))
+        for name, values in thermo.items():
+            vibrations.set_array(name, np.array(values))
+        vibrations.base.attributes.set("frequency_cutoff", cutoff)
+
+        self.out("output_vibrations", vibrations)
+
     def _parse_nmr(self, log_file_string):
         """Parse the NMR magnetic shielding tensors.
 
@@ -280,28 +683,62 @@ class GaussianAdvancedParser(GaussianBaseParser):
 
     def _extract_homo_lumo_gap(self, property_dict):
         if "moenergies" in property_dict and "homos" in property_dict:
-            nspin = len(property_dict["homos"])
-            mo_e = np.array(property_dict["moenergies"])
+            property_dict.update(
+                get_homo_lumo_gaps(property_dict["moenergies"], property_dict["homos"])
+            )
 
-            # if either HOMO is negative, such as in the case of H, don't extract gap
-            if any(h < 0 for h in property_dict["homos"]):
-                return
-            try:
-                if nspin == 1:
-                    ih_s0 = property_dict["homos"][0]
-                    property_dict["gap"] = mo_e[0][ih_s0 + 1] - mo_e[0][ih_s0]
-                elif nspin == 2:
-                    ih_s0 = property_dict["homos"][0]
-                    ih_s1 = property_dict["homos"][1]
-                    max_homo = np.max([mo_e[0, ih_s0], mo_e[1, ih_s1]])
-                    min_lumo = np.min([mo_e[0, ih_s0 + 1], mo_e[1, ih_s1 + 1]])
-                    # effective gap:
-                    property_dict["gap"] = min_lumo - max_homo
-                    # gaps for each spin channel separately:
-                    property_dict["gap_a"] = mo_e[0, ih_s0 + 1] - mo_e[0, ih_s0]
-                    property_dict["gap_b"] = mo_e[1, ih_s1 + 1] - mo_e[1, ih_s1]
-            except IndexError:
-                # In some cases, such as a very small basis set,
-                # the parsed MOs don't include LUMO and an IndexError is raised.
-                # Just skip the gap determination in this case
-                pass
+
+class GaussianBundleParser(GaussianBaseParser):
+    """
+    AiiDA parser for the outputs of GaussianBundleCalculation
+
+    Each job log is parsed as by the GaussianBaseParser and the outputs are
+    nested under the job label. The exit status of each job is collected
+    in the 'exit_statuses' output.
+    """
+
+    def parse(self, **kwargs):
+        """Receives in input a dictionary of retrieved nodes. Does all the logic here."""
+        output_ext = self.node.process_class.OUTPUT_FILE_EXT
+
+        try:
+            out_folder = self.retrieved
+            retrieved_names = out_folder.base.repository.list_object_names()
+        except NotExistent:
+            return self.exit_codes.ERROR_NO_RETRIEVED_FOLDER
+
+        exit_statuses = {}
+
+        for label in sorted(self.node.inputs.structures):
+            exit_code = self._parse_job(
+                out_folder, retrieved_names, label, label + output_ext
+            )
+            exit_statuses[label] = 0 if exit_code is None else exit_code.status
+
+        self.out("exit_statuses", Dict(exit_statuses))
+
+        failed = [label for label, status in exit_statuses.items() if status != 0]
+        if failed:
+            return self.exit_codes.ERROR_BUNDLE_JOB_FAILURE.format(
+                labels=", ".join(failed)
+            )
+
+        return ExitCode(0)
+
+    def _parse_job(self, out_folder, retrieved_names, label, fname):
+        """Parse the log of a single job with its outputs nested under the label"""
+
+        if fname not in retrieved_names:
+            return self.exit_codes.ERROR_OUTPUT_MISSING
+        try:
+            log_file_string = out_folder.base.repository.get_object_content(fname)
+        except OSError:
+            return self.exit_codes.ERROR_OUTPUT_LOG_READ
+
+        inputs = AttributeDict({"parameters": self.node.inputs.parameters[label]})
+
+        self._output_namespace = label
+        try:
+            return self._parse_log(log_file_string, inputs)
+        finally:
+            self._output_namespace = None
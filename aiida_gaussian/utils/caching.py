@@ -0,0 +1,177 @@
+"""
+Routines to make equivalent inputs hash identically, for AiiDA caching
+"""
+
+import numpy as np
+from aiida.common.hashing import make_hash
+from aiida.orm import Data, Dict, QueryBuilder, StructureData
+from aiida.orm.implementation.utils import clean_value
+from aiida.orm.nodes.data.structure import Site
+
+from aiida_gaussian.utils.gaussian_input import POSITION_DECIMALS
+
+# For caching, the positions are rounded to the precision of the input file:
+# structures then hash identically if they give the same input file. This is not
+# configurable, as fewer decimals would reuse the results of different inputs
+# and more would not find calculations that are the same. Only the comparison of
+# structures (get_structure_hash) can be coarser.
+DEFAULT_POSITION_DECIMALS = POSITION_DECIMALS
+
+# Gaussian keywords are case-insensitive, so these are compared in lower case
+LOWER_CASE_KEY_SECTIONS = ("link0_parameters", "route_parameters")
+LOWER_CASE_VALUE_SECTIONS = ("route_parameters",)
+
+# Extra in which AiiDA keeps the hash of stored nodes
+HASH_EXTRA_KEY = "_aiida_hash"
+
+
+def _normalize_section(section, lower_values):
+    """Lower-case the keys (and string values) of a (nested) parameter section
+
+    An empty string is equivalent to None (only the key is written).
+    """
+    normalized = {}
+    for key, value in section.items():
+        if isinstance(value, dict):
+            value = _normalize_section(value, lower_values)
+        elif value == "":
+            value = None
+        elif lower_values and isinstance(value, str):
+            value = value.lower()
+        normalized[key.lower()] = value
+    return normalized
+
+
+def normalize_parameters(parameters):
+    """Return the canonical form of GaussianCalculation parameters
+
+    * link0 and route keys are lower case, as well as the route values
+    * empty strings in the link0 and route sections are replaced by None,
+      as they render identically
+
+    The functional, the basis set and the other entries are kept as they are,
+    also if they are None or empty, as leaving them out would render the default
+    ones (e.g. a None functional with 'PM6' would become 'HF/PM6').
+    """
+    normalized = {}
+    for key, value in parameters.items():
+        if key in LOWER_CASE_KEY_SECTIONS and isinstance(value, dict):
+            value = _normalize_section(value, key in LOWER_CASE_VALUE_SECTIONS)
+        normalized[key] = value
+    return normalized
+
+
+def get_normalized_parameters(parameters):
+    """Return the parameters Dict in canonical form
+
+    The node itself is returned if it is already normalized, such that
+    its provenance is kept; otherwise a new (unstored) Dict is created.
+    """
+    param_dict = parameters.get_dict()
+    normalized = normalize_parameters(param_dict)
+    if normalized == param_dict:
+        return parameters
+    return Dict(normalized)
+
+
+def serialize_parameters(value):
+    """Port serializer that stores raw parameter dictionaries in canonical form"""
+    return Dict(normalize_parameters(value))
+
+
+def get_rounded_structure(structure, decimals=DEFAULT_POSITION_DECIMALS):
+    """Return the structure with the positions and cell rounded to 'decimals'
+
+    Structures that differ below the precision of the input file then have the
+    same hash. The node itself is returned if it is already rounded.
+    """
+    positions = np.array([site.position for site in structure.sites])
+    cell = np.array(structure.cell)
+    rounded_positions = positions.round(decimals)
+    rounded_cell = cell.round(decimals)
+    if np.array_equal(positions, rounded_positions) and np.array_equal(
+        cell, rounded_cell
+    ):
+        return structure
+
+    rounded = StructureData(cell=rounded_cell.tolist(), pbc=structure.pbc)
+    for kind in structure.kinds:
+        rounded.append_kind(kind)
+    for site, position in zip(structure.sites, rounded_positions):
+        rounded.append_site(Site(kind_name=site.kind_name, position=position))
+    return rounded
+
+
+def get_structure_hash(structure, decimals=DEFAULT_POSITION_DECIMALS):
+    """Return a hash of the rounded structure, for comparing structures
+
+    Unlike the node hash, it is the same for stored and unstored structures.
+    """
+    attributes = get_rounded_structure(structure, decimals).base.attributes.all
+    return make_hash(clean_value(attributes))
+
+
+def get_content_hash(node):
+    """Return the hash of the node, also if it is not stored yet
+
+    For unstored nodes, this is the hash that AiiDA will compute when storing it.
+    """
+    if node.is_stored:
+        return node.base.caching.get_hash()
+    return make_hash(clean_value(node.base.caching.get_objects_to_hash()))
+
+
+def get_shared_node(node, cache=None):
+    """Return a stored node with the same content as 'node', storing 'node' if there is none
+
+    Calculations submitted in a loop then share one parameter/settings node,
+    instead of creating an identical one each. The node itself is returned if
+    it is already stored.
+
+    :param node: the (unstored) Data node
+    :param cache: optional dictionary (hash -> node) of the nodes shared so far,
+        to avoid querying the database again for the same content
+    """
+    if node.is_stored:
+        return node
+
+    node_hash = get_content_hash(node)
+    if cache is not None and node_hash in cache:
+        return cache[node_hash]
+
+    qb = QueryBuilder()
+    qb.append(
+        type(node),
+        subclassing=False,
+        filters={f"extras.{HASH_EXTRA_KEY}": node_hash},
+        tag="node",
+    )
+    qb.order_by({"node": {"id": "asc"}})
+    shared = qb.first(flat=True)
+    if shared is None:
+        shared = node.store()
+
+    if cache is not None:
+        cache[node_hash] = shared
+    return shared
+
+
+def share_builder_inputs(builder, names=("parameters", "settings"), cache=None):
+    """Replace the unstored Data inputs 'names' of the builder by shared nodes
+
+    Nested inputs are given with dots, e.g. 'gaussian.parameters' for the
+    GaussianBaseWorkChain. Inputs that are not set are skipped.
+
+    :param cache: optional dictionary (hash -> node), see get_shared_node. Pass
+        the same dictionary for all builders of a batch.
+    :return: the builder
+    """
+    for name in names:
+        *namespaces, port = name.split(".")
+        inputs = builder
+        for namespace in namespaces:
+            inputs = inputs[namespace]
+        value = inputs.get(port)
+        if isinstance(value, Data):
+            inputs[port] = get_shared_node(value, cache)
+    return builder
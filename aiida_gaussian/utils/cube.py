@@ -2,7 +2,6 @@
 Routines regarding gaussian cube files
 """
 
-import ase
 import numpy as np
 
 ANG_TO_BOHR = 1.8897259886
@@ -42,8 +41,15 @@ class Cube:
             self.cell_n = cell_n
 
     @classmethod
-    def from_file_handle(cls, filehandle, read_data=True):
+    def from_file_handle(cls, filehandle, read_data=True, dtype=float):
+        """
+        Read a cube from an open text file handle.
+        dtype sets the precision of the data array (e.g. np.float32 to halve memory);
+        cube files only carry about six significant digits.
+        """
         # pylint: disable=too-many-locals
+        import ase
+
         f = filehandle
         c = cls()
         c.title = f.readline().rstrip()
@@ -81,7 +87,7 @@ class Cube:
 
         if read_data:
             # Option 1: less memory usage but might be slower
-            c.data = np.empty(c.cell_n[0] * c.cell_n[1] * c.cell_n[2], dtype=float)
+            c.data = np.empty(c.cell_n[0] * c.cell_n[1] * c.cell_n[2], dtype=dtype)
             cursor = 0
             if section_headers:
                 f.readline()
@@ -99,11 +105,43 @@ class Cube:
         return c
 
     @classmethod
-    def from_file(cls, filepath, read_data=True):
+    def from_file(cls, filepath, read_data=True, dtype=float):
         with open(filepath) as f:
-            c = cls.from_file_handle(f, read_data=read_data)
+            c = cls.from_file_handle(f, read_data=read_data, dtype=dtype)
+        return c
+
+    @classmethod
+    def from_npz_file_handle(cls, filehandle, read_data=True):
+        """
+        Read a cube written by write_npz_file_handle.
+        The data keeps the dtype it was stored with.
+        """
+        import ase
+
+        c = cls()
+        with np.load(filehandle) as npz:
+            c.title = str(npz["title"])
+            c.comment = str(npz["comment"])
+            c.origin = npz["origin"]
+            c.cell = npz["cell"]
+            c.cell_n = npz["cell_n"]
+            c.ase_atoms = ase.Atoms(numbers=npz["numbers"], positions=npz["positions"])
+            if read_data:
+                chunk_names = sorted(k for k in npz.files if k.startswith("data_"))
+                c.data = np.concatenate([npz[k] for k in chunk_names], axis=0)
         return c
 
+    @classmethod
+    def from_npz_file(cls, filepath, read_data=True):
+        with open(filepath, "rb") as f:
+            c = cls.from_npz_file_handle(f, read_data=read_data)
+        return c
+
+    def astype(self, dtype):
+        """Convert the data array in-place to dtype (e.g. np.float32)"""
+        self.data = self.data.astype(dtype, copy=False)
+        return self
+
     def write_cube_file(self, filename):
 
         natoms = len(self.ase_atoms)
@@ -120,7 +158,7 @@ class Cube:
         else:
             f.write(self.comment + "\n")
 
-        dv_br = self.cell / self.data.shape
+        dv_br = self.cell / np.reshape(self.data.shape, (3, 1))
 
         f.write(
             "%5d %12.6f %12.6f %12.6f\n"
@@ -148,6 +186,36 @@ class Cube:
 
         f.close()
 
+    def write_npz_file_handle(self, filehandle, chunk_size=None, compressed=True):
+        """
+        Write the cube in a binary numpy (.npz) layout.
+        The data is stored in chunks of chunk_size planes along the first axis
+        (default: a single chunk), and each chunk is compressed separately.
+        """
+        if chunk_size is None:
+            chunk_size = max(self.data.shape[0], 1)
+
+        arrays = {
+            "title": np.array("" if self.title is None else self.title),
+            "comment": np.array("" if self.comment is None else self.comment),
+            "origin": np.asarray(self.origin),
+            "cell": np.asarray(self.cell),
+            "cell_n": np.asarray(self.data.shape),
+            "numbers": self.ase_atoms.get_atomic_numbers(),
+            "positions": self.ase_atoms.positions,
+        }
+        for i_chunk, i_start in enumerate(range(0, self.data.shape[0], chunk_size)):
+            arrays["data_%05d" % i_chunk] = self.data[i_start : i_start + chunk_size]
+
+        if compressed:
+            np.savez_compressed(filehandle, **arrays)
+        else:
+            np.savez(filehandle, **arrays)
+
+    def write_npz_file(self, filename, chunk_size=None, compressed=True):
+        with open(filename, "wb") as f:
+            self.write_npz_file_handle(f, chunk_size=chunk_size, compressed=compressed)
+
     def swapaxes(self, ax1, ax2):
 
         p = self.ase_atoms.positions
@@ -168,6 +236,57 @@ class Cube:
 
         self.cell_n = self.data.shape
 
+    def get_downsampled(self, factor):
+        """
+        Returns a new cube where blocks of factor^3 points are averaged.
+        Incomplete blocks at the upper edges are averaged over the available points.
+        """
+        sums, counts = _get_block_sums(
+            self.data, [np.ones(n, dtype=int) for n in self.data.shape], factor
+        )
+        return self._get_block_averaged_cube(sums, counts, factor)
+
+    def get_pyramid(self, factors=(2, 4, 8)):
+        """
+        Returns a list of block-averaged cubes, one for each downsampling factor.
+        Each level is built from the block sums of the previous one where the
+        factors allow it, such that the result is the same as get_downsampled.
+        """
+        levels = []
+        sums, counts = self.data, [np.ones(n, dtype=int) for n in self.data.shape]
+        prev_factor = 1
+        for factor in sorted(factors):
+            if factor % prev_factor == 0:
+                sums, counts = _get_block_sums(sums, counts, factor // prev_factor)
+            else:
+                sums, counts = _get_block_sums(
+                    self.data,
+                    [np.ones(n, dtype=int) for n in self.data.shape],
+                    factor,
+                )
+            levels.append(self._get_block_averaged_cube(sums, counts, factor))
+            prev_factor = factor
+        return levels
+
+    def _get_block_averaged_cube(self, sums, counts, factor):
+        """The cube of the block averages, from the block sums and point counts"""
+        data = sums / np.einsum("i,j,k->ijk", *counts)
+        data = data.astype(self.data.dtype, copy=False)
+
+        dv = self.dv_au
+        # the averaged value corresponds to the center of the block
+        origin = self.origin + 0.5 * (factor - 1) * np.sum(dv, axis=0)
+        cell = np.reshape(data.shape, (3, 1)) * factor * dv
+
+        return Cube(
+            title=self.title,
+            comment=self.comment,
+            ase_atoms=self.ase_atoms.copy(),
+            origin=origin,
+            cell=cell,
+            data=data,
+        )
+
     def get_plane_above_topmost_atom(self, height, axis=2):
         """
         Returns the 2d plane above topmost atom in direction (default: z)
@@ -188,6 +307,83 @@ class Cube:
             return self.data[:, plane_index, :]
         return self.data[:, :, plane_index]
 
+    def integrate(self):
+        """
+        Integral of the data over the cube volume (data in [au], e.g. number of electrons)
+        """
+        return np.sum(self.data, dtype=np.float64) * self.dv_volume_au
+
+    def get_isovalue_volume(self, isovalue):
+        """
+        Volume enclosed by the |data| = isovalue surface in [ang^3]
+        """
+        n_inside = np.count_nonzero(np.abs(self.data) >= isovalue)
+        return n_inside * self.dv_volume_au / ANG_TO_BOHR**3
+
+    def get_atomic_sphere_integrals(self, radius):
+        """
+        Integrals of the data inside spheres of radius [ang] around each atom
+        (e.g. spin populations for a spin density cube).
+        Overlapping regions are counted for each atom.
+        """
+        dv = self.dv_au
+        inv_dv = np.linalg.inv(dv)
+        radius_au = radius * ANG_TO_BOHR
+        cell_n = np.array(self.data.shape)
+
+        # extent of the sphere in grid indexes along each axis
+        half_width = radius_au * np.linalg.norm(inv_dv, axis=0)
+
+        positions = self.ase_atoms.positions * ANG_TO_BOHR
+        integrals = np.zeros(len(positions))
+
+        for i_at, pos in enumerate(positions):
+            center = (pos - self.origin) @ inv_dv
+            i_min = np.clip(np.floor(center - half_width).astype(int), 0, cell_n)
+            i_max = np.clip(np.ceil(center + half_width).astype(int) + 1, 0, cell_n)
+            if np.any(i_max <= i_min):
+                continue
+
+            ix, iy, iz = (np.arange(i_min[i], i_max[i]) for i in range(3))
+            r = (
+                self.origin
+                - pos
+                + ix[:, None, None, None] * dv[0]
+                + iy[None, :, None, None] * dv[1]
+                + iz[None, None, :, None] * dv[2]
+            )
+            mask = np.einsum("ijkl,ijkl->ijk", r, r) <= radius_au**2
+
+            local_data = self.data[
+                i_min[0] : i_max[0], i_min[1] : i_max[1], i_min[2] : i_max[2]
+            ]
+            integrals[i_at] = np.sum(local_data[mask], dtype=np.float64)
+
+        return integrals * self.dv_volume_au
+
+    def get_first_moment(self):
+        """
+        Integral of r * data over the cube volume in [au]
+        """
+        dv = self.dv_au
+        moment = np.array(self.origin, dtype=float) * np.sum(
+            self.data, dtype=np.float64
+        )
+        for axis in range(3):
+            other_axes = tuple(a for a in range(3) if a != axis)
+            marginal = np.sum(self.data, axis=other_axes, dtype=np.float64)
+            moment += np.dot(np.arange(len(marginal)), marginal) * dv[axis]
+        return moment * self.dv_volume_au
+
+    def get_dipole_moment(self):
+        """
+        Dipole moment estimate in [au] (e*bohr) for an electron density cube,
+        including the contribution of the nuclei
+        """
+        positions = self.ase_atoms.positions * ANG_TO_BOHR
+        numbers = self.ase_atoms.get_atomic_numbers()
+        return np.dot(numbers, positions) - self.get_first_moment()
+
     def get_x_index(self, x_ang):
         # returns the index value for a given x coordinate in angstrom
         return int(
@@ -221,17 +417,22 @@ class Cube:
     @property
     def dv(self):
         """in [ang]"""
-        return self.cell / self.cell_n / ANG_TO_BOHR
+        return self.cell / np.reshape(self.cell_n, (3, 1)) / ANG_TO_BOHR
 
     @property
     def dv_ang(self):
         """in [ang]"""
-        return self.cell / self.cell_n / ANG_TO_BOHR
+        return self.cell / np.reshape(self.cell_n, (3, 1)) / ANG_TO_BOHR
 
     @property
     def dv_au(self):
         """in [au]"""
-        return self.cell / self.cell_n
+        return self.cell / np.reshape(self.cell_n, (3, 1))
+
+    @property
+    def dv_volume_au(self):
+        """volume element in [au^3]"""
+        return np.abs(np.linalg.det(self.dv_au))
 
     @property
     def x_arr_au(self):
@@ -274,3 +475,16 @@ class Cube:
     def z_arr_ang(self):
         """in [ang]"""
         return self.z_arr_au / ANG_TO_BOHR
+
+
+def _get_block_sums(data, counts, factor):
+    """
+    Sums blocks of factor^3 points of data, which are block sums themselves
+    with counts[axis] points along each axis. Returns the sums and their counts.
+    """
+    block_counts = []
+    for axis in range(3):
+        starts = np.arange(0, data.shape[axis], factor)
+        data = np.add.reduceat(data, starts, axis=axis)
+        block_counts.append(np.add.reduceat(counts[axis], starts))
+    return data, block_counts
@@ -0,0 +1,256 @@
+"""
+Export selected output parameters of many Gaussian calculations to a columnar file
+
+The values are projected directly from the database in batches, without loading
+the output Dict nodes, and written to a compressed NPZ file with one array per
+key. Exporting again to the same file only queries the processes whose
+'output_parameters' were linked after the last export and appends them, so
+processes that were still running during an export are exported later.
+
+An 'output_parameters' node that is also returned by a work chain (e.g. the
+GaussianBaseWorkChain wrapping the calculation) is exported only once, in the
+row of the first process it was linked to.
+"""
+
+import os
+import re
+
+import numpy as np
+from aiida.orm import Dict, ProcessNode, QueryBuilder
+
+DEFAULT_KEYS = (
+    "scfenergies[-1]",
+    "homos",
+    "gap",
+    "num_electrons",
+    "metadata.success",
+)
+
+# The work chains return the 'output_parameters' of their calculations, which
+# are exported already
+DEFAULT_PROCESS_TYPES = ("aiida.calculations:gaussian",)
+
+# Columns that are written in addition to the keys
+PK_COLUMN = "pk"
+PROCESS_TYPE_COLUMN = "process_type"
+# pk of the 'output_parameters' node, to export each node only once
+OUTPUT_PK_COLUMN = "output_pk"
+# id of the 'output_parameters' link, which increases in the order in which the
+# processes finished: the watermark of incremental exports
+LINK_ID_COLUMN = "link_id"
+
+# Missing value of the string columns (NaN for the numeric ones)
+MISSING_STRING = ""
+
+KEY_REGEX = re.compile(r"([A-Za-z_][\w.]*?)((?:\[-?\d+\])*)")
+
+
+def parse_key(key):
+    """Split a key such as 'metadata.success' or 'scfenergies[-1]'
+
+    :return: (list of attribute names, list of indexes)
+    """
+    match = KEY_REGEX.fullmatch(key)
+    if match is None:
+        raise ValueError(f"Invalid key '{key}'.")
+    indexes = [int(index) for index in re.findall(r"-?\d+", match.group(2))]
+    return match.group(1).split("."), indexes
+
+
+def get_value(value, indexes):
+    """Apply the indexes to the projected value (None if not available)"""
+    for index in indexes:
+        if not isinstance(value, list) or not -len(value) <= index < len(value):
+            return None
+        value = value[index]
+    return value
+
+
+def _to_column(values):
+    """Convert the values of one key to an array
+
+    Missing values are NaN for numbers and MISSING_STRING for strings. Lists of
+    numbers (e.g. 'homos') are padded with NaN to a 2D array.
+    """
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, bool) for value in present):
+        if len(present) == len(values):
+            return np.array(values, dtype=bool)
+        return np.array([np.nan if v is None else float(v) for v in values])
+    if present and all(isinstance(value, str) for value in present):
+        return np.array(
+            [MISSING_STRING if value is None else value for value in values], dtype=str
+        )
+    if any(isinstance(value, list) for value in present):
+        width = max(len(np.ravel(value)) for value in present)
+        column = np.full((len(values), width), np.nan)
+        for i, value in enumerate(values):
+            if value is not None:
+                value = np.ravel(np.array(value, dtype=float))
+                column[i, : len(value)] = value
+        return column
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _to_string_column(column):
+    """Convert a column to strings, with MISSING_STRING for the missing (NaN) values"""
+    if column.dtype.kind == "U":
+        return column
+    return np.array(
+        [
+            MISSING_STRING if isinstance(v, float) and np.isnan(v) else str(v)
+            for v in column.tolist()
+        ],
+        dtype=str,
+    )
+
+
+def _concatenate(old, new):
+    """Append the new rows to the old column, padding 2D columns and casting if needed
+
+    If only one of them is a string column (e.g. a batch in which all values of
+    a string key are missing), both are converted to strings.
+    """
+    if "U" in (old.dtype.kind, new.dtype.kind):
+        old, new = _to_string_column(old), _to_string_column(new)
+    elif old.ndim == 2 or new.ndim == 2:
+        old, new = old.reshape(len(old), -1), new.reshape(len(new), -1)
+        width = max(old.shape[1], new.shape[1])
+        old = np.pad(
+            old.astype(float),
+            ((0, 0), (0, width - old.shape[1])),
+            constant_values=np.nan,
+        )
+        new = np.pad(
+            new.astype(float),
+            ((0, 0), (0, width - new.shape[1])),
+            constant_values=np.nan,
+        )
+    elif old.dtype.kind != new.dtype.kind:
+        old, new = old.astype(float), new.astype(float)
+    return np.concatenate([old, new])
+
+
+def _select_rows(results, mask):
+    """Return the results with only the rows of the boolean mask"""
+    return {column: values[mask] for column, values in results.items()}
+
+
+def load_results(filename):
+    """Load an exported file as a dictionary of arrays (column -> array)"""
+    with np.load(filename) as data:
+        return {column: data[column] for column in data.files}
+
+
+def query_results(
+    keys=DEFAULT_KEYS,
+    process_types=DEFAULT_PROCESS_TYPES,
+    min_link_id=None,
+    batch_size=1000,
+):
+    """Query the keys of the 'output_parameters' of the processes in batches
+
+    :param keys: keys of the output parameters, with '.' for nested values and
+        '[i]' to index lists
+    :param process_types: process types of the processes to export
+    :param min_link_id: only the processes whose 'output_parameters' link has
+        a larger id are queried
+    :return: dictionary of arrays (column -> array), sorted by link id, with
+        one row per 'output_parameters' node
+    """
+    parsed_keys = [parse_key(key) for key in keys]
+
+    edge_filters = {"label": "output_parameters"}
+    if min_link_id is not None:
+        edge_filters["id"] = {">": min_link_id}
+
+    qb = QueryBuilder()
+    qb.append(
+        ProcessNode,
+        filters={"process_type": {"in": list(process_types)}},
+        project=["id", "process_type"],
+        tag="process",
+    )
+    # only the needed attributes are projected, not the whole Dict
+    qb.append(
+        Dict,
+        with_incoming="process",
+        edge_filters=edge_filters,
+        edge_project=["id"],
+        project=["id"] + [f"attributes.{'.'.join(path)}" for path, _ in parsed_keys],
+        tag="output",
+    )
+    qb.order_by({"process--output": {"id": "asc"}})
+
+    pks, process_types_column, output_pks, link_ids = [], [], [], []
+    output_pks_seen = set()
+    values = [[] for _ in keys]
+    for row in qb.iterall(batch_size=batch_size):
+        # a node returned by several processes is kept in its first row
+        if row[2] in output_pks_seen:
+            continue
+        output_pks_seen.add(row[2])
+        pks.append(row[0])
+        process_types_column.append(row[1])
+        output_pks.append(row[2])
+        # the edge projection comes after the projections of the output node
+        link_ids.append(row[-1])
+        for column, value, (_, indexes) in zip(values, row[3:-1], parsed_keys):
+            column.append(get_value(value, indexes))
+
+    results = {
+        PK_COLUMN: np.array(pks, dtype=int),
+        PROCESS_TYPE_COLUMN: np.array(process_types_column, dtype=str),
+        OUTPUT_PK_COLUMN: np.array(output_pks, dtype=int),
+        LINK_ID_COLUMN: np.array(link_ids, dtype=int),
+    }
+    for key, column in zip(keys, values):
+        results[key] = _to_column(column)
+    return results
+
+
+def export_results(
+    filename, keys=DEFAULT_KEYS, process_types=DEFAULT_PROCESS_TYPES, batch_size=1000
+):
+    """Export the keys of the 'output_parameters' to a compressed NPZ file
+
+    If the file exists, only the processes whose 'output_parameters' were
+    linked after the exported ones are queried and appended (also if the process
+    itself was created before the last export), except for the 'output_parameters'
+    that are exported already; the keys must then be the same.
+
+    :return: the number of exported (new) rows
+    """
+    existing = load_results(filename) if os.path.exists(filename) else None
+    min_link_id = None
+    if existing is not None:
+        columns = {PK_COLUMN, PROCESS_TYPE_COLUMN, OUTPUT_PK_COLUMN, LINK_ID_COLUMN}
+        if set(existing) != {*columns, *keys}:
+            raise ValueError(f"The keys do not match the columns of '{filename}'.")
+        if len(existing[LINK_ID_COLUMN]):
+            min_link_id = int(existing[LINK_ID_COLUMN].max())
+
+    results = query_results(
+        keys, process_types, min_link_id=min_link_id, batch_size=batch_size
+    )
+    if existing is not None:
+        # e.g. returned by a work chain after the export of its calculation
+        results = _select_rows(
+            results,
+            ~np.isin(results[OUTPUT_PK_COLUMN], existing[OUTPUT_PK_COLUMN]),
+        )
+    num_new = len(results[PK_COLUMN])
+    if existing is not None:
+        if num_new == 0:
+            return 0
+        results = {
+            column: _concatenate(existing[column], results[column])
+            for column in results
+        }
+
+    # write to a temporary file first, such that an interrupted export
+    # does not corrupt the existing file
+    tmp_filename = f"{filename}.tmp.npz"
+    np.savez_compressed(tmp_filename, **results)
+    os.replace(tmp_filename, filename)
+    return num_new
@@ -0,0 +1,140 @@
+"""
+Routines to render Gaussian input files
+
+The output follows pymatgen.io.gaussian.GaussianInput.to_str(cart_coords=True)
+byte by byte, but is generated directly from the StructureData
+"""
+
+from aiida.common.constants import elements
+
+ATOMIC_NUMBERS = {data["symbol"]: z for z, data in elements.items() if z > 0}
+
+# Decimals of the Cartesian coordinates written to the input file (as pymatgen)
+POSITION_DECIMALS = 6
+
+GHOST_ATOM_SYMBOL = "X"
+GHOST_ATOM_LABEL = "Bq"
+
+
+def para_dict_to_str(para, joiner=" "):
+    """Render a (nested) dictionary of Gaussian parameters as pymatgen does
+
+    key: None (or "") results in only the key without the equals sign
+    """
+    para_str = []
+    for par, val in sorted(para.items()):
+        if val is None or val == "":
+            para_str.append(par)
+        elif isinstance(val, dict):
+            val_str = para_dict_to_str(val, joiner=",")
+            para_str.append(f"{par}=({val_str})")
+        else:
+            para_str.append(f"{par}={val}")
+    return joiner.join(para_str)
+
+
+def get_symbols_and_positions(structure):
+    """Return the element symbol and the position [ang] of each site"""
+    kind_symbols = {}
+    for kind in structure.kinds:
+        if len(kind.symbols) != 1 or kind.weights[0] != 1.0:
+            raise ValueError(f"Kind '{kind.name}' is an alloy or contains vacancies.")
+        kind_symbols[kind.name] = kind.symbols[0]
+
+    sites = structure.sites
+    return [kind_symbols[site.kind_name] for site in sites], [
+        site.position for site in sites
+    ]
+
+
+def get_cart_coords_lines(symbols, positions):
+    """Return the Cartesian coordinate lines; ghost atoms ('X') are written as 'Bq'"""
+    return [
+        "{} {}".format(
+            GHOST_ATOM_LABEL if symbol == GHOST_ATOM_SYMBOL else symbol,
+            " ".join(f"{x:0.{POSITION_DECIMALS}f}" for x in position),
+        )
+        for symbol, position in zip(symbols, positions)
+    ]
+
+
+def render_gaussian_input(
+    structure,
+    charge=None,
+    spin_multiplicity=None,
+    title=None,
+    functional="HF",
+    basis_set="6-31G(d)",
+    route_parameters=None,
+    input_parameters=None,
+    link0_parameters=None,
+    dieze_tag="#P",
+    gen_basis=None,
+    allcheck=False,
+):  # pylint: disable=too-many-arguments,too-many-locals
+    """Render the Gaussian input file with Cartesian coordinates
+
+    The arguments and defaults are the ones of pymatgen's GaussianInput,
+    except that structure is an AiiDA StructureData (or None, to read it from the chk)
+    and that the default title is the Hill formula of the structure.
+
+    With allcheck=True (for Geom=AllCheck), the title and the molecule
+    specification are omitted, as Gaussian reads them from the checkpoint.
+    """
+    if structure is not None:
+        symbols, positions = get_symbols_and_positions(structure)
+        charge = charge if charge is not None else 0
+        # ghost atoms carry no electrons
+        n_electrons = sum(ATOMIC_NUMBERS.get(s, 0) for s in symbols) - charge
+        if spin_multiplicity is not None:
+            if (n_electrons + spin_multiplicity) % 2 != 1:
+                raise ValueError(
+                    f"Charge of {charge} and spin multiplicity of {spin_multiplicity} is"
+                    " not possible for this molecule"
+                )
+        else:
+            spin_multiplicity = 1 if n_electrons % 2 == 0 else 2
+        title = title or structure.get_formula(mode="hill", separator=" ")
+    else:
+        title = title or "Restart"
+
+    link0_parameters = link0_parameters or {}
+    route_parameters = route_parameters or {}
+    input_parameters = input_parameters or {}
+    dieze_tag = dieze_tag if dieze_tag[0] == "#" else f"#{dieze_tag}"
+    if gen_basis is not None:
+        basis_set = "Gen"
+
+    output = []
+    if link0_parameters:
+        output.append(para_dict_to_str(link0_parameters, "\n"))
+
+    # Handle functional or basis set to None, empty string or whitespace
+    func_str = "" if functional is None else functional.strip()
+    bset_str = "" if basis_set is None else basis_set.strip()
+
+    if func_str != "" and bset_str != "":
+        func_bset_str = f" {func_str}/{bset_str}"
+    else:
+        # don't use the slash if either or both are set as empty
+        func_bset_str = f" {func_str}{bset_str}".rstrip()
+
+    output += [
+        f"{dieze_tag}{func_bset_str} {para_dict_to_str(route_parameters)}",
+        "",
+    ]
+
+    if not allcheck:
+        output += [title, ""]
+
+        charge_str = "" if charge is None else f"{charge:.0f}"
+        multip_str = "" if spin_multiplicity is None else f" {spin_multiplicity:.0f}"
+        output.append(f"{charge_str}{multip_str}")
+
+        if structure is not None:
+            output.append("\n".join(get_cart_coords_lines(symbols, positions)))
+        output.append("")
+    if gen_basis is not None:
+        output.append(f"{gen_basis}\n")
+    output.extend((para_dict_to_str(input_parameters, "\n"), "\n"))
+    return "\n".join(output)
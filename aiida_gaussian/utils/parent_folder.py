@@ -0,0 +1,63 @@
+"""
+Routines to stage the folder of a parent calculation
+
+To transfer less data, the parent can compress files at the end of its job
+(see get_compress_lines), which are then decompressed by the child when
+staged with 'parent_files'.
+"""
+
+import os
+
+COMPRESSED_EXT = ".gz"
+
+
+def get_parent_staging(parent_calc_folder, computer, folder_name, parent_files=None):
+    """Return the remote copy and symlink lists and the shell lines to stage the parent
+
+    By default the whole parent folder is symlinked as 'folder_name' (or copied,
+    if on another computer). With 'parent_files', only these files are staged
+    into 'folder_name', so that e.g. only the chk is transferred. Files that are
+    compressed ('.gz') are decompressed in the job script.
+
+    :param parent_calc_folder: RemoteData of the parent calculation
+    :param computer: the computer of the calculation
+    :param folder_name: name of the (local) folder containing the parent files
+    :param parent_files: optional list of file names relative to the parent folder
+    :return: (remote_copy_list, remote_symlink_list, prepend_lines)
+    """
+    comp_uuid = parent_calc_folder.computer.uuid
+    remote_path = parent_calc_folder.get_remote_path()
+
+    prepend_lines = []
+    if parent_files is None:
+        copy_infos = [(comp_uuid, remote_path, folder_name)]
+    else:
+        copy_infos = []
+        for fname in parent_files:
+            dest = os.path.join(folder_name, fname)
+            copy_infos.append((comp_uuid, os.path.join(remote_path, fname), dest))
+            if fname.endswith(COMPRESSED_EXT):
+                prepend_lines.append(
+                    f"gunzip -c {dest} > {dest[: -len(COMPRESSED_EXT)]}"
+                )
+
+    if computer.uuid == comp_uuid:
+        # if running on the same computer - make a symlink
+        # if not - copy the folder
+        return [], copy_infos, prepend_lines
+    return copy_infos, [], prepend_lines
+
+
+def get_compress_lines(file_names):
+    """Return the shell lines that compress the files at the end of a job
+
+    The files are kept, and the compressed ones ('.gz') are written next to them,
+    such that the job can be restarted from either of them.
+
+    :param file_names: list of file names relative to the working directory
+    :return: list of shell lines
+    """
+    return [
+        f"if [ -e {fname} ]; then gzip -c {fname} > {fname}{COMPRESSED_EXT}; fi"
+        for fname in file_names
+    ]
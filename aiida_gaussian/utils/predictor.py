@@ -0,0 +1,358 @@
+"""
+Runtime and resource predictor trained on previous Gaussian calculations
+
+The wall time is modelled as a power law of the number of basis functions,
+atoms and cores, with a factor per job type and functional, fitted by least
+squares in log space on the finished calculations of the local database.
+The number of cores is suggested from the fitted parallel scaling, if the
+training samples identify it. The memory is not learned, as Gaussian does not
+report its peak usage: it follows from a fixed estimate per basis function
+squared and core.
+"""
+
+import math
+
+import numpy as np
+from aiida.orm import CalcJobNode, Dict, QueryBuilder
+
+from aiida_gaussian.utils.caching import normalize_parameters
+from aiida_gaussian.utils.resources import (
+    DEFAULT_MEMORY_MARGIN,
+    get_cores_per_machine,
+    parse_memory_kb,
+)
+
+# Number of basis functions of (H/He, Li-Ne, Na-Ar) per basis set, in Gaussian's
+# default Cartesian (Pople) or spherical (others) d functions
+BASIS_FUNCTIONS_PER_ROW = {
+    "sto-3g": (1, 5, 9),
+    "3-21g": (2, 9, 13),
+    "6-31g": (2, 9, 13),
+    "6-31g(d)": (2, 15, 19),
+    "6-31g*": (2, 15, 19),
+    "6-31g(d,p)": (5, 15, 19),
+    "6-31g**": (5, 15, 19),
+    "6-31+g(d)": (2, 19, 23),
+    "6-31+g(d,p)": (5, 19, 23),
+    "6-311g(d,p)": (6, 18, 26),
+    "6-311+g(d,p)": (6, 22, 30),
+    "cc-pvdz": (5, 14, 18),
+    "cc-pvtz": (14, 30, 34),
+    "def2-svp": (5, 14, 18),
+    "def2-tzvp": (6, 31, 37),
+}
+
+# Column of log(num_cores) in the features
+CORES_FEATURE = 3
+
+# Job types that are distinguished by the model
+JOB_TYPES = ("opt", "freq", "td", "nmr", "irc", "scan", "stable")
+
+# Minimal suggested values
+MIN_WALLTIME_SECONDS = 600
+# More cores are only suggested if the parallel efficiency stays above this
+MIN_PARALLEL_EFFICIENCY = 0.5
+MIN_MEMORY_MB = 1024
+# Rough memory need in 8-byte words per basis function squared and core
+MEMORY_WORDS_PER_NBASIS2 = 4
+
+
+def get_element_row(atomic_number):
+    """Return the period index (0 for H/He, 1 for Li-Ne, ...)"""
+    for row, last in enumerate((2, 10, 18, 36, 54, 86)):
+        if atomic_number <= last:
+            return row
+    return 6
+
+
+def estimate_nbasis(atomic_numbers, basis_set):
+    """Estimate the number of basis functions of a molecule, or None if unknown
+
+    Elements beyond argon are approximated with the values of the third row.
+    """
+    key = basis_set.lower()
+    if key.startswith("def2") and not key.startswith("def2-"):
+        key = "def2-" + key[4:]
+    counts = BASIS_FUNCTIONS_PER_ROW.get(key)
+    if counts is None:
+        return None
+    return sum(counts[min(get_element_row(z), 2)] for z in atomic_numbers)
+
+
+def get_job_types(route_parameters):
+    """Return the job types of the route (normalized), 'sp' if there is none"""
+    job_types = [job for job in JOB_TYPES if job in route_parameters]
+    return job_types or ["sp"]
+
+
+def get_num_cores(parameters, resources):
+    """Number of cores used by Gaussian: '%nprocshared', or else the resources"""
+    link0 = parameters.get("link0_parameters") or {}
+    if "%nprocshared" in link0:
+        return int(link0["%nprocshared"])
+    return get_cores_per_machine(resources) or 1
+
+
+def get_sample(parameters, output_parameters, resources):
+    """Return the training sample of a finished calculation, or None
+
+    :param parameters: the input parameters dictionary
+    :param output_parameters: the parsed output dictionary (cclib attributes)
+    :param resources: the resources of the calculation
+    """
+    wall_times = (output_parameters.get("metadata") or {}).get("wall_time")
+    if not wall_times or "nbasis" not in output_parameters:
+        return None
+    parameters = normalize_parameters(parameters)
+    return {
+        "nbasis": output_parameters["nbasis"],
+        "natom": output_parameters["natom"],
+        "num_cores": get_num_cores(parameters, resources),
+        "functional": str(parameters.get("functional", "")).lower(),
+        "job_types": get_job_types(parameters.get("route_parameters") or {}),
+        "wall_time": float(np.sum(wall_times)),
+    }
+
+
+def get_training_samples(batch_size=100):
+    """Collect the samples of the successful GaussianCalculations in the database"""
+    qb = QueryBuilder()
+    qb.append(
+        CalcJobNode,
+        filters={
+            "process_type": "aiida.calculations:gaussian",
+            "attributes.exit_status": 0,
+        },
+        project=["attributes.resources"],
+        tag="calc",
+    )
+    qb.append(
+        Dict,
+        with_outgoing="calc",
+        edge_filters={"label": "parameters"},
+        project=["attributes"],
+    )
+    qb.append(
+        Dict,
+        with_incoming="calc",
+        edge_filters={"label": "output_parameters"},
+        project=["attributes"],
+    )
+
+    samples = []
+    for resources, parameters, output_parameters in qb.iterall(batch_size=batch_size):
+        sample = get_sample(parameters, output_parameters, resources or {})
+        if sample is not None:
+            samples.append(sample)
+    return samples
+
+
+class RuntimePredictor:
+    """
+    Predict the wall time of Gaussian calculations and suggest resources
+
+    Train it on the local database with RuntimePredictor.train(), or on
+    a list of samples (see get_sample) with RuntimePredictor.from_samples().
+    The fitted model can be kept with to_dict() and from_dict().
+
+    If the parallel scaling cannot be identified from the samples (e.g. all of
+    them ran on the same number of cores), the number of cores is left out of
+    the model (core_scaling is False) and no number of cores is suggested.
+    """
+
+    def __init__(self, coefficients, functionals, residual_std, core_scaling=True):
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.functionals = list(functionals)
+        self.residual_std = residual_std
+        self.core_scaling = core_scaling
+
+    def _get_features(self, nbasis, natom, num_cores, functional, job_types):
+        features = [1.0, math.log(nbasis), math.log(natom), math.log(num_cores)]
+        features += [float(job in job_types) for job in JOB_TYPES]
+        features += [float(functional == f) for f in self.functionals]
+        return features
+
+    @classmethod
+    def from_samples(cls, samples):
+        """Fit the model on the samples
+
+        The number of cores is only a feature if the samples identify its
+        scaling, i.e. if it varies and its column is not a linear combination
+        of the others (in particular of the intercept).
+        """
+        functionals = sorted({sample["functional"] for sample in samples})
+        predictor = cls([], functionals, 0.0)
+
+        num_features = 4 + len(JOB_TYPES) + len(functionals)
+        if len(samples) < num_features:
+            raise ValueError(
+                f"At least {num_features} samples are needed, found {len(samples)}."
+            )
+
+        x = np.array(
+            [
+                predictor._get_features(
+                    s["nbasis"],
+                    s["natom"],
+                    s["num_cores"],
+                    s["functional"],
+                    s["job_types"],
+                )
+                for s in samples
+            ]
+        )
+        y = np.log([s["wall_time"] for s in samples])
+
+        other_features = np.delete(x, CORES_FEATURE, axis=1)
+        predictor.core_scaling = bool(
+            np.ptp(x[:, CORES_FEATURE]) > 0
+            and np.linalg.matrix_rank(x) > np.linalg.matrix_rank(other_features)
+        )
+        if not predictor.core_scaling:
+            # otherwise lstsq makes up a scaling from the minimum-norm solution
+            x[:, CORES_FEATURE] = 0.0
+
+        coefficients, _, _, _ = np.linalg.lstsq(x, y, rcond=None)
+        predictor.coefficients = coefficients
+        predictor.residual_std = float(np.std(y - x @ coefficients))
+        return predictor
+
+    @classmethod
+    def train(cls, batch_size=100):
+        """Fit the model on the successful GaussianCalculations in the database"""
+        return cls.from_samples(get_training_samples(batch_size))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["coefficients"],
+            data["functionals"],
+            data["residual_std"],
+            data.get("core_scaling", True),
+        )
+
+    def to_dict(self):
+        return {
+            "coefficients": self.coefficients.tolist(),
+            "functionals": self.functionals,
+            "residual_std": self.residual_std,
+            "core_scaling": self.core_scaling,
+        }
+
+    def predict_wall_time(self, nbasis, natom, num_cores, functional, job_types):
+        """Predicted (median) wall time in seconds
+
+        Without core_scaling, num_cores has no effect on the prediction.
+        """
+        features = self._get_features(
+            nbasis, natom, num_cores, functional.lower(), job_types
+        )
+        return float(math.exp(np.dot(self.coefficients, features)))
+
+    def suggest_num_cores(self, max_cores, min_efficiency=MIN_PARALLEL_EFFICIENCY):
+        """Suggest the number of cores from the fitted parallel scaling
+
+        With the wall time proportional to num_cores**(-p), the speedup on n cores
+        is n**p and the parallel efficiency n**(p - 1). The largest power of two up
+        to 'max_cores' with an efficiency of at least 'min_efficiency' is returned.
+
+        :raises ValueError: if the scaling was not identified by the training samples
+        """
+        if not self.core_scaling:
+            raise ValueError(
+                "The parallel scaling is not known, as the training samples "
+                "do not vary in the number of cores."
+            )
+        exponent = -self.coefficients[3]
+        num_cores = 1
+        while (
+            2 * num_cores <= max_cores
+            and (2 * num_cores) ** (exponent - 1) >= min_efficiency
+        ):
+            num_cores *= 2
+        return num_cores
+
+    def suggest_resources(
+        self, structure, parameters, num_cores=None, max_cores=1, safety=2.0
+    ):
+        """Suggest the walltime, cores and memory of a calculation
+
+        The walltime is the prediction increased by 'safety' standard deviations
+        of the training residuals. The memory is a fixed estimate (not learned).
+
+        :param structure: the StructureData to be calculated
+        :param parameters: the input parameters dictionary
+        :param num_cores: the number of cores to be used, if None it is
+            suggested (see suggest_num_cores) with at most 'max_cores'
+        :return: dict with 'max_wallclock_seconds', '%nprocshared' and '%mem',
+            or None if the number of basis functions cannot be estimated
+        """
+        parameters = normalize_parameters(parameters)
+        atomic_numbers = structure.get_ase().get_atomic_numbers()
+        nbasis = estimate_nbasis(atomic_numbers, parameters.get("basis_set", ""))
+        if nbasis is None:
+            return None
+        if num_cores is None:
+            num_cores = self.suggest_num_cores(max_cores)
+
+        wall_time = self.predict_wall_time(
+            nbasis,
+            len(atomic_numbers),
+            num_cores,
+            str(parameters.get("functional", "")),
+            get_job_types(parameters.get("route_parameters") or {}),
+        )
+        wall_time *= math.exp(safety * self.residual_std)
+        walltime = max(MIN_WALLTIME_SECONDS, 60 * math.ceil(wall_time / 60))
+
+        memory_mb = MEMORY_WORDS_PER_NBASIS2 * nbasis**2 * num_cores * 8 / 1024**2
+        memory_mb = max(MIN_MEMORY_MB, 256 * math.ceil(memory_mb / 256))
+
+        return {
+            "max_wallclock_seconds": walltime,
+            "%nprocshared": str(num_cores),
+            "%mem": f"{memory_mb}MB",
+        }
+
+
+def set_predicted_resources(
+    builder, predictor, num_cores=None, suggest_cores=False, safety=2.0
+):
+    """Set the suggested walltime and memory on a GaussianCalculation builder
+
+    The number of cores defaults to the '%nprocshared' or the resources of the
+    builder. With 'suggest_cores', it is suggested instead (at most the cores per
+    machine of the resources) and set as '%nprocshared'.
+    max_memory_kb is raised to fit '%mem' with the margin, if it is set.
+
+    :raises ValueError: with 'suggest_cores', if the predictor has no core scaling
+    """
+    parameters = builder.parameters.get_dict()
+    options = builder.metadata.options
+    max_cores = get_cores_per_machine(options.resources) or 1
+    if num_cores is None and not suggest_cores:
+        num_cores = get_num_cores(normalize_parameters(parameters), options.resources)
+
+    suggestion = predictor.suggest_resources(
+        builder.structure, parameters, num_cores, max_cores=max_cores, safety=safety
+    )
+    if suggestion is None:
+        return None
+
+    options.max_wallclock_seconds = suggestion["max_wallclock_seconds"]
+    link0_keys = ("%mem", "%nprocshared") if suggest_cores else ("%mem",)
+    link0 = dict(parameters.get("link0_parameters") or {})
+    link0 = {key: val for key, val in link0.items() if key.lower() not in link0_keys}
+    for key in link0_keys:
+        link0[key] = suggestion[key]
+    parameters["link0_parameters"] = link0
+    builder.parameters = type(builder.parameters)(parameters)
+
+    if options.get("max_memory_kb"):
+        memory_kb = parse_memory_kb(suggestion["%mem"])
+        options.max_memory_kb = max(
+            options.max_memory_kb,
+            math.ceil(memory_kb / (1.0 - DEFAULT_MEMORY_MARGIN)),
+        )
+
+    return suggestion
@@ -0,0 +1,86 @@
+"""
+Routines to derive the Gaussian parallelization and memory from the AiiDA resources
+"""
+
+import re
+
+# Fraction of max_memory_kb that is not given to %mem, as Gaussian
+# needs memory beyond %mem (executables, I/O buffers, Linda)
+DEFAULT_MEMORY_MARGIN = 0.1
+
+MEMORY_UNITS_KB = {
+    "kb": 1,
+    "mb": 1024,
+    "gb": 1024**2,
+    "tb": 1024**3,
+    "kw": 8,
+    "mw": 8 * 1024,
+    "gw": 8 * 1024**2,
+    "tw": 8 * 1024**3,
+}
+
+# Pin Gaussian to the cores the scheduler bound the job to (GAUSS_CDEF is the
+# environment variable of %CPU), if they match the allocation. The affinity mask
+# follows the scheduler's cpuset/NUMA binding. Otherwise only set the number of
+# threads (GAUSS_PDEF is the environment variable of %NProcShared).
+CPU_PINNING_TEMPLATE = """\
+gaussian_cpus=$(taskset -pc $$ 2>/dev/null | sed 's/.*: *//')
+gaussian_ncpus=$(echo "$gaussian_cpus" | awk -F, '{{n = 0; for (i = 1; i <= NF; i++) {{k = split($i, r, "-"); n += (k == 2) ? r[2] - r[1] + 1 : 1}}; print n}}')
+if [ "$gaussian_ncpus" = "{num_cores}" ]; then
+    export GAUSS_CDEF="$gaussian_cpus"
+else
+    export GAUSS_PDEF={num_cores}
+fi"""
+
+
+def get_cores_per_machine(resources):
+    """Return the number of cores per machine of the resources, if it can be derived."""
+    if resources.get("num_cores_per_machine"):
+        return resources["num_cores_per_machine"]
+    if resources.get("num_mpiprocs_per_machine"):
+        return resources["num_mpiprocs_per_machine"] * resources.get(
+            "num_cores_per_mpiproc", 1
+        )
+    if resources.get("tot_num_mpiprocs") and resources.get("num_machines"):
+        return resources["tot_num_mpiprocs"] // resources["num_machines"]
+    return None
+
+
+def parse_memory_kb(value):
+    """Convert a Gaussian %mem value (e.g. '2GB', '500MW') to kB
+
+    A number without units is in words (8 bytes), as in Gaussian.
+    """
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([a-zA-Z]*)\s*", str(value))
+    if match is None:
+        raise ValueError(f"Invalid %mem value '{value}'.")
+    number, unit = float(match.group(1)), match.group(2).lower()
+    if unit == "":
+        return number * 8 / 1024
+    if unit not in MEMORY_UNITS_KB:
+        raise ValueError(f"Invalid %mem unit '{match.group(2)}'.")
+    return number * MEMORY_UNITS_KB[unit]
+
+
+def get_memory_mb(max_memory_kb, memory_margin=DEFAULT_MEMORY_MARGIN):
+    """The %mem in MB that fits in max_memory_kb with the safety margin"""
+    return int(max_memory_kb * (1.0 - memory_margin)) // 1024
+
+
+def get_resource_conflicts(link0_parameters, resources, max_memory_kb=None):
+    """Return the link0 parameters that exceed the allocation, as messages"""
+    conflicts = []
+    link0 = {key.lower(): val for key, val in (link0_parameters or {}).items()}
+
+    cores = get_cores_per_machine(resources)
+    if cores and "%nprocshared" in link0 and int(link0["%nprocshared"]) > cores:
+        conflicts.append(
+            f"'%nprocshared={link0['%nprocshared']}' exceeds "
+            f"the {cores} cores per machine."
+        )
+    if max_memory_kb and "%mem" in link0:
+        if parse_memory_kb(link0["%mem"]) > max_memory_kb:
+            conflicts.append(
+                f"'%mem={link0['%mem']}' exceeds max_memory_kb={max_memory_kb}."
+            )
+    return conflicts
@@ -0,0 +1,57 @@
+"""
+Vibrational thermochemistry from harmonic frequencies
+"""
+
+import numpy as np
+
+# CODATA 2014 values (as in ase.units), defined here as ase is slow to import
+# Boltzmann constant in eV/K
+KB_EV = 8.6173303e-5
+# Energy of a vibration of 1 cm^-1 (h * c * 1 cm^-1) in eV
+CM_TO_EV = 1.2398419739e-4
+
+DEFAULT_TEMPERATURES = (298.15,)
+
+# Frequencies below this value (cm^-1) are raised to it in the quasi-harmonic
+# approximation, as the harmonic entropy of very soft modes is unphysically large
+DEFAULT_FREQUENCY_CUTOFF = 100.0
+
+
+def get_vibrational_thermochemistry(
+    frequencies, temperatures=DEFAULT_TEMPERATURES, cutoff=DEFAULT_FREQUENCY_CUTOFF
+):
+    """Quasi-harmonic vibrational contributions to the thermochemistry
+
+    Real frequencies below 'cutoff' are raised to 'cutoff' (Cramer & Truhlar),
+    imaginary (negative) ones are skipped. All temperatures are evaluated at once.
+
+    :param frequencies: the frequencies in cm^-1
+    :param temperatures: the temperatures in K (> 0)
+    :param cutoff: the frequency cutoff in cm^-1 (0 for the harmonic approximation)
+    :return: dictionary with the zero-point energy 'zpe' [eV] and the arrays (one
+        value per temperature) 'internal_energy' (including the zpe) [eV],
+        'entropy' [eV/K], 'heat_capacity' [eV/K] and 'free_energy' [eV]
+    """
+    frequencies = np.asarray(frequencies, dtype=float)
+    frequencies = np.maximum(frequencies[frequencies > 0], cutoff)
+    temperatures = np.atleast_1d(np.asarray(temperatures, dtype=float))
+
+    # (temperatures, modes), with exp(-x) such that stiff modes do not overflow
+    energies = CM_TO_EV * frequencies
+    x = energies / (KB_EV * temperatures[:, np.newaxis])
+    boltzmann = np.exp(-x)
+    one_minus_boltzmann = -np.expm1(-x)
+    occupation = boltzmann / one_minus_boltzmann
+
+    zpe = 0.5 * np.sum(energies)
+    internal_energy = zpe + np.sum(energies * occupation, axis=1)
+    entropy = KB_EV * np.sum(x * occupation - np.log(one_minus_boltzmann), axis=1)
+    heat_capacity = KB_EV * np.sum(x**2 * occupation / one_minus_boltzmann, axis=1)
+
+    return {
+        "zpe": zpe,
+        "internal_energy": internal_energy,
+        "entropy": entropy,
+        "heat_capacity": heat_capacity,
+        "free_energy": internal_energy - temperatures * entropy,
+    }
@@ -2,5 +2,10 @@
 
 from .base import GaussianBaseWorkChain
 from .cubes import GaussianCubesWorkChain
+from .screening import GaussianScreeningWorkChain
 
-__all__ = ["GaussianBaseWorkChain", "GaussianCubesWorkChain"]
+__all__ = [
+    "GaussianBaseWorkChain",
+    "GaussianCubesWorkChain",
+    "GaussianScreeningWorkChain",
+]
@@ -1,5 +1,7 @@
 """Base work chain to run a Gaussian calculation."""
 
+import math
+
 from aiida.common import AttributeDict
 from aiida.engine import (
     BaseRestartWorkChain,
@@ -7,12 +9,44 @@ from aiida.engine import (
     process_handler,
     while_,
 )
-from aiida.orm import Dict
+from aiida.orm import Dict, Int
 from aiida.plugins import CalculationFactory, DataFactory
 
+from aiida_gaussian.utils.caching import get_normalized_parameters
+from aiida_gaussian.utils.resources import (
+    DEFAULT_MEMORY_MARGIN,
+    get_cores_per_machine,
+    get_memory_mb,
+    parse_memory_kb,
+)
+
 GaussianCalculation = CalculationFactory("gaussian")
 StructureData = DataFactory("core.structure")
 
+# Out-of-walltime restarts of optimizations get at least this much more time
+WALLTIME_INCREASE_FACTOR = 1.5
+# ... and enough time for this number of optimization steps
+MIN_RESTART_OPT_STEPS = 10
+# A log without termination counts as out of walltime if the job ran for at
+# least this fraction of its walltime (the last scheduler poll is a bit early)
+WALLTIME_TRUNCATION_FRACTION = 0.9
+
+# Out-of-memory restarts multiply %mem by this factor
+MEMORY_INCREASE_FACTOR = 2
+# %mem that Gaussian 16 uses if it is not specified
+GAUSSIAN_DEFAULT_MEMORY_KB = 800 * 1024
+
+
+def get_elapsed_seconds(node):
+    """Elapsed wall time of the job of a calculation, as reported by the scheduler
+
+    :return: the time in seconds, or None if the scheduler did not report it
+    """
+    job_info = node.get_last_job_info()
+    if job_info is None:
+        return None
+    return job_info.wallclock_time_seconds
+
 
 class GaussianBaseWorkChain(BaseRestartWorkChain):
     """Workchain to run a Gaussian calculation with automated error handling and restarts."""
@@ -24,6 +58,18 @@ class GaussianBaseWorkChain(BaseRestartWorkChain):
 
         super().define(spec)
         spec.expose_inputs(GaussianCalculation, namespace="gaussian")
+        spec.input(
+            "max_wallclock_seconds_limit",
+            valid_type=Int,
+            required=False,
+            help="Upper limit of the walltime when restarting out-of-time optimizations",
+        )
+        spec.input(
+            "max_memory_kb_limit",
+            valid_type=Int,
+            required=False,
+            help="Upper limit of the memory when restarting out-of-memory calculations",
+        )
 
         spec.outline(
             cls.setup,
@@ -59,6 +105,12 @@ class GaussianBaseWorkChain(BaseRestartWorkChain):
             self.exposed_inputs(GaussianCalculation, "gaussian")
         )
 
+        # Lower-case keys, as expected by the error handlers (the calculations are
+        # hashed with normalized parameters anyway, see GaussianCalcJobNode)
+        self.ctx.inputs.parameters = get_normalized_parameters(
+            self.ctx.inputs.parameters
+        )
+
     @process_handler(
         priority=400,
         exit_codes=[
@@ -72,6 +124,8 @@ class GaussianBaseWorkChain(BaseRestartWorkChain):
         1) scf=(yqc)
         and if it doesn't work then
         2) scf=(xqc)
+
+        The restarts continue from the checkpoint of the failed calculation.
         """
 
         params = dict(self.ctx.inputs.parameters)
@@ -101,10 +155,64 @@ class GaussianBaseWorkChain(BaseRestartWorkChain):
 
         # Update the params Dict
         route_params["scf"] = new_scf
+        self._set_checkpoint_restart(node, params)
         self.ctx.inputs.parameters = Dict(params)
 
         return ProcessHandlerReport(True)
 
+    def _set_checkpoint_restart(self, node, params):
+        """Restart from the checkpoint of the failed calculation, if there is one
+
+        The chk of the failed calculation is read as '%oldchk' from its folder,
+        with the orbitals as initial guess and, for optimizations, the last geometry
+        (Geom=AllCheck, which also takes the charge and multiplicity from the chk).
+        Other 'geom' options of the user (e.g. ModRedundant) are kept. The input
+        structure is then no longer passed, but kept in the context for the
+        handlers that modify it.
+        """
+        link0 = params.get("link0_parameters") or {}
+        chk_name = link0.get("%chk")
+        if chk_name is None or "remote_folder" not in node.outputs:
+            return
+
+        self.ctx.inputs.parent_calc_folder = node.outputs.remote_folder
+        link0["%oldchk"] = f"{GaussianCalculation.PARENT_FOLDER_NAME}/{chk_name}"
+        params["link0_parameters"] = link0
+
+        route_params = params["route_parameters"]
+        guess = route_params.get("guess")
+        if guess is None:
+            route_params["guess"] = "read"
+        elif isinstance(guess, dict):
+            guess["read"] = None
+        elif guess != "read":
+            route_params["guess"] = {guess: None, "read": None}
+
+        if "opt" in route_params:
+            geom = route_params.get("geom")
+            if geom is None:
+                route_params["geom"] = "allcheck"
+            elif isinstance(geom, dict):
+                geom["allcheck"] = None
+            elif geom != "allcheck":
+                route_params["geom"] = {geom: None, "allcheck": None}
+            if "structure" in self.ctx.inputs:
+                self.ctx.checkpoint_structure = self.ctx.inputs.pop("structure")
+
+        self.report(
+            f"Restarting from the checkpoint of {self.ctx.process_name}<{node.pk}>"
+        )
+
+    @staticmethod
+    def _unset_geom_allcheck(params):
+        """Remove Geom=AllCheck, keeping the other 'geom' options"""
+        route_params = params["route_parameters"]
+        geom = route_params.get("geom")
+        if isinstance(geom, dict):
+            geom.pop("allcheck", None)
+        if not geom or geom == "allcheck":
+            route_params.pop("geom", None)
+
     @process_handler(
         priority=500,
         exit_codes=[GaussianCalculation.exit_codes.ERROR_ASYTOP],
@@ -115,11 +223,163 @@ class GaussianBaseWorkChain(BaseRestartWorkChain):
         self.report(
             "ASYTOP error encountered. Rounding the coordinates to the 4th digit and trying again."
         )
-        structure_ase = self.ctx.inputs.structure.get_ase()
+        structure = self.ctx.inputs.get("structure")
+        if structure is None:
+            # the geometry was read from the chk: continue from the last one instead
+            if "output_structure" in node.outputs:
+                structure = node.outputs.output_structure
+            else:
+                structure = self.ctx.get("checkpoint_structure")
+            if structure is None:
+                self.report("No structure to round, giving up...")
+                return ProcessHandlerReport(
+                    True, self.exit_codes.ERROR_UNRECOVERABLE_TERMINATION
+                )  # pylint: disable=no-member
+            params = self.ctx.inputs.parameters.get_dict()
+            self._unset_geom_allcheck(params)
+            self.ctx.inputs.parameters = Dict(params)
+        structure_ase = structure.get_ase()
         structure_ase.set_positions(structure_ase.get_positions().round(4))
         self.ctx.inputs.structure = StructureData(ase=structure_ase)
         return ProcessHandlerReport(True)
 
+    @process_handler(
+        priority=300,
+        exit_codes=[GaussianCalculation.exit_codes.ERROR_OUT_OF_MEMORY],
+    )
+    def handle_out_of_memory(self, node):
+        """
+        Restart with more memory: %mem (and max_memory_kb) are multiplied,
+        or if that would exceed 'max_memory_kb_limit', %nprocshared is halved
+        to have more memory per core.
+        """
+        params = self.ctx.inputs.parameters.get_dict()
+        link0 = params.get("link0_parameters") or {}
+        options = self.ctx.inputs.metadata["options"]
+        settings = (
+            self.ctx.inputs.settings.get_dict() if "settings" in self.ctx.inputs else {}
+        )
+        auto_resources = settings.get("auto_resources", False)
+        memory_margin = settings.get("memory_margin", DEFAULT_MEMORY_MARGIN)
+        max_memory_kb = options.get("max_memory_kb")
+
+        if "%mem" in link0:
+            memory_kb = parse_memory_kb(link0["%mem"])
+        elif auto_resources and max_memory_kb:
+            memory_kb = get_memory_mb(max_memory_kb, memory_margin) * 1024
+        else:
+            memory_kb = GAUSSIAN_DEFAULT_MEMORY_KB
+
+        new_memory_kb = int(memory_kb * MEMORY_INCREASE_FACTOR)
+        # the allocation needs to leave the margin on top of %mem
+        new_max_memory_kb = None
+        if max_memory_kb:
+            new_max_memory_kb = max(
+                max_memory_kb, math.ceil(new_memory_kb / (1.0 - memory_margin))
+            )
+
+        limit = None
+        if "max_memory_kb_limit" in self.inputs:
+            limit = self.inputs.max_memory_kb_limit.value
+
+        if limit is None or (new_max_memory_kb or new_memory_kb) <= limit:
+            link0["%mem"] = f"{new_memory_kb // 1024}MB"
+            if new_max_memory_kb:
+                options["max_memory_kb"] = new_max_memory_kb
+            self.report(f"Out of memory, retrying with %mem={link0['%mem']}")
+        else:
+            if "%nprocshared" in link0:
+                nproc = int(link0["%nprocshared"])
+            elif auto_resources:
+                nproc = get_cores_per_machine(options["resources"])
+            else:
+                nproc = 1
+            if nproc <= 1:
+                self.report("Out of memory at the memory limit, giving up...")
+                return ProcessHandlerReport(
+                    True, self.exit_codes.ERROR_UNRECOVERABLE_TERMINATION
+                )  # pylint: disable=no-member
+            link0["%nprocshared"] = str(nproc // 2)
+            self.report(
+                "Out of memory at the memory limit, "
+                f"retrying with %nprocshared={link0['%nprocshared']}"
+            )
+
+        params["link0_parameters"] = link0
+        self.ctx.inputs.parameters = Dict(params)
+        return ProcessHandlerReport(True)
+
+    @process_handler(
+        priority=100,
+        exit_codes=[
+            GaussianCalculation.exit_codes.ERROR_NO_NORMAL_TERMINATION,
+            GaussianCalculation.exit_codes.ERROR_SCHEDULER_OUT_OF_WALLTIME,
+        ],
+    )
+    def handle_out_of_walltime_opt(self, node):
+        """
+        Continue an optimization that ran out of time from its last geometry
+
+        Handled if the scheduler reported the walltime as exceeded or, for logs
+        without termination, if the job ran for (nearly) its whole walltime.
+        The geometry is read from the checkpoint (Geom=AllCheck) if there is one,
+        otherwise it is taken from the partial log. The walltime is increased,
+        based on the elapsed time per optimization step.
+        """
+        params = self.ctx.inputs.parameters.get_dict()
+        if "opt" not in params.get("route_parameters", {}):
+            return None
+
+        walltime = node.get_option("max_wallclock_seconds")
+        elapsed = get_elapsed_seconds(node)
+        walltime_exit_code = (
+            GaussianCalculation.exit_codes.ERROR_SCHEDULER_OUT_OF_WALLTIME
+        )
+        if node.exit_status != walltime_exit_code.status:
+            # e.g. a crash of Gaussian or of the node
+            if not walltime or elapsed is None:
+                return None
+            if elapsed < WALLTIME_TRUNCATION_FRACTION * walltime:
+                return None
+        elif elapsed is None:
+            # not reported by the scheduler, but the job ran for the whole walltime
+            elapsed = walltime
+
+        num_steps = 0
+        if "output_parameters" in node.outputs:
+            num_steps = len(node.outputs.output_parameters.get("atomcoords", []))
+        if num_steps == 0:
+            self.report("The optimization did not complete any step, giving up...")
+            return ProcessHandlerReport(
+                True, self.exit_codes.ERROR_UNRECOVERABLE_TERMINATION
+            )  # pylint: disable=no-member
+
+        if "%chk" in (params.get("link0_parameters") or {}):
+            self._set_checkpoint_restart(node, params)
+        elif "output_structure" in node.outputs:
+            self.ctx.inputs.structure = node.outputs.output_structure
+        self.ctx.inputs.parameters = Dict(params)
+
+        if elapsed:
+            time_per_step = elapsed / num_steps
+            new_walltime = math.ceil(
+                max(
+                    (walltime or elapsed) * WALLTIME_INCREASE_FACTOR,
+                    time_per_step * MIN_RESTART_OPT_STEPS,
+                )
+            )
+            if "max_wallclock_seconds_limit" in self.inputs:
+                new_walltime = min(
+                    new_walltime, self.inputs.max_wallclock_seconds_limit.value
+                )
+            self.ctx.inputs.metadata["options"]["max_wallclock_seconds"] = new_walltime
+            self.report(
+                f"Optimization out of time after {num_steps} steps in {elapsed:.0f} s "
+                f"({time_per_step:.0f} s/step), restarting with {new_walltime} s"
+            )
+
+        return ProcessHandlerReport(True)
+
     @process_handler(
         priority=0,
         exit_codes=[GaussianCalculation.exit_codes.ERROR_NO_NORMAL_TERMINATION],
@@ -1,14 +1,100 @@
 import io
 
-import ase
 import numpy as np
-from aiida.engine import ExitCode, ToContext, WorkChain
-from aiida.orm import Bool, Code, Dict, Float, List, RemoteData, SinglefileData, Str
+from aiida.engine import ExitCode, ToContext, WorkChain, calcfunction
+from aiida.orm import (
+    Bool,
+    Code,
+    Dict,
+    Float,
+    Int,
+    List,
+    RemoteData,
+    SinglefileData,
+    Str,
+)
 from aiida.plugins import CalculationFactory
 
+from aiida_gaussian.utils.caching import get_shared_node
+
 FormchkCalculation = CalculationFactory("gaussian.formchk")
 CubegenCalculation = CalculationFactory("gaussian.cubegen")
 
+# Approximate size of one grid point in a cube file written by cubegen
+# (values in the %13.5E format, six per line)
+CUBE_FILE_BYTES_PER_POINT = 13.2
+
+# Smallest cube that the spacing can be coarsened to (2x2x2 points)
+MIN_GRID_POINTS = 8
+
+
+def get_max_grid_points(max_grid_points=None, max_cube_mb=None):
+    """Maximum number of grid points per cube based on the budget (or None)"""
+    limits = []
+    if max_grid_points is not None:
+        limits.append(max_grid_points)
+    if max_cube_mb is not None:
+        limits.append(int(max_cube_mb * 1024**2 / CUBE_FILE_BYTES_PER_POINT))
+    if not limits:
+        return None
+    return min(limits)
+
+
+def get_stencil_box(positions, edge_space, dx):
+    """Return the center, size [ang] and number of points of the cube box"""
+
+    es = edge_space + dx
+
+    xmin = np.min(positions[:, 0]) - es
+    xmax = np.max(positions[:, 0]) + es
+    ymin = np.min(positions[:, 1]) - es
+    ymax = np.max(positions[:, 1]) + es
+    zmin = np.min(positions[:, 2]) - es
+    zmax = np.max(positions[:, 2]) + es
+
+    geom_center = np.array([xmin + xmax, ymin + ymax, zmin + zmax]) / 2.0
+
+    cell = np.array([xmax - xmin, ymax - ymin, zmax - zmin])
+
+    cell_n = (np.round(cell / dx)).astype(int)
+
+    return geom_center, cell, cell_n
+
+
+def get_budgeted_dx(positions, edge_space, dx, max_points):
+    """Coarsen the spacing until the cube fits into the grid budget
+
+    The budget needs to be at least MIN_GRID_POINTS, as the box always spans
+    at least two points along each axis.
+    """
+    if max_points < MIN_GRID_POINTS:
+        raise ValueError(
+            f"The grid budget {max_points} is below the minimum of {MIN_GRID_POINTS}."
+        )
+
+    _, _, cell_n = get_stencil_box(positions, edge_space, dx)
+
+    while np.prod(cell_n, dtype=np.int64) > max_points:
+        # the box also grows slightly with dx, so iterate until converged
+        scale = (np.prod(cell_n, dtype=np.int64) / max_points) ** (1.0 / 3.0)
+        dx *= max(scale, 1.001)
+        _, _, cell_n = get_stencil_box(positions, edge_space, dx)
+
+    return dx
+
+
+@calcfunction
+def get_effective_dx(
+    gaussian_output_params, dx, edge_space, max_grid_points=None, max_cube_mb=None
+):
+    """Cube spacing [ang] of the first geometry within the grid budget"""
+    positions = np.array(gaussian_output_params["atomcoords"][0])
+    max_points = get_max_grid_points(
+        max_grid_points.value if max_grid_points is not None else None,
+        max_cube_mb.value if max_cube_mb is not None else None,
+    )
+    return Float(get_budgeted_dx(positions, edge_space.value, dx.value, max_points))
+
 
 class GaussianCubesWorkChain(WorkChain):
     @classmethod
@@ -88,6 +174,22 @@ class GaussianCubesWorkChain(WorkChain):
             help="Cube file spacing [ang].",
         )
 
+        spec.input(
+            "max_grid_points",
+            valid_type=Int,
+            required=False,
+            help="Maximum number of grid points in a single cube. "
+            "If exceeded, the spacing 'dx' is coarsened to stay within budget.",
+        )
+
+        spec.input(
+            "max_cube_mb",
+            valid_type=Float,
+            required=False,
+            help="Maximum size of a single cube file [MB]. "
+            "If exceeded, the spacing 'dx' is coarsened to stay within budget.",
+        )
+
         spec.input(
             "retrieve_cubes",
             valid_type=Bool,
@@ -113,6 +215,13 @@ class GaussianCubesWorkChain(WorkChain):
 
         spec.outline(cls.check_input, cls.formchk_step, cls.cubegen_step, cls.finalize)
 
+        spec.output(
+            "effective_dx",
+            valid_type=Float,
+            required=False,
+            help="Cube file spacing [ang] that was actually used.",
+        )
+
         spec.outputs.dynamic = True
 
         spec.exit_code(
@@ -121,6 +230,12 @@ class GaussianCubesWorkChain(WorkChain):
             message="Input options are invalid.",
         )
 
+        spec.exit_code(
+            303,
+            "ERROR_GRID_BUDGET",
+            message="The grid budget is below the minimum cube of 2x2x2 points.",
+        )
+
         spec.exit_code(
             390,
             "ERROR_TERMINATION",
@@ -147,8 +262,24 @@ class GaussianCubesWorkChain(WorkChain):
     def check_input(self):
         if self.inputs.orbital_index_ref not in ("half_num_el", "abs"):
             return self.exit_codes.ERROR_INPUT  # pylint: disable=no-member
+        max_points = self._get_max_grid_points()
+        if max_points is not None and max_points < MIN_GRID_POINTS:
+            self.report(
+                f"The grid budget of {max_points} points is below the minimum cube "
+                f"of {MIN_GRID_POINTS} points"
+            )
+            return self.exit_codes.ERROR_GRID_BUDGET  # pylint: disable=no-member
         return ExitCode(0)
 
+    def _get_max_grid_points(self):
+        """Maximum number of grid points per cube based on the budget inputs (or None)"""
+        return get_max_grid_points(
+            *(
+                self.inputs[name].value if name in self.inputs else None
+                for name in ("max_grid_points", "max_cube_mb")
+            )
+        )
+
     def formchk_step(self):
 
         self.report("Running FormChk")
@@ -177,7 +308,6 @@ class GaussianCubesWorkChain(WorkChain):
         return label
 
     def cubegen_step(self):
-
         if not self._check_if_previous_calc_ok(self.ctx.formchk_node):
             return self.exit_codes.ERROR_TERMINATION  # pylint: disable=no-member
 
@@ -188,29 +318,36 @@ class GaussianCubesWorkChain(WorkChain):
         # --------------------------------------------------------------
         # Create the stencil
 
-        ase_atoms = ase.Atoms(
-            gout_params["atomnos"], positions=gout_params["atomcoords"][0]
+        positions = np.array(gout_params["atomcoords"][0])
+
+        self.ctx.effective_dx = self.inputs.dx
+        if self._get_max_grid_points() is not None:
+            budget = {
+                name: self.inputs[name]
+                for name in ("max_grid_points", "max_cube_mb")
+                if name in self.inputs
+            }
+            self.ctx.effective_dx = get_effective_dx(
+                self.inputs.gaussian_output_params,
+                self.inputs.dx,
+                self.inputs.edge_space,
+                **budget,
+            )
+        dx = self.ctx.effective_dx.value
+        if dx != self.inputs.dx.value:
+            self.report(
+                "Cube exceeds the grid budget, coarsening dx from %.4f to %.4f ang"
+                % (self.inputs.dx.value, dx)
+            )
+
+        geom_center, cell, cell_n = get_stencil_box(
+            positions, self.inputs.edge_space.value, dx
         )
 
-        es = self.inputs.edge_space.value + self.inputs.dx.value
-
-        xmin = np.min(ase_atoms.positions[:, 0]) - es
-        xmax = np.max(ase_atoms.positions[:, 0]) + es
-        ymin = np.min(ase_atoms.positions[:, 1]) - es
-        ymax = np.max(ase_atoms.positions[:, 1]) + es
-        zmin = np.min(ase_atoms.positions[:, 2]) - es
-        zmax = np.max(ase_atoms.positions[:, 2]) + es
-
-        geom_center = np.array([xmin + xmax, ymin + ymax, zmin + zmax]) / 2.0
-
-        cell = np.array([xmax - xmin, ymax - ymin, zmax - zmin])
-
-        cell_n = (np.round(cell / self.inputs.dx.value)).astype(int)
-
         stencil = b"-1 %f %f %f\n" % tuple(geom_center - cell / 2)
-        stencil += b"%d %f 0.0 0.0\n" % (cell_n[0], self.inputs.dx.value)
-        stencil += b"%d 0.0 %f 0.0\n" % (cell_n[1], self.inputs.dx.value)
-        stencil += b"%d 0.0 0.0 %f\n" % (cell_n[2], self.inputs.dx.value)
+        stencil += b"%d %f 0.0 0.0\n" % (cell_n[0], dx)
+        stencil += b"%d 0.0 %f 0.0\n" % (cell_n[1], dx)
+        stencil += b"%d 0.0 0.0 %f\n" % (cell_n[2], dx)
 
         # --------------------------------------------------------------
         # Create the parameters dict
@@ -279,8 +416,9 @@ class GaussianCubesWorkChain(WorkChain):
         builder = CubegenCalculation.get_builder()
         builder.parent_calc_folder = self.ctx.formchk_node.outputs.remote_folder
         builder.code = self.inputs.cubegen_code
-        builder.stencil = SinglefileData(io.BytesIO(stencil))
-        builder.parameters = Dict(params_dict)
+        # identical stencils and parameters are shared between the runs
+        builder.stencil = get_shared_node(SinglefileData(io.BytesIO(stencil)))
+        builder.parameters = get_shared_node(Dict(params_dict))
         builder.retrieve_cubes = self.inputs.retrieve_cubes
 
         builder.parser_params = self.inputs.cubegen_parser_params
@@ -301,5 +439,6 @@ class GaussianCubesWorkChain(WorkChain):
             return self.exit_codes.ERROR_TERMINATION  # pylint: disable=no-member
 
         self.report("Setting outputs")
+        self.out("effective_dx", self.ctx.effective_dx)
         for cubegen_out in list(self.ctx.cubegen_node.outputs):
             self.out(cubegen_out, self.ctx.cubegen_node.outputs[cubegen_out])
@@ -0,0 +1,183 @@
+"""Work chain to screen many structures with throttled concurrency."""
+
+import numpy as np
+from aiida.common import AttributeDict
+from aiida.engine import WorkChain, calcfunction, while_
+from aiida.orm import ArrayData, Int
+from aiida.plugins import DataFactory
+
+from aiida_gaussian.parsers.gaussian import get_homo_lumo_gaps
+from aiida_gaussian.utils.caching import get_structure_hash
+
+from .base import GaussianBaseWorkChain
+
+StructureData = DataFactory("core.structure")
+
+
+@calcfunction
+def collect_results(exit_statuses, **outputs):
+    """Collect the results of the screened structures in one ArrayData
+
+    :param exit_statuses: Dict of the label of each structure to the exit status
+        of its calculation (-1 if it did not finish)
+    :param outputs: the namespaces 'energy_ev' and 'output_parameters' of the
+        label to the output of its calculation (if any); the gap is computed from
+        the orbital energies if the parser did not set it
+    """
+    energy_ev = outputs.get("energy_ev", {})
+    output_parameters = outputs.get("output_parameters", {})
+
+    labels = sorted(exit_statuses.get_dict())
+    energies = np.full(len(labels), np.nan)
+    gaps = np.full(len(labels), np.nan)
+    for i, label in enumerate(labels):
+        if label in energy_ev:
+            energies[i] = float(energy_ev[label])
+        if label in output_parameters:
+            parameters = output_parameters[label]
+            gap = parameters.get("gap")
+            if gap is None and "moenergies" in parameters and "homos" in parameters:
+                gap = get_homo_lumo_gaps(
+                    parameters["moenergies"], parameters["homos"]
+                ).get("gap")
+            if gap is not None:
+                gaps[i] = gap
+
+    results = ArrayData()
+    results.set_array("labels", np.array(labels))
+    results.set_array("energy_ev", energies)
+    results.set_array("gap", gaps)
+    results.set_array(
+        "exit_status", np.array([exit_statuses[label] for label in labels], dtype=int)
+    )
+    return results
+
+
+class GaussianScreeningWorkChain(WorkChain):
+    """
+    Run a GaussianBaseWorkChain for each structure, with at most 'max_concurrent'
+    of them running at a time
+
+    Identical structures (same hash after rounding) are calculated only once.
+    The structures are submitted in batches of 'max_concurrent', the next batch
+    once all children of the previous one have terminated.
+
+    The results are collected in the 'results' ArrayData with the arrays
+    'labels', 'energy_ev', 'gap' (NaN if not available) and 'exit_status'
+    (-1 if the child did not finish).
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+
+        spec.input_namespace(
+            "structures",
+            valid_type=StructureData,
+            dynamic=True,
+            help="The structures to screen, keyed by label.",
+        )
+        spec.expose_inputs(
+            GaussianBaseWorkChain,
+            namespace="base",
+            exclude=("gaussian.structure",),
+        )
+        spec.input(
+            "max_concurrent",
+            valid_type=Int,
+            default=lambda: Int(10),
+            help="Maximum number of child work chains running at the same time.",
+        )
+
+        spec.outline(
+            cls.setup,
+            while_(cls.has_queued)(
+                cls.submit_batch,
+                cls.inspect_batch,
+            ),
+            cls.results,
+        )
+
+        spec.output(
+            "results",
+            valid_type=ArrayData,
+            help="Energies, gaps and exit statuses of all structures",
+        )
+
+        spec.exit_code(
+            410,
+            "ERROR_ALL_FAILED",
+            message="None of the screening calculations finished successfully.",
+        )
+
+    def setup(self):
+        """Deduplicate the structures and queue the unique ones."""
+        self.ctx.queue = []
+        self.ctx.duplicates = {}
+
+        representatives = {}
+        for label in sorted(self.inputs.structures):
+            structure_hash = get_structure_hash(self.inputs.structures[label])
+            if structure_hash in representatives:
+                self.ctx.duplicates[label] = representatives[structure_hash]
+            else:
+                representatives[structure_hash] = label
+                self.ctx.queue.append(label)
+
+        if self.ctx.duplicates:
+            self.report(f"Skipping {len(self.ctx.duplicates)} duplicate structures")
+
+    def has_queued(self):
+        return bool(self.ctx.queue)
+
+    def submit_batch(self):
+        """Submit the next 'max_concurrent' structures."""
+        self.ctx.batch = self.ctx.queue[: self.inputs.max_concurrent.value]
+        self.ctx.queue = self.ctx.queue[len(self.ctx.batch) :]
+
+        for label in self.ctx.batch:
+            inputs = AttributeDict(self.exposed_inputs(GaussianBaseWorkChain, "base"))
+            inputs.gaussian = AttributeDict(inputs.gaussian)
+            inputs.gaussian.structure = self.inputs.structures[label]
+            inputs.metadata = {"call_link_label": label}
+            node = self.submit(GaussianBaseWorkChain, **inputs)
+            self.to_context(**{f"children.{label}": node})
+
+        self.report(
+            f"Submitted {len(self.ctx.batch)} structures, {len(self.ctx.queue)} queued"
+        )
+
+    def inspect_batch(self):
+        """Report the children of the batch that did not finish successfully."""
+        failed = [
+            label
+            for label in self.ctx.batch
+            if not self.ctx.children[label].is_finished_ok
+        ]
+        if failed:
+            self.report(f"Failed: {', '.join(failed)}")
+
+    def results(self):
+        """Aggregate the results of all structures in one ArrayData."""
+        exit_statuses = {}
+        energies = {}
+        parameters = {}
+        for label in sorted(self.inputs.structures):
+            node = self.ctx.children[self.ctx.duplicates.get(label, label)]
+            exit_statuses[label] = -1 if node.exit_status is None else node.exit_status
+            if "energy_ev" in node.outputs:
+                energies[label] = node.outputs.energy_ev
+            if "output_parameters" in node.outputs:
+                parameters[label] = node.outputs.output_parameters
+
+        results = collect_results(
+            exit_statuses,
+            energy_ev=energies,
+            output_parameters=parameters,
+            metadata={"call_link_label": "collect_results"},
+        )
+        self.out("results", results)
+
+        if 0 not in exit_statuses.values():
+            return self.exit_codes.ERROR_ALL_FAILED
+        return None
@@ -0,0 +1,213 @@
+"""
+Benchmarks for :mod:`aiida_gaussian.utils.cube` and the cubegen parser.
+
+Synthetic cubes are generated on the fly, so no Gaussian installation is needed.
+The tests run small cubes and guard against regressions of the peak memory and of
+(generously bounded) throughput. For measurements on larger cubes, run e.g.
+
+    python tests/benchmarks/test_cube_benchmark.py --cell-n 200 200 200 --natoms 100
+"""
+# pylint: disable=redefined-outer-name
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from aiida_gaussian.utils.cube import ANG_TO_BOHR, Cube
+
+
+def generate_cube_file(filepath, cell_n=(60, 60, 60), natoms=20, section_headers=False):
+    """Write a synthetic cube file with random atoms and data in the cubegen format."""
+    rng = np.random.default_rng(42)
+    dx = 0.15 * ANG_TO_BOHR
+    extent = np.array(cell_n) * dx
+    positions = 0.2 * extent + 0.6 * extent * rng.random((natoms, 3))
+    numbers = rng.integers(1, 10, natoms)
+
+    with open(filepath, "w") as f:
+        f.write(" synthetic cube\n")
+        f.write(" generated for benchmarking\n")
+        f.write(
+            "%5d %11.6f %11.6f %11.6f\n"
+            % (-natoms if section_headers else natoms, 0.0, 0.0, 0.0)
+        )
+        for i in range(3):
+            step = np.zeros(3)
+            step[i] = dx
+            f.write("%5d %11.6f %11.6f %11.6f\n" % (cell_n[i], *step))
+        for number, pos in zip(numbers, positions):
+            f.write("%5d %11.6f %11.6f %11.6f %11.6f\n" % (number, number, *pos))
+        if section_headers:
+            f.write("    1    1\n")
+        data = rng.normal(scale=1e-2, size=cell_n)
+        # cubegen writes six values per line for each (x, y) column
+        for column in data.reshape(-1, cell_n[2]):
+            for i in range(0, len(column), 6):
+                f.write("".join(" %12.5E" % v for v in column[i : i + 6]) + "\n")
+
+    return filepath
+
+
+def measure(func, *args, **kwargs):
+    """Return the wall time [s] and the peak traced memory [MB] of a function call.
+
+    The timing and the memory tracing are done in separate calls, as tracing
+    slows down the execution considerably.
+    """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return elapsed, peak / 1024**2
+
+
+def run_cube_benchmarks(
+    directory, cell_n=(60, 60, 60), natoms=20, section_headers=False
+):
+    """Run the cube benchmarks and return a dict of results per operation.
+
+    Each entry contains the wall time 'time_s', the peak memory 'peak_mb' and the
+    throughput 'mb_per_s' (file size based) or 'mpoints_per_s'.
+    """
+    cube_path = os.path.join(directory, "bench.cube")
+    generate_cube_file(cube_path, cell_n, natoms, section_headers)
+    file_mb = os.path.getsize(cube_path) / 1024**2
+    mpoints = np.prod(cell_n) / 1e6
+
+    cube = Cube.from_file(cube_path)
+
+    def swapaxes():
+        cube.swapaxes(0, 2)
+        cube.swapaxes(0, 2)
+
+    operations = {
+        "from_file": (Cube.from_file, (cube_path,), file_mb, "mb_per_s"),
+        "write_cube_file": (
+            cube.write_cube_file,
+            (os.path.join(directory, "bench_out.cube"),),
+            file_mb,
+            "mb_per_s",
+        ),
+        "swapaxes": (swapaxes, (), mpoints, "mpoints_per_s"),
+        "get_plane_above_topmost_atom": (
+            cube.get_plane_above_topmost_atom,
+            (-0.5,),
+            mpoints,
+            "mpoints_per_s",
+        ),
+    }
+
+    results = {}
+    for name, (func, args, size, unit) in operations.items():
+        elapsed, peak_mb = measure(func, *args)
+        results[name] = {
+            "time_s": elapsed,
+            "peak_mb": peak_mb,
+            unit: size / max(elapsed, 1e-9),
+        }
+
+    return results
+
+
+def run_parser_benchmark(directory, parser_params=None):
+    """Benchmark ``CubegenBaseParser._parse_folders`` on the cubes in ``directory``.
+
+    Requires a loaded AiiDA profile, as the parser creates AiiDA data nodes.
+    """
+    from aiida.orm import CalcJobNode, FolderData
+
+    from aiida_gaussian.parsers.cubegen import CubegenBaseParser
+
+    cube_files = [f for f in os.listdir(directory) if f.endswith(".cube")]
+    file_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in cube_files)
+    file_mb /= 1024**2
+
+    folder = FolderData(tree=directory)
+    node = CalcJobNode(process_type="aiida.calculations:gaussian.cubegen")
+
+    def parse_folders():
+        CubegenBaseParser(node)._parse_folders([folder], dict(parser_params or {}))
+
+    elapsed, peak_mb = measure(parse_folders)
+    return {
+        "_parse_folders": {
+            "time_s": elapsed,
+            "peak_mb": peak_mb,
+            "mb_per_s": file_mb / max(elapsed, 1e-9),
+        }
+    }
+
+
+@pytest.mark.parametrize("section_headers", [False, True])
+def test_cube_benchmarks(tmp_path, section_headers):
+    """Guard the cube operations against memory and (gross) speed regressions."""
+    cell_n = (40, 40, 40)
+    data_mb = np.prod(cell_n) * 8 / 1024**2
+
+    results = run_cube_benchmarks(
+        str(tmp_path), cell_n=cell_n, natoms=10, section_headers=section_headers
+    )
+
+    # Reading should not need more than a few copies of the data array
+    assert results["from_file"]["peak_mb"] < 3 * data_mb
+    assert results["from_file"]["mb_per_s"] > 0.5
+    assert results["write_cube_file"]["mb_per_s"] > 0.5
+    # Swapping axes and taking planes are views and should not copy the data
+    assert results["swapaxes"]["peak_mb"] < 0.5 * data_mb
+    assert results["get_plane_above_topmost_atom"]["peak_mb"] < 0.5 * data_mb
+
+
+def test_parser_benchmark(tmp_path):
+    """Guard the ``CubegenBaseParser._parse_folders`` path against memory regressions."""
+    cell_n = (40, 40, 40)
+    data_mb = np.prod(cell_n) * 8 / 1024**2
+    generate_cube_file(str(tmp_path / "1_homo.cube"), cell_n=cell_n, natoms=10)
+
+    results = run_parser_benchmark(str(tmp_path), {"heights": [0.0]})
+
+    assert results["_parse_folders"]["peak_mb"] < 3 * data_mb
+    assert results["_parse_folders"]["mb_per_s"] > 0.5
+
+
+def main():
+    """Run the benchmarks from the command line and print a report."""
+    import tempfile
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cell-n", type=int, nargs=3, default=[100, 100, 100])
+    parser.add_argument("--natoms", type=int, default=50)
+    parser.add_argument("--section-headers", action="store_true")
+    parser.add_argument(
+        "--parser", action="store_true", help="also run the parser (needs a profile)"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_cube_benchmarks(
+            directory, args.cell_n, args.natoms, args.section_headers
+        )
+        if args.parser:
+            from aiida import load_profile
+
+            load_profile()
+            os.remove(os.path.join(directory, "bench_out.cube"))
+            results.update(run_parser_benchmark(directory, {"heights": [0.0]}))
+
+    for name, result in results.items():
+        line = "%-30s" % name
+        line += "".join(" %s=%-10.3f" % item for item in result.items())
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
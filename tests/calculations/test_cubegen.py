@@ -0,0 +1,26 @@
+"""Tests for the cubegen plugin."""
+from aiida.orm import Dict, List, RemoteData
+
+from aiida_gaussian.calculations import CubegenCalculation
+
+
+def test_parent_files(fixture_code, fixture_localhost, generate_calc_job):
+    """Test that only the fchk of a parent on the same computer is symlinked."""
+    parent = RemoteData(computer=fixture_localhost, remote_path="/remote/parent")
+    inputs = {
+        "code": fixture_code("gaussian.cubegen"),
+        "parameters": Dict({"homo": {"kind": "MO=Homo", "npts": -2}}),
+        "parent_calc_folder": parent,
+        "parent_files": List(["aiida.fchk"]),
+        "metadata": {
+            "options": {"resources": {"num_machines": 1, "tot_num_mpiprocs": 1}}
+        },
+    }
+    tmp_path, calc_info = generate_calc_job(CubegenCalculation, inputs)
+
+    assert calc_info.remote_copy_list == []
+    assert calc_info.remote_symlink_list == [
+        (fixture_localhost.uuid, "/remote/parent/aiida.fchk", "parent_calc/aiida.fchk")
+    ]
+    assert (tmp_path / "parent_calc").is_dir()
+    assert "gunzip" not in calc_info.prepend_text
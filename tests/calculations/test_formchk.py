@@ -0,0 +1,35 @@
+"""Tests for the formchk plugin."""
+from aiida.orm import List, RemoteData
+
+from aiida_gaussian.calculations import FormchkCalculation
+
+
+def test_parent_files(fixture_code, aiida_computer_local, generate_calc_job):
+    """Test that only the chk is copied from a parent on another computer."""
+    parent = RemoteData(
+        computer=aiida_computer_local(label="parent"), remote_path="/remote/parent"
+    )
+    inputs = {
+        "code": fixture_code("gaussian.formchk"),
+        "parent_calc_folder": parent,
+        "parent_files": List(["aiida.chk.gz"]),
+        "metadata": {"options": {"resources": {"num_machines": 1}}},
+    }
+    tmp_path, calc_info = generate_calc_job(FormchkCalculation, inputs)
+
+    assert calc_info.remote_symlink_list == []
+    assert calc_info.remote_copy_list == [
+        (
+            parent.computer.uuid,
+            "/remote/parent/aiida.chk.gz",
+            "parent_calc/aiida.chk.gz",
+        )
+    ]
+    assert (tmp_path / "parent_calc").is_dir()
+    assert calc_info.prepend_text == (
+        "gunzip -c parent_calc/aiida.chk.gz > parent_calc/aiida.chk"
+    )
+    assert calc_info.codes_info[0].cmdline_params == [
+        "parent_calc/aiida.chk",
+        "aiida.fchk",
+    ]
@@ -1,6 +1,8 @@
 """Tests for gaussian plugin."""
+import copy
 
-from aiida.orm import Dict, StructureData
+import pytest
+from aiida.orm import Dict, List, StructureData
 from pymatgen.core import Molecule
 
 from aiida_gaussian.calculations.gaussian import GaussianCalculation
@@ -54,3 +56,344 @@ def test_default(filepath_tests, fixture_code, generate_calc_job, file_regressio
     tmp_path, _ = generate_calc_job(GaussianCalculation, inputs)
     content_input_file = (tmp_path / GaussianCalculation.INPUT_FILE).read_text()
     file_regression.check(content_input_file, encoding="utf-8", extension=".in")
+
+
+@pytest.mark.parametrize(
+    "parameters",
+    [
+        {
+            "functional": "BLYP",
+            "basis_set": "6-31g",
+            "charge": 0,
+            "multiplicity": 1,
+            "link0_parameters": {"%chk": "aiida.chk", "%mem": "1000MB"},
+            "route_parameters": {"scf": {"maxcycle": 512, "cdiis": None}, "opt": ""},
+        },
+        {
+            "functional": "UB3LYP",
+            "basis_set": "",
+            "charge": 1,
+            "route_parameters": {"nmr": "giao", "output": "wfx"},
+            "input_parameters": {"output.wfx": None},
+            "gen_basis": "C H 0\n6-31G\n****",
+            "dieze_tag": "#P",
+        },
+    ],
+)
+@pytest.mark.parametrize("ghost_atoms", [False, True])
+def test_native_renderer(filepath_tests, parameters, ghost_atoms):
+    """Test that the native renderer reproduces the pymatgen renderer byte by byte."""
+    import ase.io
+
+    ase_atoms = ase.io.read(filepath_tests / "data" / "ch4.xyz")
+    if ghost_atoms:
+        ase_atoms += ase.Atoms("X2", positions=[[0.0, 0.0, 1.5], [-1.0, 0.25, 2.0]])
+    structure = StructureData(ase=ase_atoms)
+
+    native = GaussianCalculation._render_input_string_native(
+        copy.deepcopy(parameters), structure
+    )
+    pymatgen = GaussianCalculation._render_input_string_pymatgen(
+        copy.deepcopy(parameters), structure
+    )
+    assert native == pymatgen
+
+    # Restart from checkpoint without a structure
+    native = GaussianCalculation._render_input_string_native(
+        copy.deepcopy(parameters), None
+    )
+    pymatgen = GaussianCalculation._render_input_string_pymatgen(
+        copy.deepcopy(parameters), None
+    )
+    assert native == pymatgen
+
+
+@pytest.mark.parametrize("renderer", ["native", "pymatgen"])
+def test_semiempirical_without_functional(fixture_code, generate_calc_job, renderer):
+    """Test that a None functional is not replaced by the default one (HF)."""
+    inputs = {
+        "code": fixture_code("gaussian"),
+        "structure": StructureData(
+            pymatgen_molecule=Molecule(["H", "H"], [[0, 0, 0], [0, 0, 0.74]])
+        ),
+        "parameters": Dict(
+            {
+                "functional": None,
+                "basis_set": "PM6",
+                "dieze_tag": "#N",
+                "route_parameters": {"opt": None},
+            }
+        ),
+        "settings": Dict({"input_renderer": renderer}),
+        "metadata": {"options": {"resources": {"num_machines": 1}}},
+    }
+
+    tmp_path, _ = generate_calc_job(GaussianCalculation, inputs)
+    content = (tmp_path / GaussianCalculation.INPUT_FILE).read_text()
+
+    assert "#N PM6 opt" in content.splitlines()
+
+
+def test_link1_steps(filepath_tests, fixture_code, generate_calc_job, file_regression):
+    """Test that the steps in 'step_parameters' are chained with --Link1--."""
+    from aiida.orm import List
+
+    geometry_file = filepath_tests / "data" / "ch4.xyz"
+    structure = StructureData(pymatgen_molecule=Molecule.from_file(str(geometry_file)))
+
+    parameters = {
+        "link0_parameters": {"%chk": "aiida.chk", "%mem": "1000MB"},
+        "functional": "BLYP",
+        "basis_set": "6-31g",
+        "charge": 0,
+        "multiplicity": 1,
+        "route_parameters": {"opt": None},
+    }
+    step_parameters = [
+        {"functional": "B3LYP", "route_parameters": {"freq": None}},
+        {"route_parameters": {"pop": "full", "geom": "check"}},
+    ]
+
+    inputs = {
+        "code": fixture_code("gaussian"),
+        "structure": structure,
+        "parameters": Dict(parameters),
+        "step_parameters": List(step_parameters),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+                "max_wallclock_seconds": 1800,
+            }
+        },
+    }
+
+    tmp_path, _ = generate_calc_job(GaussianCalculation, inputs)
+    content_input_file = (tmp_path / GaussianCalculation.INPUT_FILE).read_text()
+    file_regression.check(content_input_file, encoding="utf-8", extension=".in")
+
+
+def test_linda(filepath_tests, generate_calc_job, tmp_path_factory):
+    """Test that the Linda workers and '%nprocshared' are derived from the resources."""
+    import uuid
+
+    from aiida.orm import Code, Computer
+
+    computer = Computer(
+        label=f"slurm-{uuid.uuid4()}",
+        hostname="localhost",
+        transport_type="core.local",
+        scheduler_type="core.slurm",
+        workdir=str(tmp_path_factory.mktemp("workdir")),
+    ).store()
+    code = Code(
+        input_plugin_name="gaussian", remote_computer_exec=[computer, "/bin/true"]
+    )
+
+    structure = StructureData(
+        pymatgen_molecule=Molecule.from_file(str(filepath_tests / "data" / "ch4.xyz"))
+    )
+    parameters = {
+        "link0_parameters": {"%chk": "aiida.chk", "%NProcShared": "16"},
+        "functional": "BLYP",
+        "basis_set": "6-31g",
+        "route_parameters": {"freq": None},
+    }
+    inputs = {
+        "code": code,
+        "structure": structure,
+        "parameters": Dict(parameters),
+        "settings": Dict({"linda": True}),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 4, "num_mpiprocs_per_machine": 16},
+                "max_wallclock_seconds": 1800,
+            }
+        },
+    }
+
+    tmp_path, calc_info = generate_calc_job(GaussianCalculation, inputs)
+    content = (tmp_path / GaussianCalculation.INPUT_FILE).read_text()
+    assert content.startswith("%chk=aiida.chk\n%nprocshared=16\n#N")
+    assert "export GAUSS_WDEF=$(scontrol show hostnames" in calc_info.prepend_text
+
+    # Inconsistent shared-memory parallelization is rejected at submit time
+    inputs["parameters"] = Dict(
+        {**parameters, "link0_parameters": {"%nprocshared": "8"}}
+    )
+    with pytest.raises(ValueError, match="16 cores per machine"):
+        generate_calc_job(GaussianCalculation, inputs)
+
+    inputs["metadata"]["options"]["resources"] = {"tot_num_mpiprocs": 16}
+    with pytest.raises(ValueError, match="num_machines"):
+        generate_calc_job(GaussianCalculation, inputs)
+
+
+def test_auto_resources(filepath_tests, fixture_code, generate_calc_job):
+    """Test that %nprocshared, %mem and the CPU pinning are derived from the resources."""
+    structure = StructureData(
+        pymatgen_molecule=Molecule.from_file(str(filepath_tests / "data" / "ch4.xyz"))
+    )
+    parameters = {
+        "link0_parameters": {"%chk": "aiida.chk"},
+        "functional": "BLYP",
+        "basis_set": "6-31g",
+        "route_parameters": {"sp": None},
+    }
+    inputs = {
+        "code": fixture_code("gaussian"),
+        "structure": structure,
+        "parameters": Dict(parameters),
+        "settings": Dict({"auto_resources": True, "pin_cpus": False}),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "num_mpiprocs_per_machine": 4},
+                "max_memory_kb": 8 * 1024**2,
+                "max_wallclock_seconds": 1800,
+            }
+        },
+    }
+
+    tmp_path, _ = generate_calc_job(GaussianCalculation, inputs)
+    content = (tmp_path / GaussianCalculation.INPUT_FILE).read_text()
+    assert content.startswith("%chk=aiida.chk\n%mem=7372MB\n%nprocshared=4\n#N")
+
+    # With the pinning, the cores are set at runtime
+    inputs["settings"] = Dict({"auto_resources": True})
+    tmp_path, calc_info = generate_calc_job(GaussianCalculation, inputs)
+    content = (tmp_path / GaussianCalculation.INPUT_FILE).read_text()
+    assert "%nprocshared" not in content
+    assert "export GAUSS_CDEF" in calc_info.prepend_text
+
+    parameters["link0_parameters"]["%mem"] = "16GB"
+    inputs["parameters"] = Dict(parameters)
+    with pytest.raises(ValueError, match="exceeds max_memory_kb"):
+        generate_calc_job(GaussianCalculation, inputs)
+
+
+def test_local_scratch(
+    filepath_tests, fixture_code, generate_calc_job, tmp_path_factory
+):
+    """Test that the job runs in node-local scratch and stages out its outputs."""
+    import subprocess
+
+    structure = StructureData(
+        pymatgen_molecule=Molecule.from_file(str(filepath_tests / "data" / "ch4.xyz"))
+    )
+    inputs = {
+        "code": fixture_code("gaussian"),
+        "structure": structure,
+        "parameters": Dict({"link0_parameters": {"%chk": "aiida.chk"}}),
+        "settings": Dict(
+            {"local_scratch": "$SCRATCH_BASE/", "scratch_stage_out": ["*.fchk"]}
+        ),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+                "max_wallclock_seconds": 1800,
+            }
+        },
+    }
+    _, calc_info = generate_calc_job(GaussianCalculation, inputs)
+
+    # Run the staging with a fake Gaussian that fails after writing its files
+    workdir = tmp_path_factory.mktemp("workdir")
+    scratch = tmp_path_factory.mktemp("scratch")
+    (workdir / GaussianCalculation.INPUT_FILE).write_text("input")
+    script = calc_info.prepend_text + (
+        "\ncat aiida.inp > aiida.out; touch aiida.chk aiida.fchk aiida.rwf; false\n"
+    )
+    subprocess.run(
+        ["bash", "-c", script],
+        cwd=workdir,
+        env={"SCRATCH_BASE": str(scratch), "PATH": "/usr/bin:/bin"},
+        check=False,
+    )
+
+    assert (workdir / GaussianCalculation.OUTPUT_FILE).read_text() == "input"
+    assert (workdir / "aiida.chk").exists()
+    assert (workdir / "aiida.fchk").exists()
+    assert not (workdir / "aiida.rwf").exists()
+    assert not list(scratch.iterdir())
+
+
+def test_parent_files(fixture_code, fixture_localhost, generate_calc_job):
+    """Test that only the requested files of the parent folder are staged."""
+    from aiida.orm import RemoteData
+
+    parent = RemoteData(computer=fixture_localhost, remote_path="/remote/parent")
+    inputs = {
+        "code": fixture_code("gaussian"),
+        "parameters": Dict(
+            {
+                "link0_parameters": {"%oldchk": "parent_calc/aiida.chk"},
+                "route_parameters": {"geom": "allcheck"},
+            }
+        ),
+        "parent_calc_folder": parent,
+        "parent_files": List(["aiida.chk.gz"]),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+                "max_wallclock_seconds": 1800,
+            }
+        },
+    }
+    tmp_path, calc_info = generate_calc_job(GaussianCalculation, inputs)
+
+    assert calc_info.remote_copy_list == []
+    assert calc_info.remote_symlink_list == [
+        (
+            fixture_localhost.uuid,
+            "/remote/parent/aiida.chk.gz",
+            "parent_calc/aiida.chk.gz",
+        )
+    ]
+    assert (tmp_path / "parent_calc").is_dir()
+    assert "gunzip -c parent_calc/aiida.chk.gz > parent_calc/aiida.chk" in (
+        calc_info.prepend_text
+    )
+
+
+def test_compress_files(
+    filepath_tests, fixture_code, generate_calc_job, tmp_path_factory
+):
+    """Test that the requested files are compressed at the end of the job."""
+    import gzip
+    import subprocess
+
+    structure = StructureData(
+        pymatgen_molecule=Molecule.from_file(str(filepath_tests / "data" / "ch4.xyz"))
+    )
+    inputs = {
+        "code": fixture_code("gaussian"),
+        "structure": structure,
+        "parameters": Dict({"link0_parameters": {"%chk": "aiida.chk"}}),
+        "settings": Dict(
+            {"local_scratch": "$SCRATCH_BASE/", "compress_files": ["aiida.chk"]}
+        ),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 1},
+                "max_wallclock_seconds": 1800,
+            }
+        },
+    }
+    _, calc_info = generate_calc_job(GaussianCalculation, inputs)
+
+    # Run the job with a fake Gaussian in the local scratch folder
+    workdir = tmp_path_factory.mktemp("workdir")
+    scratch = tmp_path_factory.mktemp("scratch")
+    (workdir / GaussianCalculation.INPUT_FILE).write_text("input")
+    script = "\n".join(
+        [calc_info.prepend_text, "echo checkpoint > aiida.chk", calc_info.append_text]
+    )
+    subprocess.run(
+        ["bash", "-c", script],
+        cwd=workdir,
+        env={"SCRATCH_BASE": str(scratch), "PATH": "/usr/bin:/bin"},
+        check=True,
+    )
+
+    assert (workdir / "aiida.chk").read_text() == "checkpoint\n"
+    with gzip.open(workdir / "aiida.chk.gz", "rt") as handle:
+        assert handle.read() == "checkpoint\n"
@@ -0,0 +1,178 @@
+"""Tests for the gaussian bundle plugin."""
+import subprocess
+
+import ase
+import pytest
+from aiida.common.folders import Folder
+from aiida.orm import Dict, StructureData
+
+from aiida_gaussian.calculations import GaussianBundleCalculation
+
+
+def test_lanes(fixture_code, generate_calc_job):
+    """Test that the jobs are distributed over the lanes with their share of cores."""
+    parameters = {
+        "link0_parameters": {"%Chk": "aiida.chk", "%Mem": "500MB"},
+        "functional": "BLYP",
+        "basis_set": "6-31g",
+        "charge": 0,
+        "multiplicity": 1,
+        "route_parameters": {"sp": None},
+    }
+    structures = {
+        "h2": StructureData(ase=ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.74]])),
+        "ch4": StructureData(
+            ase=ase.Atoms("CH4", positions=[[0, 0, 0]] + [[1, 1, 1]] * 4)
+        ),
+        "h2o": StructureData(
+            ase=ase.Atoms("OH2", positions=[[0, 0, 0]] + [[1, 1, 1]] * 2)
+        ),
+    }
+
+    inputs = {
+        "code": fixture_code("gaussian.bundle"),
+        "structures": structures,
+        "parameters": {label: Dict(parameters) for label in structures},
+        "settings": Dict({"max_concurrent_jobs": 2}),
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 4},
+                "max_wallclock_seconds": 1800,
+                "max_memory_kb": 4000000,
+            }
+        },
+    }
+
+    tmp_path, calc_info = generate_calc_job(GaussianBundleCalculation, inputs)
+
+    assert calc_info.codes_info == []
+    assert "for job in 'ch4' 'h2o' 'h2'; do" in calc_info.append_text
+    assert "for lane in $(seq 2); do" in calc_info.append_text
+    assert sorted(calc_info.retrieve_list) == ["ch4.log", "h2.log", "h2o.log"]
+
+    content = (tmp_path / "h2o.com").read_text()
+    # the link0 keys are case-insensitive
+    assert "%chk=h2o.chk\n" in content
+    assert "%nprocshared=2\n" in content
+    # explicit %mem is kept
+    assert "%mem=500MB\n" in content
+
+    # the lanes with a mock Gaussian, which runs each job once
+    mock = tmp_path / "g16"
+    mock.write_text('#!/bin/bash\nsleep 0.1\necho "$1" >> jobs.txt\n')
+    mock.chmod(0o755)
+    script = calc_info.append_text.replace("'/bin/true'", f"'{mock}'")
+    subprocess.run(["bash", "-c", script], cwd=tmp_path, check=True)
+
+    assert sorted((tmp_path / "jobs.txt").read_text().split()) == [
+        "ch4.com",
+        "h2.com",
+        "h2o.com",
+    ]
+
+
+def test_lanes_memory(fixture_code, generate_calc_job):
+    """Test that max_memory_kb is split over the lanes as %mem."""
+    parameters = {
+        "functional": "BLYP",
+        "basis_set": "6-31g",
+        "charge": 0,
+        "multiplicity": 1,
+        "route_parameters": {"sp": None},
+    }
+    structures = {
+        f"h2_{i}": StructureData(
+            ase=ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.7 + 0.01 * i]])
+        )
+        for i in range(4)
+    }
+    inputs = {
+        "code": fixture_code("gaussian.bundle"),
+        "structures": structures,
+        "parameters": {label: Dict(parameters) for label in structures},
+        "metadata": {
+            "options": {
+                "resources": {"num_machines": 1, "tot_num_mpiprocs": 2},
+                "max_memory_kb": 2048000,
+            }
+        },
+    }
+
+    tmp_path, calc_info = generate_calc_job(GaussianBundleCalculation, inputs)
+
+    # two lanes with 90% of 1000 MB each
+    assert "for lane in $(seq 2); do" in calc_info.append_text
+    content = (tmp_path / "h2_0.com").read_text()
+    assert "%mem=900MB\n" in content
+    assert "%nprocshared=1\n" in content
+
+
+@pytest.fixture
+def generate_bundle_inputs(fixture_code):
+    """Return a factory of the inputs of a bundle of two H2 jobs."""
+
+    def factory(code=None, **options):
+        structures = {
+            f"h2_{i}": StructureData(
+                ase=ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.7 + 0.01 * i]])
+            )
+            for i in range(2)
+        }
+        parameters = {"functional": "BLYP", "basis_set": "6-31g"}
+        return {
+            "code": code or fixture_code("gaussian.bundle"),
+            "structures": structures,
+            "parameters": {label: Dict(parameters) for label in structures},
+            "metadata": {
+                "options": {"resources": {"num_machines": 1}, **options},
+            },
+        }
+
+    return factory
+
+
+def test_job_script_order(
+    fixture_code, generate_bundle_inputs, generate_calc_job, tmp_path
+):
+    """Test that the lanes run between the prepend and the append texts."""
+    code = fixture_code("gaussian.bundle")
+    code.prepend_text = "echo code-prepend"
+    code.append_text = "echo code-append"
+    inputs = generate_bundle_inputs(code, prepend_text="echo options-prepend")
+
+    process = generate_calc_job(GaussianBundleCalculation, inputs, return_process=True)
+    submit_folder = tmp_path / "submit"
+    submit_folder.mkdir()
+    process.presubmit(Folder(submit_folder))
+    script = (submit_folder / "_aiidasubmit.sh").read_text()
+
+    positions = [
+        script.index(text)
+        for text in (
+            "echo code-prepend",
+            "echo options-prepend",
+            "gaussian_bundle_lane &",
+            "echo code-append",
+        )
+    ]
+    assert positions == sorted(positions)
+
+
+@pytest.mark.parametrize(
+    "options, with_mpi, message",
+    [
+        ({"append_text": "echo done"}, None, "append_text"),
+        ({"withmpi": True}, None, "MPI"),
+        ({}, True, "MPI"),
+    ],
+)
+def test_invalid_options(
+    fixture_code, generate_bundle_inputs, generate_calc_job, options, with_mpi, message
+):
+    """Test that options that would not apply to the lanes are rejected."""
+    code = fixture_code("gaussian.bundle")
+    code.with_mpi = with_mpi
+    inputs = generate_bundle_inputs(code, **options)
+
+    with pytest.raises(ValueError, match=message):
+        generate_calc_job(GaussianBundleCalculation, inputs)
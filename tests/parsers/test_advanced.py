@@ -0,0 +1,101 @@
+"""
+Tests for the :class:`aiida_gaussian.parsers.gaussian.GaussianAdvancedParser` class.
+"""
+# pylint: disable=redefined-outer-name
+import numpy as np
+from aiida.orm import Dict
+
+from aiida_gaussian.utils.thermochemistry import get_vibrational_thermochemistry
+
+HARTREE_TO_EV = 27.211386
+
+
+def test_vibrations(generate_calc_job_node, generate_parser):
+    """Test that the normal modes and the thermochemistry are set as 'output_vibrations'."""
+    inputs = {
+        "parameters": Dict({"route_parameters": {"freq": None}}),
+        "settings": Dict({"thermo_temperatures": [100.0, 298.15]}),
+    }
+    node = generate_calc_job_node("gaussian", "advanced", "freq", inputs=inputs)
+    parser = generate_parser("gaussian.advanced")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    output_parameters = results["output_parameters"].get_dict()
+    assert "vibdisps" not in output_parameters
+    assert len(output_parameters["vibfreqs"]) == 3
+
+    vibrations = results["output_vibrations"]
+    assert vibrations.get_array("modes").dtype == np.float32
+    assert vibrations.get_array("modes").shape == (3, 3, 3)
+    assert np.allclose(
+        vibrations.get_array("frequencies"), [1709.4774, 3800.1234, 3905.5555]
+    )
+    assert vibrations.get_array("ir_intensities").shape == (3,)
+    assert list(vibrations.get_array("temperatures")) == [100.0, 298.15]
+    assert vibrations.get_array("free_energy").shape == (2,)
+
+    # the zero-point energy agrees with the one of Gaussian
+    zpe = float(vibrations.get_array("zpe"))
+    assert abs(zpe - output_parameters["zpve"] * HARTREE_TO_EV) < 1e-4
+
+
+def test_quasi_harmonic_cutoff():
+    """Test that soft modes are raised to the cutoff and imaginary ones are skipped."""
+    harmonic = get_vibrational_thermochemistry([10.0, 500.0], [298.15], cutoff=0.0)
+    quasi_harmonic = get_vibrational_thermochemistry(
+        [-50.0, 10.0, 500.0], [298.15], cutoff=100.0
+    )
+    reference = get_vibrational_thermochemistry([100.0, 500.0], [298.15], cutoff=0.0)
+
+    assert quasi_harmonic["entropy"][0] < harmonic["entropy"][0]
+    for key, value in reference.items():
+        assert np.allclose(quasi_harmonic[key], value)
+
+    # the high-temperature limit of the heat capacity is k_B per mode
+    limit = get_vibrational_thermochemistry([100.0, 500.0], [1e6], cutoff=0.0)
+    assert np.isclose(limit["heat_capacity"][0], 2 * 8.617333e-5, rtol=1e-3)
+
+
+def test_scan(generate_calc_job_node, generate_parser):
+    """Test that the points of a relaxed scan are set as aligned arrays."""
+    inputs = {"parameters": Dict({"route_parameters": {"opt": "modredundant"}})}
+    node = generate_calc_job_node("gaussian", "advanced", "scan", inputs=inputs)
+    parser = generate_parser("gaussian.advanced")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    scan = results["output_scan"]
+    assert scan.base.attributes.get("coordinate_names") == ["R(1,2)"]
+    assert np.allclose(scan.get_array("coordinates")[:, 0], [0.70, 0.75, 0.80])
+    energies = scan.get_array("energies")
+    assert np.argmin(energies) == 1
+    assert np.isclose(energies[1], -1.1173 * HARTREE_TO_EV)
+
+    # the H-H distance of each geometry is the scanned coordinate
+    positions = scan.get_array("positions")
+    distances = np.linalg.norm(positions[:, 1] - positions[:, 0], axis=1)
+    assert np.allclose(distances, scan.get_array("coordinates")[:, 0])
+
+
+def test_irc(generate_calc_job_node, generate_parser):
+    """Test that both directions of an IRC are sorted along the reaction coordinate."""
+    inputs = {"parameters": Dict({"route_parameters": {"irc": "calcfc"}})}
+    node = generate_calc_job_node("gaussian", "advanced", "irc", inputs=inputs)
+    parser = generate_parser("gaussian.advanced")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    irc = results["output_irc"]
+    assert np.allclose(irc.get_array("reaction_coordinate"), [-0.2, -0.1, 0, 0.1, 0.2])
+    assert list(irc.get_array("path")) == [2, 2, 0, 1, 1]
+
+    # the transition state has the highest energy
+    energies = irc.get_array("energies")
+    assert np.argmax(energies) == 2
+    positions = irc.get_array("positions")
+    distances = np.linalg.norm(positions[:, 1] - positions[:, 0], axis=1)
+    assert np.allclose(distances, [0.71, 0.73, 0.75, 0.77, 0.79])
@@ -42,3 +42,226 @@ def test_nan_inf(generate_calc_job_node, generate_parser, data_regression):
 
     # Check that the ``output_parameters`` content is serializable and can be stored
     results["output_parameters"].store()
+
+
+def test_link1_steps(generate_calc_job_node, generate_parser):
+    """Test that --Link1-- steps are parsed into their own namespaces."""
+    from aiida.orm import Dict, List
+
+    inputs = {
+        "parameters": Dict(
+            {
+                "link0_parameters": {"%chk": "aiida.chk"},
+                "route_parameters": {"sp": None},
+            }
+        ),
+        "step_parameters": List([{"route_parameters": {"pop": "full"}}]),
+    }
+    node = generate_calc_job_node("gaussian", "base", "link1", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished, calcfunction.exception
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert set(results["step_1"]) == {"output_parameters", "energy_ev"}
+    assert "step_2" not in results
+    assert {"output_parameters", "energy_ev"} <= set(results)
+
+
+def test_link1_opt_freq_step(generate_calc_job_node, generate_parser):
+    """Test that the steps are aligned with their jobs when a step is 'opt freq'."""
+    from aiida.orm import Dict, List
+
+    inputs = {
+        "parameters": Dict(
+            {
+                "link0_parameters": {"%chk": "aiida.chk"},
+                "route_parameters": {"opt": None, "freq": None},
+            }
+        ),
+        "step_parameters": List([{"route_parameters": {"sp": None}}]),
+    }
+    node = generate_calc_job_node("gaussian", "base", "link1_opt_freq", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert results["step_1"]["output_parameters"]["vibfreqs"] == [4401.2345]
+    assert "output_trajectory" in results["step_1"]
+    assert "step_2" not in results
+    assert "vibfreqs" not in results["output_parameters"].get_dict()
+    assert abs(results["energy_ev"].value / 27.211386 + 1.118) < 1e-5
+
+
+def test_link1_missing_step(generate_calc_job_node, generate_parser):
+    """Test that a step missing from the log is reported as not terminated."""
+    from aiida.orm import Dict, List
+
+    inputs = {
+        "parameters": Dict(
+            {
+                "link0_parameters": {"%chk": "aiida.chk"},
+                "route_parameters": {"sp": None},
+            }
+        ),
+        "step_parameters": List([{}, {}]),
+    }
+    node = generate_calc_job_node("gaussian", "base", "link1", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.exit_status == 391
+    assert "step_2" in results
+
+    # the log stopped because the scheduler killed the job
+    node.set_exit_status(
+        node.process_class.exit_codes.ERROR_SCHEDULER_OUT_OF_WALLTIME.status
+    )
+    _, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.exit_status == 120
+
+
+def test_link1_without_step_parameters(generate_calc_job_node, generate_parser):
+    """Test that the jobs of a log are parsed separately also without 'step_parameters'."""
+    from aiida.orm import Dict
+
+    inputs = {"parameters": Dict({"route_parameters": {"sp": None}})}
+    node = generate_calc_job_node("gaussian", "base", "link1", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert set(results["step_1"]) == {"output_parameters", "energy_ev"}
+    assert "step_2" not in results
+    assert {"output_parameters", "energy_ev"} <= set(results)
+
+
+def test_link1_parallel(generate_calc_job_node, generate_parser, monkeypatch):
+    """Test that parsing the jobs in parallel processes gives the same outputs."""
+    from aiida.orm import Dict
+
+    from aiida_gaussian.parsers import gaussian
+
+    inputs = {"parameters": Dict({"route_parameters": {"sp": None}})}
+    node = generate_calc_job_node("gaussian", "base", "link1", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    serial, _ = parser.parse_from_node(node, store_provenance=False)
+
+    monkeypatch.setattr(gaussian, "PARALLEL_PARSE_MIN_SIZE", 0)
+    parallel, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    # stored, such that the arrays are compared as lists
+    assert (
+        parallel["step_1"]["output_parameters"].store().get_dict()
+        == serial["step_1"]["output_parameters"].store().get_dict()
+    )
+    assert (
+        parallel["output_parameters"].store().get_dict()
+        == serial["output_parameters"].store().get_dict()
+    )
+
+
+def test_split_link1_log(generate_parser):
+    """Test the splitting of a log into its jobs."""
+    parser = generate_parser("gaussian.base")
+    log = (
+        " Entering Gaussian System, Link 0=g16\n"
+        " Initial command:\n"
+        " first job\n"
+        " Normal termination of Gaussian 16\n"
+        " Entering Gaussian System, Link 0=g16\n"
+        " Initial command:\n"
+        " second job, killed before the end\n"
+        " Initial command:\n"
+        " third job\n"
+        " Error termination\n"
+    )
+    segments = parser._split_link1_log(log)  # pylint: disable=protected-access
+
+    assert len(segments) == 3
+    assert segments[0].startswith(" Entering") and "first job" in segments[0]
+    assert "second job" in segments[1]
+    assert "Normal termination" not in segments[1]
+    assert segments[2].startswith(" Initial command:")
+    assert "Error termination" in segments[2]
+
+    # internal steps of a compound job stay in their job, --Link1-- jobs are split
+    log = (
+        " Entering Gaussian System, Link 0=g16\n"
+        " #P opt freq\n"
+        " Normal termination of Gaussian 16\n"
+        " Link1:  Proceeding to internal job step number  2.\n"
+        " ---------------------------------------\n"
+        " #P Geom=AllCheck Guess=TCheck SCRF=Check\n"
+        " GenChk RB3LYP/6-31G(d) Freq\n"
+        " ---------------------------------------\n"
+        " Normal termination of Gaussian 16\n"
+        " Link1:  Proceeding to internal job step number  3.\n"
+        " -------------------------------\n"
+        " #P geom=allcheck guess=read sp\n"
+        " -------------------------------\n"
+        " Normal termination of Gaussian 16\n"
+    )
+    segments = parser._split_link1_log(log)  # pylint: disable=protected-access
+
+    assert len(segments) == 2
+    assert "Freq" in segments[0] and segments[0].count("Normal termination") == 2
+    assert segments[1].startswith(" Link1:") and "sp" in segments[1]
+
+
+def test_opt_freq(generate_calc_job_node, generate_parser):
+    """Test that the internal steps of an 'opt freq' job are parsed as one job."""
+    from aiida.orm import Dict
+
+    inputs = {"parameters": Dict({"route_parameters": {"opt": None, "freq": None}})}
+    node = generate_calc_job_node("gaussian", "base", "opt_freq", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert not [label for label in results if label.startswith("step_")]
+    assert results["output_parameters"]["vibfreqs"] == [4401.2345]
+    assert results["output_trajectory"].numsteps == 3
+
+
+def test_out_of_memory(generate_calc_job_node, generate_parser):
+    """Test that a failed memory allocation is reported with its own exit code."""
+    from aiida.orm import Dict
+
+    inputs = {"parameters": Dict({"route_parameters": {"sp": None}})}
+    node = generate_calc_job_node("gaussian", "base", "out_of_memory", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    _, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.exit_status == 304
+
+
+def test_opt_trajectory(generate_calc_job_node, generate_parser):
+    """Test that all the steps of an optimization are set as 'output_trajectory'."""
+    import numpy as np
+    from aiida.orm import Dict
+
+    inputs = {"parameters": Dict({"route_parameters": {"opt": None}})}
+    node = generate_calc_job_node("gaussian", "base", "opt_trajectory", inputs=inputs)
+    parser = generate_parser("gaussian.base")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    trajectory = results["output_trajectory"]
+    assert trajectory.numsteps == 3
+    assert trajectory.symbols == ["H", "H"]
+    assert trajectory.get_positions().shape == (3, 2, 3)
+    assert np.allclose(
+        trajectory.get_positions()[-1],
+        results["output_structure"].get_ase().get_positions(),
+    )
+
+    energies = trajectory.get_array("energies")
+    assert energies.shape == (3,)
+    assert energies[-1] == results["energy_ev"].value
+    assert trajectory.get_array("forces").shape == (3, 2, 3)
+    assert np.allclose(trajectory.get_array("max_force"), [0.05, 0.002, 0.00002])
+    assert trajectory.get_array("convergence_thresholds").shape == (4,)
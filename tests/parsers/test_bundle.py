@@ -0,0 +1,28 @@
+"""Tests for the :class:`aiida_gaussian.parsers.gaussian.GaussianBundleParser` class."""
+import ase
+from aiida.orm import Dict, StructureData
+
+
+def test_one_missing(generate_calc_job_node, generate_parser):
+    """Test that each job is parsed into its own namespace and failures are collected."""
+    parameters = {"route_parameters": {"sp": None}}
+    inputs = {
+        "structures": {
+            "mol_a": StructureData(ase=ase.Atoms("H2", cell=[5.0, 5.0, 5.0])),
+            "mol_b": StructureData(ase=ase.Atoms("H2", cell=[5.0, 5.0, 5.0])),
+        },
+        "parameters": {"mol_a": Dict(parameters), "mol_b": Dict(parameters)},
+    }
+    node = generate_calc_job_node(
+        "gaussian.bundle", "bundle", "one_missing", inputs=inputs
+    )
+    parser = generate_parser("gaussian.bundle")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished, calcfunction.exception
+    assert calcfunction.exit_status == 380
+    assert "mol_b" in calcfunction.exit_message
+
+    assert results["exit_statuses"].get_dict() == {"mol_a": 0, "mol_b": 210}
+    assert set(results["mol_a"]) == {"output_parameters", "energy_ev"}
+    assert "mol_b" not in results
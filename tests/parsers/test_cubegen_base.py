@@ -0,0 +1,118 @@
+"""Tests for the :class:`aiida_gaussian.parsers.cubegen.CubegenBaseParser` class."""
+import numpy as np
+import pytest
+from aiida.orm import Dict
+
+from aiida_gaussian.utils.cube import ANG_TO_BOHR, Cube
+
+
+def parse_cubes(generate_calc_job_node, generate_parser, parser_params=None):
+    """Parse the retrieved 'homo.cube' with the parser parameters."""
+    inputs = {}
+    if parser_params is not None:
+        inputs["parser_params"] = Dict(parser_params)
+    node = generate_calc_job_node(
+        "gaussian.cubegen", "cubegen_base", "default", inputs=inputs
+    )
+    parser = generate_parser("gaussian.cubegen_base")
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    return results
+
+
+def test_default(generate_calc_job_node, generate_parser):
+    """Test that a plane above the molecule is parsed in double precision."""
+    results = parse_cubes(generate_calc_job_node, generate_parser)
+
+    planes = results["cube_planes_array"]
+    assert planes.get_array("cube_homo").shape == (8, 8, 1)
+    assert planes.get_array("cube_homo").dtype == np.float64
+    assert list(planes.get_array("h_arr")) == [2.0]
+    assert "cube_files" not in results
+
+
+@pytest.mark.parametrize("cube_chunk_size, num_chunks", [(None, 1), (3, 3)])
+def test_store_cubes(
+    generate_calc_job_node, generate_parser, cube_chunk_size, num_chunks
+):
+    """Test that the full cubes are stored in single precision, chunked or not."""
+    results = parse_cubes(
+        generate_calc_job_node,
+        generate_parser,
+        {
+            "dtype": "float32",
+            "store_cubes": True,
+            "cube_chunk_size": cube_chunk_size,
+        },
+    )
+
+    assert results["cube_planes_array"].get_array("cube_homo").dtype == np.float32
+
+    cube_files = results["cube_files"]
+    assert cube_files.list_object_names() == ["homo.npz"]
+    with cube_files.open("homo.npz", "rb") as handle:
+        cube = Cube.from_npz_file_handle(handle)
+    with cube_files.open("homo.npz", "rb") as handle, np.load(handle) as npz:
+        # chunks of 'cube_chunk_size' planes (8 planes along the first axis)
+        assert len([name for name in npz.files if name.startswith("data_")]) == (
+            num_chunks
+        )
+    assert cube.data.dtype == np.float32
+    assert cube.data.shape == (8, 8, 10)
+    np.testing.assert_array_equal(cube.data, 0.5)
+    np.testing.assert_allclose(cube.cell, np.diag([12.0, 12.0, 20.0]))
+
+
+def test_analytics(generate_calc_job_node, generate_parser):
+    """Test the integrals of the cube in 'cube_analytics'."""
+    results = parse_cubes(
+        generate_calc_job_node,
+        generate_parser,
+        {"analytics": {"isovalues": [0.4, 0.6], "sphere_radius": 0.5}},
+    )
+
+    analytics = results["cube_analytics"]["cube_homo"]
+    # 0.5 in a box of 12 x 12 x 20 bohr^3
+    assert analytics["integral"] == pytest.approx(1440.0)
+    assert analytics["isovalues"] == [0.4, 0.6]
+    assert analytics["isovalue_volumes_ang3"] == pytest.approx(
+        [2880.0 / ANG_TO_BOHR**3, 0.0]
+    )
+    assert analytics["sphere_radius"] == 0.5
+    assert len(analytics["atomic_sphere_integrals"]) == 3
+    assert len(analytics["dipole_moment_au"]) == 3
+    assert "cube_pyramid_array" not in results
+
+
+@pytest.mark.parametrize(
+    "pyramid, shapes",
+    [
+        (True, {2: (4, 4, 5), 4: (2, 2, 3), 8: (1, 1, 2)}),
+        ([4], {4: (2, 2, 3)}),
+    ],
+)
+def test_pyramid(generate_calc_job_node, generate_parser, pyramid, shapes):
+    """Test the block-averaged levels in 'cube_pyramid_array'."""
+    results = parse_cubes(
+        generate_calc_job_node,
+        generate_parser,
+        {"pyramid": pyramid, "dtype": "float32"},
+    )
+
+    pyramid_array = results["cube_pyramid_array"]
+    assert set(pyramid_array.get_arraynames()) == {
+        f"{name}_x{factor}"
+        for factor in shapes
+        for name in ("cube_homo", "origin", "cell")
+    }
+    for factor, shape in shapes.items():
+        level = pyramid_array.get_array(f"cube_homo_x{factor}")
+        assert level.shape == shape
+        assert level.dtype == np.float32
+        np.testing.assert_array_equal(level, 0.5)
+        np.testing.assert_allclose(
+            np.diag(pyramid_array.get_array(f"cell_x{factor}")),
+            np.array(shape) * factor * [1.5, 1.5, 2.0],
+        )
+    assert "cube_analytics" not in results
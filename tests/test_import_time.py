@@ -0,0 +1,52 @@
+"""Tests that the plugin entry points can be loaded without the heavy dependencies."""
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("ase", "cclib", "pymatgen")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+import aiida.engine, aiida.orm, aiida.parsers, aiida.plugins
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "elapsed": elapsed,
+    "heavy": sorted(m for m in {heavy} if m in sys.modules),
+}}))
+"""
+
+
+def get_import_cost(module):
+    """Import ``module`` in a fresh interpreter (after aiida itself is loaded).
+
+    :return: the import time [s] and the list of heavy modules that were imported.
+    """
+    script = IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, "-c", script], text=True)
+    result = json.loads(output.splitlines()[-1])
+    return result["elapsed"], result["heavy"]
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "aiida_gaussian.calculations",
+        "aiida_gaussian.parsers.gaussian",
+        "aiida_gaussian.parsers.cubegen",
+        "aiida_gaussian.workchains",
+    ],
+)
+def test_no_heavy_imports(module):
+    """Test that importing the entry point modules does not import pymatgen, cclib or ase."""
+    _, heavy = get_import_cost(module)
+    assert heavy == []
+
+
+def test_calculations_import_time():
+    """Guard the import cost of ``aiida_gaussian.calculations`` on top of aiida."""
+    elapsed, _ = get_import_cost("aiida_gaussian.calculations")
+    assert elapsed < 0.5
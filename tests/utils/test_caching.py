@@ -0,0 +1,143 @@
+"""Tests for the caching utilities."""
+import io
+
+import ase
+from aiida.common.links import LinkType
+from aiida.orm import Dict, SinglefileData, StructureData
+
+from aiida_gaussian.calculations.gaussian import GaussianCalcJobNode
+from aiida_gaussian.utils.caching import (
+    get_content_hash,
+    get_normalized_parameters,
+    get_rounded_structure,
+    get_shared_node,
+    normalize_parameters,
+    share_builder_inputs,
+)
+
+
+def test_normalize_parameters():
+    """Test that equivalent parameters are normalized identically."""
+    parameters_a = {
+        "link0_parameters": {"%Chk": "aiida.chk", "%NProcShared": "4"},
+        "functional": "B3LYP",
+        "basis_set": "6-31G(d)",
+        "route_parameters": {"Opt": "Tight", "SCF": {"XQC": ""}, "nosymm": None},
+    }
+    parameters_b = {
+        "functional": "B3LYP",
+        "basis_set": "6-31G(d)",
+        "route_parameters": {"nosymm": "", "scf": {"xqc": None}, "opt": "tight"},
+        "link0_parameters": {"%nprocshared": "4", "%chk": "aiida.chk"},
+    }
+    assert normalize_parameters(parameters_a) == normalize_parameters(parameters_b)
+
+    node_a = get_normalized_parameters(Dict(parameters_a))
+    node_b = get_normalized_parameters(Dict(parameters_b))
+    assert get_content_hash(node_a) == get_content_hash(node_b)
+
+    # Already normalized nodes are kept
+    assert get_normalized_parameters(node_a) is node_a
+
+
+def test_no_basis_set():
+    """Test that an empty basis set is kept, such that no default basis is rendered."""
+    from aiida_gaussian.calculations import GaussianCalculation
+
+    parameters = normalize_parameters(
+        {
+            "functional": "PM6",
+            "basis_set": "",
+            "dieze_tag": "#N",
+            "route_parameters": {"opt": None},
+        }
+    )
+    assert parameters["basis_set"] == ""
+
+    structure = StructureData(ase=ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.74]]))
+    input_string = GaussianCalculation._render_input_string_native(  # pylint: disable=protected-access
+        parameters, structure
+    )
+    assert "#N PM6 opt" in input_string.splitlines()
+
+
+def test_rounded_structure():
+    """Test that structures differing below the input precision hash identically."""
+    structures = [
+        StructureData(
+            ase=ase.Atoms(
+                "H2", positions=[[0, 0, 0], [0, 0, 0.74 + delta]], cell=[5] * 3
+            )
+        )
+        for delta in (0.0, 1e-9)
+    ]
+    hashes = [
+        get_content_hash(get_rounded_structure(structure)) for structure in structures
+    ]
+    assert hashes[0] == hashes[1]
+
+
+def test_calcjob_hash(fixture_localhost):
+    """Test that calculations with equivalent (stored) inputs have the same hash."""
+
+    def get_stored_calc(parameters, delta):
+        structure = StructureData(
+            ase=ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.74 + delta]])
+        )
+        node = GaussianCalcJobNode(computer=fixture_localhost)
+        node.base.links.add_incoming(
+            Dict(parameters).store(), LinkType.INPUT_CALC, "parameters"
+        )
+        node.base.links.add_incoming(
+            structure.store(), LinkType.INPUT_CALC, "structure"
+        )
+        return node.store()
+
+    calc_a = get_stored_calc(
+        {"functional": "B3LYP", "route_parameters": {"Opt": "Tight", "nosymm": ""}},
+        0.0,
+    )
+    calc_b = get_stored_calc(
+        {"functional": "B3LYP", "route_parameters": {"nosymm": None, "opt": "tight"}},
+        1e-9,
+    )
+    calc_c = get_stored_calc(
+        {"functional": "B3LYP", "route_parameters": {"opt": None}}, 0.0
+    )
+    assert calc_a.base.caching.get_hash() is not None
+    assert calc_a.base.caching.get_hash() == calc_b.base.caching.get_hash()
+    assert calc_a.base.caching.get_hash() != calc_c.base.caching.get_hash()
+
+    # the input nodes are kept as they are
+    assert calc_a.inputs.parameters["route_parameters"] == {
+        "Opt": "Tight",
+        "nosymm": "",
+    }
+
+
+def test_shared_node(fixture_code):
+    """Test that content-identical nodes are shared instead of duplicated."""
+    parameters = {"functional": "PBE1PBE", "route_parameters": {"sp": None}}
+
+    first = get_shared_node(Dict(parameters))
+    assert first.is_stored
+    assert first.base.caching.get_hash() == get_content_hash(Dict(parameters))
+    assert get_shared_node(Dict(parameters)).pk == first.pk
+    assert get_shared_node(Dict({"functional": "B3LYP"})).pk != first.pk
+
+    stencil = get_shared_node(SinglefileData(io.BytesIO(b"-1 0.0 0.0 0.0\n")))
+    assert get_shared_node(SinglefileData(io.BytesIO(b"-1 0.0 0.0 0.0\n"))).pk == (
+        stencil.pk
+    )
+
+    # the nodes shared in a batch are cached
+    cache = {}
+    builders = []
+    for _ in range(3):
+        builder = fixture_code("gaussian").get_builder()
+        builder.parameters = Dict(parameters)
+        builder.settings = Dict({"cmdline": ["-x"]})
+        builders.append(share_builder_inputs(builder, cache=cache))
+    assert len(cache) == 2
+    assert {builder.parameters.pk for builder in builders} == {first.pk}
+    assert len({builder.settings.pk for builder in builders}) == 1
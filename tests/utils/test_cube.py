@@ -0,0 +1,116 @@
+"""Tests for :class:`aiida_gaussian.utils.cube.Cube`."""
+# pylint: disable=redefined-outer-name
+import ase
+import numpy as np
+import pytest
+
+from aiida_gaussian.utils.cube import ANG_TO_BOHR, Cube
+
+
+@pytest.fixture
+def generate_cube():
+    """Return a factory for a small synthetic cube around a water molecule."""
+
+    def factory(cell_n=(10, 12, 14), dtype=float):
+        rng = np.random.default_rng(0)
+        atoms = ase.Atoms(
+            "OH2", positions=[[3.0, 3.0, 3.0], [3.8, 3.5, 3.0], [2.2, 3.5, 3.0]]
+        )
+        cell = np.diag([12.0, 13.0, 14.0])
+        data = rng.normal(size=cell_n).astype(dtype)
+        return Cube(
+            title="title", comment="comment", ase_atoms=atoms, cell=cell, data=data
+        )
+
+    return factory
+
+
+def test_read_float32(generate_cube, tmp_path):
+    """Test that cube data can be read in single precision."""
+    cube = generate_cube()
+    cube.write_cube_file(str(tmp_path / "test.cube"))
+
+    cube_64 = Cube.from_file(str(tmp_path / "test.cube"))
+    cube_32 = Cube.from_file(str(tmp_path / "test.cube"), dtype=np.float32)
+
+    assert cube_32.data.dtype == np.float32
+    assert cube_32.data.shape == cube_64.data.shape
+    np.testing.assert_allclose(cube_32.data, cube_64.data, rtol=1e-6)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 3])
+def test_npz_roundtrip(generate_cube, tmp_path, chunk_size):
+    """Test writing and reading the chunked compressed layout."""
+    cube = generate_cube(dtype=np.float32)
+    cube.write_npz_file(str(tmp_path / "test.npz"), chunk_size=chunk_size)
+
+    cube_read = Cube.from_npz_file(str(tmp_path / "test.npz"))
+
+    assert cube_read.title == cube.title
+    assert cube_read.data.dtype == np.float32
+    np.testing.assert_array_equal(cube_read.data, cube.data)
+    np.testing.assert_allclose(cube_read.cell, cube.cell)
+    np.testing.assert_allclose(cube_read.ase_atoms.positions, cube.ase_atoms.positions)
+
+
+def test_analytics(generate_cube):
+    """Test the vectorized reductions on a constant and a gaussian density."""
+    cube = generate_cube(cell_n=(40, 40, 40))
+    cube.cell = np.diag([10.0, 10.0, 10.0])
+    cube.data = np.ones(cube.data.shape)
+
+    assert cube.integrate() == pytest.approx(1000.0)
+    assert cube.get_isovalue_volume(0.5) == pytest.approx(1000.0 / ANG_TO_BOHR**3)
+
+    # spheres well inside the box enclose ~4/3 pi r^3
+    cube.ase_atoms.positions = np.full((3, 3), 2.5)
+    sphere_integrals = cube.get_atomic_sphere_integrals(1.0)
+    np.testing.assert_allclose(
+        sphere_integrals, 4.0 / 3.0 * np.pi * ANG_TO_BOHR**3, rtol=0.05
+    )
+
+    # a single electron in a gaussian centered on the oxygen nucleus
+    center = cube.ase_atoms.positions[0] * ANG_TO_BOHR
+    grid = np.stack(
+        np.meshgrid(cube.x_arr_au, cube.y_arr_au, cube.z_arr_au, indexing="ij"),
+        axis=-1,
+    )
+    cube.data = np.exp(-np.sum((grid - center) ** 2, axis=-1))
+    cube.data /= cube.integrate()
+    np.testing.assert_allclose(cube.get_first_moment(), center, atol=1e-6)
+
+
+def test_pyramid(generate_cube):
+    """Test the block-averaged downsampling levels."""
+    cube = generate_cube(cell_n=(16, 12, 10), dtype=np.float32)
+
+    levels = cube.get_pyramid((2, 4, 8))
+
+    assert [level.data.shape for level in levels] == [
+        (8, 6, 5),
+        (4, 3, 3),
+        (2, 2, 2),
+    ]
+    assert all(level.data.dtype == np.float32 for level in levels)
+
+    level_2 = levels[0]
+    np.testing.assert_allclose(
+        level_2.data[0, 0, 0], np.mean(cube.data[:2, :2, :2]), rtol=1e-5
+    )
+    # the averaged grid spans the same box
+    np.testing.assert_allclose(level_2.dv_au, 2 * cube.dv_au)
+    np.testing.assert_allclose(level_2.origin, cube.origin + 0.5 * np.diag(cube.dv_au))
+
+
+def test_pyramid_incomplete_blocks(generate_cube):
+    """Test that the levels weight the incomplete edge blocks by their points."""
+    cube = generate_cube(cell_n=(7, 5, 3))
+    cube.data = np.broadcast_to(
+        np.arange(7.0)[:, np.newaxis, np.newaxis], cube.data.shape
+    ).copy()
+
+    levels = cube.get_pyramid((2, 4))
+
+    np.testing.assert_allclose(levels[1].data[:, 0, 0], [1.5, 5.0])
+    for factor, level in zip((2, 4), levels):
+        np.testing.assert_allclose(level.data, cube.get_downsampled(factor).data)
@@ -0,0 +1,155 @@
+"""Tests for the columnar export of the output parameters."""
+import numpy as np
+from aiida.common.links import LinkType
+from aiida.orm import CalcJobNode, Dict, WorkflowNode
+
+from aiida_gaussian.utils.export import (
+    MISSING_STRING,
+    export_results,
+    load_results,
+    parse_key,
+)
+
+
+def _create_calculation(computer, output_parameters=None):
+    node = CalcJobNode(computer=computer, process_type="aiida.calculations:gaussian")
+    node.store()
+    if output_parameters is not None:
+        _finish_calculation(node, output_parameters)
+    return node
+
+
+def _finish_calculation(node, output_parameters):
+    output = Dict(output_parameters)
+    output.base.links.add_incoming(
+        node, link_type=LinkType.CREATE, link_label="output_parameters"
+    )
+    output.store()
+
+
+def test_parse_key():
+    """Test the parsing of nested and indexed keys."""
+    assert parse_key("scfenergies[-1]") == (["scfenergies"], [-1])
+    assert parse_key("metadata.success") == (["metadata", "success"], [])
+    assert parse_key("a.b[0][1]") == (["a", "b"], [0, 1])
+
+
+def test_export_results(aiida_computer_local, tmp_path):
+    """Test the export and the incremental append."""
+    computer = aiida_computer_local()
+    filename = str(tmp_path / "results.npz")
+    keys = ("scfenergies[-1]", "homos", "gap", "metadata.success")
+    process_types = ("aiida.calculations:gaussian",)
+
+    first = _create_calculation(
+        computer,
+        {
+            "scfenergies": [-100.0, -101.0],
+            "homos": [4],
+            "gap": 5.0,
+            "metadata": {"success": True},
+        },
+    )
+    assert export_results(filename, keys, process_types) >= 1
+    results = load_results(filename)
+    row = list(results["pk"]).index(first.pk)
+    assert results["scfenergies[-1]"][row] == -101.0
+    assert results["homos"][row][0] == 4
+    assert results["metadata.success"][row]
+
+    # only the new calculation is appended, with a missing gap and two homos
+    num_rows = len(results["pk"])
+    second = _create_calculation(
+        computer,
+        {"scfenergies": [-50.0], "homos": [3, 2], "metadata": {"success": False}},
+    )
+    assert export_results(filename, keys, process_types) == 1
+    assert export_results(filename, keys, process_types) == 0
+
+    results = load_results(filename)
+    assert len(results["pk"]) == num_rows + 1
+    assert results["pk"][-1] == second.pk
+    assert results["scfenergies[-1]"][-1] == -50.0
+    assert np.isnan(results["gap"][-1])
+    assert results["homos"].shape == (num_rows + 1, 2)
+    assert list(results["homos"][-1]) == [3, 2]
+    assert not results["metadata.success"][-1]
+
+
+def test_export_running_process(aiida_computer_local, tmp_path):
+    """Test that a process that finishes after an export is exported the next time."""
+    computer = aiida_computer_local()
+    filename = str(tmp_path / "results.npz")
+    keys = ("gap",)
+    process_types = ("aiida.calculations:gaussian",)
+
+    running = _create_calculation(computer)
+    export_results(filename, keys, process_types)
+    assert running.pk not in load_results(filename)["pk"]
+
+    finished = _create_calculation(computer, {"gap": 1.0})
+    assert export_results(filename, keys, process_types) == 1
+
+    # the running process is older than the exported ones, but finishes later
+    _finish_calculation(running, {"gap": 2.0})
+    assert export_results(filename, keys, process_types) == 1
+
+    results = load_results(filename)
+    assert list(results["pk"][-2:]) == [finished.pk, running.pk]
+    assert list(results["gap"][-2:]) == [1.0, 2.0]
+
+
+def test_export_missing_strings(aiida_computer_local, tmp_path):
+    """Test that missing values of a string key are empty, also across exports."""
+    computer = aiida_computer_local()
+    filename = str(tmp_path / "results.npz")
+    keys = ("metadata.package",)
+    process_types = ("aiida.calculations:gaussian",)
+
+    _create_calculation(computer, {"metadata": {"package": "Gaussian"}})
+    export_results(filename, keys, process_types)
+
+    # a batch without any value of the key
+    _create_calculation(computer, {"metadata": {}})
+    assert export_results(filename, keys, process_types) == 1
+    _create_calculation(computer, {"metadata": {"package": "Gaussian"}})
+    assert export_results(filename, keys, process_types) == 1
+
+    column = load_results(filename)["metadata.package"]
+    assert column.dtype.kind == "U"
+    assert list(column[-3:]) == ["Gaussian", MISSING_STRING, "Gaussian"]
+
+
+def test_export_workchain(aiida_computer_local, tmp_path):
+    """Test that the output returned by a work chain and its calculation is exported once."""
+    computer = aiida_computer_local()
+    filename = str(tmp_path / "results.npz")
+    keys = ("gap",)
+    process_types = ("aiida.calculations:gaussian", "aiida.workflows:gaussian.base")
+
+    workchain = WorkflowNode(process_type="aiida.workflows:gaussian.base").store()
+    calculation = _create_calculation(computer, {"gap": 1.0})
+    output = calculation.outputs.output_parameters
+    output.base.links.add_incoming(
+        workchain, link_type=LinkType.RETURN, link_label="output_parameters"
+    )
+    export_results(filename, keys, process_types)
+    results = load_results(filename)
+    assert list(results["output_pk"]).count(output.pk) == 1
+    assert results["pk"][list(results["output_pk"]).index(output.pk)] == calculation.pk
+
+    # returned by the work chain after the export of the calculation
+    workchain = WorkflowNode(process_type="aiida.workflows:gaussian.base").store()
+    calculation = _create_calculation(computer, {"gap": 2.0})
+    assert export_results(filename, keys, process_types) == 1
+    calculation.outputs.output_parameters.base.links.add_incoming(
+        workchain, link_type=LinkType.RETURN, link_label="output_parameters"
+    )
+    assert export_results(filename, keys, process_types) == 0
+
+    # the default process types are the calculations only
+    filename = str(tmp_path / "default.npz")
+    export_results(filename, keys)
+    assert set(load_results(filename)["process_type"]) == {
+        "aiida.calculations:gaussian"
+    }
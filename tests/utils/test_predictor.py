@@ -0,0 +1,160 @@
+"""Tests for the runtime predictor."""
+import ase
+import numpy as np
+import pytest
+from aiida.common.links import LinkType
+from aiida.orm import Dict, StructureData
+
+from aiida_gaussian.calculations.gaussian import GaussianCalcJobNode
+from aiida_gaussian.utils.predictor import (
+    RuntimePredictor,
+    estimate_nbasis,
+    get_training_samples,
+)
+
+
+def test_estimate_nbasis():
+    """Test the number of basis functions against Gaussian's values."""
+    assert estimate_nbasis([6, 1, 1, 1, 1], "6-31G(d)") == 23
+    assert estimate_nbasis([8, 1, 1], "def2SVP") == 24
+    assert estimate_nbasis([8, 1, 1], "unknown") is None
+
+
+def test_predictor():
+    """Test that a power law of the basis size is recovered from the samples."""
+    rng = np.random.default_rng(0)
+    samples = []
+    for _ in range(50):
+        nbasis = int(rng.integers(20, 500))
+        num_cores = int(rng.choice([1, 2, 4, 8]))
+        job_types = ["opt", "freq"] if rng.random() < 0.5 else ["sp"]
+        wall_time = 1e-3 * nbasis**3 / num_cores**0.8
+        wall_time *= 5.0 if "opt" in job_types else 1.0
+        samples.append(
+            {
+                "nbasis": nbasis,
+                "natom": max(1, nbasis // 10),
+                "num_cores": num_cores,
+                "functional": str(rng.choice(["b3lyp", "pbe1pbe"])),
+                "job_types": job_types,
+                "wall_time": wall_time,
+            }
+        )
+
+    predictor = RuntimePredictor.from_dict(
+        RuntimePredictor.from_samples(samples).to_dict()
+    )
+    assert predictor.predict_wall_time(100, 10, 4, "B3LYP", ["sp"]) == pytest.approx(
+        1e3 / 4**0.8, rel=0.05
+    )
+
+    structure = StructureData(ase=ase.Atoms("CH4", cell=[5.0, 5.0, 5.0]))
+    parameters = {
+        "functional": "B3LYP",
+        "basis_set": "6-31G(d)",
+        "route_parameters": {},
+    }
+    suggestion = predictor.suggest_resources(structure, parameters, num_cores=2)
+    assert suggestion == {
+        "max_wallclock_seconds": 600,
+        "%nprocshared": "2",
+        "%mem": "1024MB",
+    }
+
+    # the speedup exponent is 0.8, i.e. the efficiency is n**(-0.2)
+    assert predictor.suggest_num_cores(64, min_efficiency=0.5) == 32
+    assert predictor.suggest_num_cores(8, min_efficiency=0.5) == 8
+    assert predictor.suggest_num_cores(64, min_efficiency=0.9) == 1
+    assert predictor.core_scaling
+
+
+def test_single_core_count():
+    """Test that no core scaling is made up from samples on one number of cores."""
+    rng = np.random.default_rng(0)
+    samples = []
+    for _ in range(30):
+        nbasis = int(rng.integers(20, 500))
+        samples.append(
+            {
+                "nbasis": nbasis,
+                "natom": max(1, nbasis // 10),
+                "num_cores": 4,
+                "functional": "b3lyp",
+                "job_types": ["sp"],
+                "wall_time": 1e-3 * nbasis**3 * rng.lognormal(0.0, 0.1),
+            }
+        )
+
+    predictor = RuntimePredictor.from_dict(
+        RuntimePredictor.from_samples(samples).to_dict()
+    )
+
+    assert not predictor.core_scaling
+    assert predictor.coefficients[3] == 0.0
+    assert predictor.predict_wall_time(
+        100, 10, 64, "B3LYP", ["sp"]
+    ) == predictor.predict_wall_time(100, 10, 4, "B3LYP", ["sp"])
+    with pytest.raises(ValueError):
+        predictor.suggest_num_cores(64)
+
+    structure = StructureData(ase=ase.Atoms("CH4", cell=[5.0, 5.0, 5.0]))
+    parameters = {"functional": "B3LYP", "basis_set": "6-31G(d)"}
+    assert predictor.suggest_resources(structure, parameters, num_cores=4)
+    with pytest.raises(ValueError):
+        predictor.suggest_resources(structure, parameters, max_cores=64)
+
+
+def test_too_few_samples():
+    """Test that fitting on too few samples raises a ValueError."""
+    with pytest.raises(ValueError):
+        RuntimePredictor.from_samples([])
+
+
+def test_train(fixture_localhost):
+    """Test that the model is trained on the successful calculations in the database."""
+
+    def store_calc(nbasis, num_cores, exit_status):
+        node = GaussianCalcJobNode(computer=fixture_localhost)
+        node.set_process_type("aiida.calculations:gaussian")
+        node.set_option("resources", {"num_machines": 1, "num_mpiprocs_per_machine": 8})
+        parameters = {
+            "functional": "PBE1PBE",
+            "link0_parameters": {"%NProcShared": str(num_cores)},
+            "route_parameters": {"sp": None},
+        }
+        node.base.links.add_incoming(
+            Dict(parameters).store(), LinkType.INPUT_CALC, "parameters"
+        )
+        node.store()
+        wall_time = 1e-3 * nbasis**3 / num_cores**0.8
+        output_parameters = Dict(
+            {
+                "nbasis": nbasis,
+                "natom": nbasis // 10,
+                "metadata": {"wall_time": [wall_time / 2, wall_time / 2]},
+            }
+        )
+        output_parameters.base.links.add_incoming(
+            node, LinkType.CREATE, "output_parameters"
+        )
+        output_parameters.store()
+        node.set_exit_status(exit_status)
+        return node
+
+    nodes = [
+        store_calc(nbasis, num_cores, 0)
+        for nbasis in (50, 100, 200, 400)
+        for num_cores in (1, 2, 4, 8)
+    ]
+    failed = store_calc(300, 4, 304)
+
+    samples = get_training_samples(batch_size=5)
+    samples = [s for s in samples if s["functional"] == "pbe1pbe"]
+    assert len(samples) >= len(nodes)
+    assert {s["num_cores"] for s in samples} == {1, 2, 4, 8}
+    assert failed.exit_status == 304 and 300 not in {s["nbasis"] for s in samples}
+
+    predictor = RuntimePredictor.train()
+    assert predictor.predict_wall_time(100, 10, 4, "PBE1PBE", ["sp"]) == pytest.approx(
+        1e3 / 4**0.8, rel=0.05
+    )
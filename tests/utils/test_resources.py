@@ -0,0 +1,25 @@
+"""Tests for the resource utilities."""
+import pytest
+
+from aiida_gaussian.utils.resources import get_resource_conflicts, parse_memory_kb
+
+
+@pytest.mark.parametrize(
+    "value,memory_kb",
+    [("1024MB", 1024**2), ("2gb", 2 * 1024**2), ("100MW", 800 * 1024), ("1024", 8)],
+)
+def test_parse_memory_kb(value, memory_kb):
+    """Test the conversion of %mem values."""
+    assert parse_memory_kb(value) == memory_kb
+
+
+def test_resource_conflicts():
+    """Test that only the values exceeding the allocation are reported."""
+    resources = {"num_machines": 1, "num_mpiprocs_per_machine": 8}
+    assert not get_resource_conflicts(
+        {"%nprocshared": "8", "%mem": "4GB"}, resources, 8 * 1024**2
+    )
+    conflicts = get_resource_conflicts(
+        {"%NProcShared": "16", "%Mem": "16GB"}, resources, 8 * 1024**2
+    )
+    assert len(conflicts) == 2
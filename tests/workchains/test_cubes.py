@@ -0,0 +1,54 @@
+"""Tests for the :class:`aiida_gaussian.workchains.GaussianCubesWorkChain`."""
+import numpy as np
+import pytest
+from aiida.engine.utils import instantiate_process
+from aiida.manage.manager import get_manager
+from aiida.orm import Dict, Float, Int, RemoteData
+
+from aiida_gaussian.workchains import GaussianCubesWorkChain
+from aiida_gaussian.workchains.cubes import (
+    MIN_GRID_POINTS,
+    get_budgeted_dx,
+    get_max_grid_points,
+    get_stencil_box,
+)
+
+POSITIONS = np.array([[0.0, 0.0, 0.119], [0.0, 0.763, -0.477], [0.0, -0.763, -0.477]])
+
+
+@pytest.mark.parametrize("max_points", [MIN_GRID_POINTS, 100, 10**4])
+def test_budgeted_dx(max_points):
+    """Test that the spacing is coarsened just enough to fit into the budget."""
+    dx = get_budgeted_dx(POSITIONS, 3.0, 0.15, max_points)
+    _, _, cell_n = get_stencil_box(POSITIONS, 3.0, dx)
+
+    assert 0.15 < dx < 100.0
+    assert np.prod(cell_n) <= max_points
+    assert np.all(cell_n >= 2)
+
+    # the budget is already met
+    assert get_budgeted_dx(POSITIONS, 3.0, 0.15, 10**9) == 0.15
+
+
+def test_budget_below_minimum(fixture_code, fixture_localhost):
+    """Test that a budget below a 2x2x2 cube is rejected."""
+    assert get_max_grid_points(max_grid_points=100, max_cube_mb=0.0001) == 7
+    assert get_max_grid_points() is None
+
+    with pytest.raises(ValueError):
+        get_budgeted_dx(POSITIONS, 3.0, 0.15, MIN_GRID_POINTS - 1)
+
+    for budget in ({"max_grid_points": Int(7)}, {"max_cube_mb": Float(0.0001)}):
+        inputs = {
+            "formchk_code": fixture_code("gaussian.formchk"),
+            "cubegen_code": fixture_code("gaussian.cubegen"),
+            "gaussian_calc_folder": RemoteData(
+                computer=fixture_localhost, remote_path="/tmp"
+            ),
+            "gaussian_output_params": Dict({"atomcoords": [POSITIONS.tolist()]}),
+            **budget,
+        }
+        process = instantiate_process(
+            get_manager().get_runner(), GaussianCubesWorkChain, **inputs
+        )
+        assert process.check_input() == process.exit_codes.ERROR_GRID_BUDGET
@@ -0,0 +1,277 @@
+"""Tests for the error handlers of the :class:`aiida_gaussian.workchains.GaussianBaseWorkChain`."""
+# pylint: disable=redefined-outer-name
+import ase
+import pytest
+from aiida.common.links import LinkType
+from aiida.engine.utils import instantiate_process
+from aiida.manage.manager import get_manager
+from aiida.orm import CalcJobNode, Dict, Int, RemoteData, StructureData
+from aiida.schedulers.datastructures import JobInfo
+
+from aiida_gaussian.calculations import GaussianCalculation
+from aiida_gaussian.utils.caching import normalize_parameters
+from aiida_gaussian.workchains import GaussianBaseWorkChain
+
+EXIT_CODES = GaussianCalculation.exit_codes
+
+OPT_PARAMETERS = {
+    "link0_parameters": {"%chk": "aiida.chk"},
+    "functional": "PBE1PBE",
+    "basis_set": "STO-3G",
+    "route_parameters": {"opt": None},
+}
+
+
+@pytest.fixture
+def generate_workchain(fixture_code):
+    """Return a factory of GaussianBaseWorkChain instances that are set up."""
+
+    def factory(parameters, options=None, **kwargs):
+        inputs = {
+            "gaussian": {
+                "code": fixture_code("gaussian"),
+                "parameters": Dict(parameters),
+                "structure": StructureData(
+                    ase=ase.Atoms(
+                        "H2", positions=[[0, 0, 0], [0, 0, 0.74]], cell=[5] * 3
+                    )
+                ),
+                "metadata": {
+                    "options": {"resources": {"num_machines": 1}, **(options or {})},
+                },
+            },
+            **kwargs,
+        }
+        process = instantiate_process(
+            get_manager().get_runner(), GaussianBaseWorkChain, **inputs
+        )
+        process.setup()
+        return process
+
+    return factory
+
+
+@pytest.fixture
+def generate_failed_calculation(fixture_localhost):
+    """Return a factory of failed (mock) GaussianCalculation nodes."""
+
+    def factory(exit_status, output_parameters=None, options=None, elapsed=None):
+        node = CalcJobNode(
+            computer=fixture_localhost, process_type="aiida.calculations:gaussian"
+        )
+        for name, value in (options or {}).items():
+            node.set_option(name, value)
+        if elapsed is not None:
+            job_info = JobInfo()
+            job_info.wallclock_time_seconds = elapsed
+            node.set_last_job_info(job_info)
+        node.store()
+
+        outputs = {
+            "remote_folder": RemoteData(computer=fixture_localhost, remote_path="/tmp")
+        }
+        if output_parameters is not None:
+            outputs["output_parameters"] = Dict(output_parameters)
+        for link_label, output in outputs.items():
+            output.base.links.add_incoming(node, LinkType.CREATE, link_label)
+            output.store()
+
+        node.set_exit_status(exit_status)
+        return node
+
+    return factory
+
+
+@pytest.mark.parametrize(
+    "exit_code, elapsed, limit, expected_walltime",
+    [
+        # 4 steps in 3600 s: time for 10 more steps
+        (EXIT_CODES.ERROR_SCHEDULER_OUT_OF_WALLTIME, 3600, None, 9000),
+        (EXIT_CODES.ERROR_SCHEDULER_OUT_OF_WALLTIME, 3600, 7200, 7200),
+        # the walltime exceeded is the elapsed time if not reported
+        (EXIT_CODES.ERROR_SCHEDULER_OUT_OF_WALLTIME, None, None, 9000),
+        # a log without termination at the end of the walltime
+        (EXIT_CODES.ERROR_NO_NORMAL_TERMINATION, 3400, None, 8500),
+    ],
+)
+def test_out_of_walltime_opt(
+    generate_workchain,
+    generate_failed_calculation,
+    exit_code,
+    elapsed,
+    limit,
+    expected_walltime,
+):
+    """Test that out-of-time optimizations continue from the checkpoint with more time."""
+    kwargs = {} if limit is None else {"max_wallclock_seconds_limit": Int(limit)}
+    process = generate_workchain(
+        OPT_PARAMETERS, {"max_wallclock_seconds": 3600}, **kwargs
+    )
+    node = generate_failed_calculation(
+        exit_code.status,
+        output_parameters={"atomcoords": [[[0.0, 0.0, 0.0]]] * 4},
+        options={"max_wallclock_seconds": 3600},
+        elapsed=elapsed,
+    )
+
+    result = process.handle_out_of_walltime_opt(node)
+
+    assert result.do_break and result.exit_code.status == 0
+    inputs = process.ctx.inputs
+    assert inputs.metadata["options"]["max_wallclock_seconds"] == expected_walltime
+    parameters = inputs.parameters.get_dict()
+    assert parameters["link0_parameters"]["%oldchk"] == "parent_calc/aiida.chk"
+    assert parameters["route_parameters"]["geom"] == "allcheck"
+    assert "structure" not in inputs
+
+
+@pytest.mark.parametrize("elapsed", [None, 600])
+def test_out_of_walltime_opt_crash(
+    generate_workchain, generate_failed_calculation, elapsed
+):
+    """Test that logs without termination well within the walltime are not restarted."""
+    process = generate_workchain(OPT_PARAMETERS, {"max_wallclock_seconds": 3600})
+    node = generate_failed_calculation(
+        EXIT_CODES.ERROR_NO_NORMAL_TERMINATION.status,
+        output_parameters={"atomcoords": [[[0.0, 0.0, 0.0]]] * 4},
+        options={"max_wallclock_seconds": 3600},
+        elapsed=elapsed,
+    )
+
+    assert process.handle_out_of_walltime_opt(node) is None
+    assert "parent_calc_folder" not in process.ctx.inputs
+
+
+@pytest.mark.parametrize(
+    "route_parameters, expected_guess",
+    [
+        ({"sp": None}, "read"),
+        ({"sp": None, "guess": "mix"}, {"mix": None, "read": None}),
+        ({"opt": None, "guess": {"mix": None}}, {"mix": None, "read": None}),
+    ],
+)
+def test_scf_failure_checkpoint_restart(
+    generate_workchain, generate_failed_calculation, route_parameters, expected_guess
+):
+    """Test that SCF failures restart from the checkpoint of the failed calculation."""
+    parameters = {**OPT_PARAMETERS, "route_parameters": route_parameters}
+    process = generate_workchain(parameters)
+    node = generate_failed_calculation(EXIT_CODES.ERROR_SCF_FAILURE.status)
+
+    result = process.handle_scf_failure(node)
+
+    assert result.do_break and result.exit_code.status == 0
+    inputs = process.ctx.inputs
+    assert inputs.parent_calc_folder.uuid == node.outputs.remote_folder.uuid
+    parameters = inputs.parameters.get_dict()
+    assert parameters["link0_parameters"]["%oldchk"] == "parent_calc/aiida.chk"
+    assert parameters["route_parameters"]["scf"] == {"yqc": None}
+    assert parameters["route_parameters"]["guess"] == expected_guess
+    if "opt" in route_parameters:
+        assert parameters["route_parameters"]["geom"] == "allcheck"
+        assert "structure" not in inputs
+    else:
+        assert "geom" not in parameters["route_parameters"]
+        assert "structure" in inputs
+
+
+def test_checkpoint_restart_geom_asytop(
+    generate_workchain, generate_failed_calculation
+):
+    """Test that the checkpoint restart keeps the 'geom' options and the ASYTOP handler."""
+    parameters = {
+        **OPT_PARAMETERS,
+        "route_parameters": {"opt": {"modredundant": None}, "Geom": "ModRedundant"},
+        "input_parameters": {"B 1 2 F": None},
+    }
+    process = generate_workchain(parameters)
+    node = generate_failed_calculation(EXIT_CODES.ERROR_SCF_FAILURE.status)
+
+    process.handle_scf_failure(node)
+
+    inputs = process.ctx.inputs
+    route_parameters = inputs.parameters["route_parameters"]
+    assert route_parameters["geom"] == {"modredundant": None, "allcheck": None}
+    assert GaussianCalculation._is_allcheck(  # pylint: disable=protected-access
+        normalize_parameters(inputs.parameters.get_dict())
+    )
+    assert "structure" not in inputs
+
+    # ASYTOP of the restart: continue from its last geometry, not from the chk
+    node = generate_failed_calculation(EXIT_CODES.ERROR_ASYTOP.status)
+    output_structure = StructureData(
+        ase=ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, 0.7412345]], cell=[5] * 3)
+    )
+    output_structure.base.links.add_incoming(node, LinkType.CREATE, "output_structure")
+    output_structure.store()
+
+    result = process.handle_asytop_error(node)
+
+    assert result.do_break and result.exit_code.status == 0
+    assert inputs.structure.get_ase().get_positions()[1][2] == 0.7412
+    assert inputs.parameters["route_parameters"]["geom"] == {"modredundant": None}
+    assert not GaussianCalculation._is_allcheck(  # pylint: disable=protected-access
+        normalize_parameters(inputs.parameters.get_dict())
+    )
+
+
+def test_scf_failure_without_checkpoint(
+    generate_workchain, generate_failed_calculation
+):
+    """Test that SCF failures without '%chk' restart from scratch."""
+    parameters = {**OPT_PARAMETERS, "link0_parameters": {}}
+    process = generate_workchain(parameters)
+    node = generate_failed_calculation(EXIT_CODES.ERROR_SCF_FAILURE.status)
+
+    process.handle_scf_failure(node)
+
+    inputs = process.ctx.inputs
+    assert "parent_calc_folder" not in inputs
+    assert "structure" in inputs
+    assert "guess" not in inputs.parameters["route_parameters"]
+
+
+@pytest.mark.parametrize(
+    "limit, expected_link0, expected_max_memory_kb",
+    [
+        # %mem doubled, with the margin on top of it in the allocation
+        (None, {"%mem": "2048MB", "%nprocshared": "4"}, 2330169),
+        # doubling would exceed the limit: more memory per core instead
+        (2000000, {"%mem": "1GB", "%nprocshared": "2"}, 1200000),
+    ],
+)
+def test_out_of_memory(
+    generate_workchain,
+    generate_failed_calculation,
+    limit,
+    expected_link0,
+    expected_max_memory_kb,
+):
+    """Test that out-of-memory calculations restart with more memory per core."""
+    parameters = {
+        **OPT_PARAMETERS,
+        "link0_parameters": {"%mem": "1GB", "%nprocshared": "4"},
+    }
+    kwargs = {} if limit is None else {"max_memory_kb_limit": Int(limit)}
+    process = generate_workchain(parameters, {"max_memory_kb": 1200000}, **kwargs)
+    node = generate_failed_calculation(EXIT_CODES.ERROR_OUT_OF_MEMORY.status)
+
+    result = process.handle_out_of_memory(node)
+
+    assert result.do_break and result.exit_code.status == 0
+    inputs = process.ctx.inputs
+    assert inputs.parameters["link0_parameters"] == expected_link0
+    assert inputs.metadata["options"]["max_memory_kb"] == expected_max_memory_kb
+
+
+def test_out_of_memory_single_core(generate_workchain, generate_failed_calculation):
+    """Test that out-of-memory calculations on one core at the limit give up."""
+    parameters = {**OPT_PARAMETERS, "link0_parameters": {"%mem": "1GB"}}
+    process = generate_workchain(
+        parameters, {"max_memory_kb": 1200000}, max_memory_kb_limit=Int(2000000)
+    )
+    node = generate_failed_calculation(EXIT_CODES.ERROR_OUT_OF_MEMORY.status)
+
+    result = process.handle_out_of_memory(node)
+
+    assert result.exit_code == process.exit_codes.ERROR_UNRECOVERABLE_TERMINATION
@@ -0,0 +1,154 @@
+"""Tests for the :class:`aiida_gaussian.workchains.GaussianScreeningWorkChain`."""
+# pylint: disable=redefined-outer-name
+import ase
+import numpy as np
+import pytest
+from aiida.common.links import LinkType
+from aiida.engine import Process, ProcessState, calcfunction, run_get_node
+from aiida.engine.utils import instantiate_process
+from aiida.manage.manager import get_manager
+from aiida.orm import Dict, Float, Log, StructureData, WorkflowNode
+
+from aiida_gaussian.workchains import GaussianBaseWorkChain, GaussianScreeningWorkChain
+
+
+def h2(distance):
+    return StructureData(
+        ase=ase.Atoms("H2", positions=[[0, 0, 0], [0, 0, distance]], cell=[5] * 3)
+    )
+
+
+@pytest.fixture
+def generate_screening(fixture_code):
+    """Return a factory of GaussianScreeningWorkChain instances for the structures."""
+
+    def factory(structures, max_concurrent=10):
+        inputs = {
+            "structures": structures,
+            "max_concurrent": max_concurrent,
+            "base": {
+                "gaussian": {
+                    "code": fixture_code("gaussian"),
+                    "parameters": Dict({"route_parameters": {"sp": None}}),
+                    "metadata": {
+                        "options": {"resources": {"num_machines": 1}},
+                    },
+                },
+            },
+        }
+        return instantiate_process(
+            get_manager().get_runner(), GaussianScreeningWorkChain, **inputs
+        )
+
+    return factory
+
+
+def finish_child(node, exit_status, energy=None):
+    """Terminate a (mock) child work chain, with an 'energy_ev' output"""
+    if energy is not None:
+        Float(energy).store().base.links.add_incoming(
+            node, LinkType.RETURN, "energy_ev"
+        )
+    node.set_process_state(ProcessState.FINISHED)
+    node.set_exit_status(exit_status)
+
+
+def test_deduplication(generate_screening):
+    """Test that structures that are identical within the rounding are queued once."""
+    process = generate_screening({"a": h2(0.74), "b": h2(0.74 + 1e-9), "c": h2(0.8)})
+    process.setup()
+
+    assert process.ctx.queue == ["a", "c"]
+    assert process.ctx.duplicates == {"b": "a"}
+
+
+def test_results(generate_screening):
+    """Test that the results of the children are collected by a calcfunction."""
+    process = generate_screening({"a": h2(0.74), "b": h2(0.74 + 1e-9), "c": h2(0.8)})
+    process.setup()
+
+    children = {label: WorkflowNode().store() for label in process.ctx.queue}
+    finish_child(children["a"], 0, energy=-30.0)
+    finish_child(children["c"], 399)
+    process.ctx.children = children
+
+    assert process.results() is None
+
+    results = process.outputs["results"]
+    assert results.creator.process_label == "collect_results"
+    assert list(results.get_array("labels")) == ["a", "b", "c"]
+    assert list(results.get_array("exit_status")) == [0, 0, 399]
+    energies = results.get_array("energy_ev")
+    assert list(energies[:2]) == [-30.0, -30.0] and np.isnan(energies[2])
+
+
+@calcfunction
+def mock_outputs(structure):
+    """Outputs of a mock calculation, without a 'gap' (as the base parser)"""
+    distance = float(np.linalg.norm(np.diff(structure.get_ase().positions, axis=0)))
+    return {
+        "energy_ev": Float(-30.0 - distance),
+        "output_parameters": Dict(
+            {"moenergies": [[-20.0, -10.0, -4.0, 1.0]], "homos": [1]}
+        ),
+    }
+
+
+class MockBaseWorkChain(GaussianBaseWorkChain):
+    """GaussianBaseWorkChain that fails for long bonds instead of running Gaussian"""
+
+    @classmethod
+    def define(cls, spec):
+        super().define(spec)
+        spec.outline(cls.mock_run)
+
+    def mock_run(self):
+        structure = self.inputs.gaussian.structure
+        if structure.get_ase().get_distance(0, 1) > 0.85:
+            return self.exit_codes.ERROR_UNRECOVERABLE_TERMINATION
+        self.out_many(mock_outputs(structure))
+        return None
+
+
+def test_run(fixture_code, monkeypatch):
+    """Test that the children are run in batches of at most max_concurrent."""
+
+    def submit(self, _, **inputs):
+        return Process.submit(self, MockBaseWorkChain, **inputs)
+
+    monkeypatch.setattr(GaussianScreeningWorkChain, "submit", submit)
+
+    structures = {"a": h2(0.7), "b": h2(0.8), "c": h2(0.9), "d": h2(0.7 + 1e-9)}
+    inputs = {
+        "structures": structures,
+        "max_concurrent": 2,
+        "base": {
+            "gaussian": {
+                "code": fixture_code("gaussian"),
+                "parameters": Dict({"route_parameters": {"sp": None}}),
+                "metadata": {"options": {"resources": {"num_machines": 1}}},
+            },
+        },
+    }
+    results, node = run_get_node(GaussianScreeningWorkChain, **inputs)
+
+    assert node.is_finished_ok, node.exit_status
+    children = {
+        link.link_label: link.node
+        for link in node.base.links.get_outgoing(link_type=LinkType.CALL_WORK).all()
+    }
+    assert sorted(children) == ["a", "b", "c"]
+    # the second batch is submitted once the first one has terminated
+    assert children["c"].ctime > max(children["a"].mtime, children["b"].mtime)
+    logs = "\n".join(log.message for log in Log.collection.get_logs_for(node))
+    assert "Submitted 2 structures, 1 queued" in logs
+    assert "Submitted 1 structures, 0 queued" in logs
+
+    results = results["results"]
+    assert list(results.get_array("labels")) == ["a", "b", "c", "d"]
+    assert list(results.get_array("exit_status")) == [0, 0, 399, 0]
+    np.testing.assert_allclose(
+        results.get_array("energy_ev"), [-30.7, -30.8, np.nan, -30.7]
+    )
+    # computed from the orbital energies
+    np.testing.assert_allclose(results.get_array("gap"), [6.0, 6.0, np.nan, 6.0])